@@ -31,6 +31,181 @@ const parseNumberList = (value) =>
     .map(Number)
     .filter((v) => Number.isFinite(v));
 
+// Main-thread side of the plan worker (planner.js). Each tab owns one runner; starting a new
+// plan while the previous one is still running terminates the old worker instead of queueing.
+// Where workers are unavailable (file://) the same runPlan() runs inline after a tick.
+class PlanRunner {
+  constructor() {
+    this.worker = undefined; // undefined: not started yet, null: unavailable
+    this.busy = false;
+    this.jobId = 0;
+    this.message = null;
+    this.onReply = null;
+  }
+
+  run(message, onReply) {
+    this.jobId += 1;
+    this.message = message;
+    this.onReply = onReply;
+    if (this.worker && this.busy) {
+      this.worker.terminate();
+      this.worker = undefined;
+    }
+    if (this.worker === undefined) {
+      this.worker = this.spawn();
+    }
+    if (this.worker) {
+      this.busy = true;
+      this.worker.postMessage({ id: this.jobId, ...message });
+    } else {
+      this.runInline();
+    }
+  }
+
+  spawn() {
+    let worker;
+    try {
+      worker = new Worker("planner.js");
+    } catch (err) {
+      return null;
+    }
+    worker.onmessage = (event) => {
+      if (event.data.id !== this.jobId) return;
+      if (event.data.type !== "batch") this.busy = false;
+      this.onReply(event.data);
+    };
+    worker.onerror = (event) => {
+      event.preventDefault();
+      worker.terminate();
+      this.worker = null;
+      this.busy = false;
+      this.runInline();
+    };
+    return worker;
+  }
+
+  runInline() {
+    const id = this.jobId;
+    setTimeout(() => {
+      if (id !== this.jobId) return;
+      runPlan(this.message, (reply) => {
+        if (id === this.jobId) this.onReply(reply);
+      });
+    }, 0);
+  }
+}
+
+// Builds all rows off-DOM and inserts them with a single append (one layout pass).
+function renderRows(tbody, rows) {
+  const fragment = document.createDocumentFragment();
+  rows.forEach((cells) => {
+    const row = document.createElement("tr");
+    row.innerHTML = cells.map((cell) => `<td>${cell}</td>`).join("");
+    fragment.appendChild(row);
+  });
+  tbody.replaceChildren(fragment);
+}
+
+// Rows rendered above and below the viewport, and the row height assumed until one is measured.
+const RENDER_OVERSCAN = 8;
+const ESTIMATED_ROW_HEIGHT = 40;
+
+// Virtualized <tbody> for large matrices: rows stay in the typed-array batches posted by the
+// worker, and only those inside the scroll viewport exist in the DOM; two spacer rows keep
+// the scrollbar sized for the full table. Re-renders at most once per animation frame.
+class VirtualBody {
+  constructor(tbody, columns, formatRow) {
+    this.tbody = tbody;
+    this.scroller = tbody.closest(".table-wrap");
+    this.columns = columns;
+    this.formatRow = formatRow;
+    this.rowHeight = 0;
+    this.frame = 0;
+    this.clear();
+    this.scroller.addEventListener("scroll", () => this.schedule(), { passive: true });
+    window.addEventListener("resize", () => {
+      this.rowHeight = 0;
+      this.first = -1;
+      this.schedule();
+    });
+  }
+
+  clear() {
+    this.batches = [];
+    this.starts = [];
+    this.count = 0;
+    this.first = -1;
+    this.last = -1;
+    this.bottom = null;
+    this.scroller.scrollTop = 0;
+    this.tbody.replaceChildren();
+  }
+
+  append(values, invalid) {
+    this.batches.push({ values, invalid });
+    this.starts.push(this.count);
+    this.count += invalid.length;
+    this.schedule();
+  }
+
+  schedule() {
+    if (this.frame) return;
+    this.frame = requestAnimationFrame(() => {
+      this.frame = 0;
+      this.render();
+    });
+  }
+
+  cells(index) {
+    let lo = 0;
+    let hi = this.starts.length - 1;
+    while (lo < hi) {
+      const mid = (lo + hi + 1) >> 1;
+      if (this.starts[mid] <= index) lo = mid;
+      else hi = mid - 1;
+    }
+    const row = index - this.starts[lo];
+    const { values, invalid } = this.batches[lo];
+    return this.formatRow(values, row * MATRIX_COLUMNS, invalid[row] === 1);
+  }
+
+  spacer(height) {
+    return `<tr class="spacer" aria-hidden="true"><td colspan="${this.columns}" style="height:${height}px"></td></tr>`;
+  }
+
+  render() {
+    const rowHeight = this.rowHeight || ESTIMATED_ROW_HEIGHT;
+    const head = this.tbody.parentElement.tHead;
+    const offset = Math.max(0, this.scroller.scrollTop - (head ? head.offsetHeight : 0));
+    const first = Math.max(0, Math.floor(offset / rowHeight) - RENDER_OVERSCAN);
+    const last = Math.min(this.count, first + Math.ceil(this.scroller.clientHeight / rowHeight) + 2 * RENDER_OVERSCAN);
+
+    if (first === this.first && last === this.last && this.bottom) {
+      // Only rows below the viewport were added: grow the bottom spacer.
+      this.bottom.firstChild.style.height = `${(this.count - last) * rowHeight}px`;
+      return;
+    }
+    this.first = first;
+    this.last = last;
+
+    const html = [this.spacer(first * rowHeight)];
+    for (let index = first; index < last; index += 1) {
+      html.push(`<tr>${this.cells(index).map((cell) => `<td>${cell}</td>`).join("")}</tr>`);
+    }
+    html.push(this.spacer((this.count - last) * rowHeight));
+    this.tbody.innerHTML = html.join("");
+    this.bottom = this.tbody.lastElementChild;
+
+    if (!this.rowHeight && last > first) {
+      this.rowHeight = this.tbody.children[1].getBoundingClientRect().height || ESTIMATED_ROW_HEIGHT;
+      if (this.rowHeight !== rowHeight) {
+        this.first = -1;
+        this.schedule();
+      }
+    }
+  }
+}
+
 function setResult(el, text, isError = false) {
   el.textContent = text;
   el.classList.toggle("error", isError);
@@ -90,6 +265,7 @@ document.getElementById("count-calc").addEventListener("click", () => {
 // =======================
 const singleBody = document.getElementById("single-table-body");
 const singleWarning = document.getElementById("single-warning");
+const singlePlanner = new PlanRunner();
 
 document.getElementById("single-calc").addEventListener("click", () => {
   singleBody.innerHTML = "";
@@ -98,6 +274,8 @@ document.getElementById("single-calc").addEventListener("click", () => {
   const stock = getNumber("single-stock");
   const baseVol = getNumber("single-total-vol");
   const minStockVol = getNumber("single-min-stock");
+  const maxTubeVol = getNumber("single-max-vol");
+  const wholeChain = document.getElementById("single-whole-chain").checked;
   const targetsRaw = document.getElementById("single-targets").value;
   const mode = document.querySelector("input[name='single-mode']:checked").value;
   const multiplier = mode === "add" ? 2 : 1;
@@ -107,6 +285,11 @@ document.getElementById("single-calc").addEventListener("click", () => {
     return;
   }
 
+  if (wholeChain && maxTubeVol > 0 && maxTubeVol <= minStockVol) {
+    singleWarning.textContent = "单管最大体积必须大于最小取样体积。";
+    return;
+  }
+
   const targets = parseNumberList(targetsRaw);
 
   if (!targets.length) {
@@ -136,126 +319,99 @@ document.getElementById("single-calc").addEventListener("click", () => {
 
   const hasZero = sortedTargets.includes(0);
   const chainTargets = sortedTargets.filter((target) => target > 0);
+  const blankRow = [fmt(0, 2), fmt(0, 2), "培养基", fmt(0, 1), fmt(baseVol, 1)];
 
   if (!chainTargets.length && hasZero) {
-    const row = document.createElement("tr");
-    row.innerHTML = `
-      <td>${fmt(0, 2)}</td>
-      <td>${fmt(0, 2)}</td>
-      <td>培养基</td>
-      <td>${fmt(0, 1)}</td>
-      <td>${fmt(baseVol, 1)}</td>
-    `;
-    singleBody.appendChild(row);
+    renderRows(singleBody, [blankRow]);
     notes.push("所有终浓度为 0，仅需加培养基。");
     singleWarning.textContent = notes.join(" ");
     return;
   }
 
-  const solutions = chainTargets.map((target) => target * multiplier);
-  const maxSolution = Math.max(...solutions);
+  const maxSolution = Math.max(...chainTargets) * multiplier;
 
   if (maxSolution > stockUM) {
     singleWarning.textContent = "最高配液浓度高于母液浓度，无法配制。";
     return;
   }
 
-  const calcData = chainTargets.map((target, index) => {
-    const solution = target * multiplier;
-    const isStock = index === 0;
-    const sourceSolution = isStock ? stockUM : chainTargets[index - 1] * multiplier;
-    const sourceName = isStock ? "母液" : `上一管 ${fmt(sourceSolution, 2)} μM`;
-    return { target, solution, sourceSolution, sourceName, isStock };
-  });
-
-  const transferNeeds = new Array(calcData.length).fill(0);
-  const results = new Array(calcData.length);
-  let smallTransfers = false;
-  let hasError = false;
-  let stockAdjustNote = "";
-
-  for (let index = calcData.length - 1; index >= 0; index -= 1) {
-    const item = calcData[index];
-    const baseTotalVol = baseVol + transferNeeds[index];
-    let totalVol = baseTotalVol;
-    let transferVol = (item.solution * totalVol) / item.sourceSolution;
-    let note = "";
-
-    if (item.isStock && transferVol > 0 && transferVol < minStockVol) {
-      const factor = minStockVol / transferVol;
-      totalVol = baseTotalVol * factor;
-      transferVol = minStockVol;
-      note = "已扩大体积以满足母液取样";
-      stockAdjustNote = `已自动扩容：最高浓度管 ${fmt(baseTotalVol, 1)} μL → ${fmt(totalVol, 1)} μL (母液取样≥${fmt(minStockVol, 1)} μL)。`;
+  const message = {
+    kind: "single",
+    stockUM,
+    chainTargets,
+    multiplier,
+    baseVol,
+    minVol: minStockVol,
+    maxVol: maxTubeVol,
+    wholeChain,
+  };
+
+  singlePlanner.run(message, (reply) => {
+    if (reply.error) {
+      singleWarning.textContent = reply.error;
+      return;
     }
-
-    if (!item.isStock) {
-      transferNeeds[index - 1] += transferVol;
-      if (transferVol > 0 && transferVol < minStockVol) {
-        smallTransfers = true;
+    if (wholeChain) {
+      let expandedCount = 0;
+      let intermediateCount = 0;
+
+      const rows = reply.steps.map((res, index) => {
+        if (res.intermediate) intermediateCount += 1;
+        else if (res.expanded) expandedCount += 1;
+        const sourceName = index === 0 ? "母液" : `上一管 ${fmt(res.sourceSolution, 2)} μM`;
+        return [
+          res.intermediate ? "中间稀释管" : fmt(res.solution / multiplier, 2),
+          fmt(res.solution, 3),
+          sourceName,
+          fmt(res.transferVol, 3),
+          fmt(res.mediaVol, 1),
+        ];
+      });
+      if (hasZero) rows.push(blankRow);
+      renderRows(singleBody, rows);
+
+      notes.push("每一步取样均已满足最小取样体积，表中体积相加即每管实际配制总量。");
+      if (expandedCount) {
+        notes.push(`已自动扩容 ${expandedCount} 管。`);
+      }
+      if (intermediateCount) {
+        notes.push(`浓度跨度过大，已插入 ${intermediateCount} 个中间稀释管 (不用于实验)。`);
       }
+      singleWarning.textContent = notes.join(" ");
+      return;
     }
 
-    const mediaVol = totalVol - transferVol;
-    const invalid = !Number.isFinite(mediaVol) || mediaVol < 0;
-
-    if (invalid) {
-      hasError = true;
+    const rows = reply.results.map((res) => [
+      fmt(res.target, 2),
+      fmt(res.solution, 2),
+      res.isStock ? "母液" : `上一管 ${fmt(res.sourceSolution, 2)} μM`,
+      res.invalid ? "-" : fmt(res.transferVol, 3),
+      res.invalid ? "母液不足" : fmt(res.mediaVol, 1),
+    ]);
+    if (hasZero) rows.push(blankRow);
+    renderRows(singleBody, rows);
+
+    if (reply.results.length > 1) {
+      notes.push("连续稀释已自动补偿传递体积，表中体积相加即每管实际配制总量。");
     }
 
-    results[index] = {
-      ...item,
-      transferVol,
-      mediaVol,
-      totalVol,
-      note,
-      invalid,
-    };
-  }
-
-  results.forEach((res) => {
-    const row = document.createElement("tr");
-    row.innerHTML = `
-      <td>${fmt(res.target, 2)}</td>
-      <td>${fmt(res.solution, 2)}</td>
-      <td>${res.sourceName}</td>
-      <td>${res.invalid ? "-" : fmt(res.transferVol, 3)}</td>
-      <td>${res.invalid ? "母液不足" : fmt(res.mediaVol, 1)}</td>
-    `;
-    singleBody.appendChild(row);
-  });
-
-  if (hasZero) {
-    const row = document.createElement("tr");
-    row.innerHTML = `
-      <td>${fmt(0, 2)}</td>
-      <td>${fmt(0, 2)}</td>
-      <td>培养基</td>
-      <td>${fmt(0, 1)}</td>
-      <td>${fmt(baseVol, 1)}</td>
-    `;
-    singleBody.appendChild(row);
-  }
-
-  if (calcData.length > 1) {
-    notes.push("连续稀释已自动补偿传递体积，表中体积相加即每管实际配制总量。");
-  }
-
-  if (stockAdjustNote) {
-    notes.push(stockAdjustNote);
-  }
+    if (reply.stockAdjust) {
+      const { from, to } = reply.stockAdjust;
+      notes.push(`已自动扩容：最高浓度管 ${fmt(from, 1)} μL → ${fmt(to, 1)} μL (母液取样≥${fmt(minStockVol, 1)} μL)。`);
+    }
 
-  if (smallTransfers) {
-    notes.push("提示：部分梯度取样体积偏小，可适当增大每管总体积。");
-  }
+    if (reply.smallTransfers) {
+      notes.push("提示：部分梯度取样体积偏小，可适当增大每管总体积。");
+    }
 
-  if (hasError) {
-    notes.push("部分浓度过高，无法用当前母液浓度配制。");
-  }
+    if (reply.hasError) {
+      notes.push("部分浓度过高，无法用当前母液浓度配制。");
+    }
 
-  if (notes.length) {
-    singleWarning.textContent = notes.join(" ");
-  }
+    if (notes.length) {
+      singleWarning.textContent = notes.join(" ");
+    }
+  });
 });
 
 // =======================
@@ -263,16 +419,26 @@ document.getElementById("single-calc").addEventListener("click", () => {
 // =======================
 const doubleBody = document.getElementById("double-table-body");
 const doubleWarning = document.getElementById("double-warning");
+const doublePlanner = new PlanRunner();
+
+const formatMatrixRow = (values, offset, invalid) => [
+  fmt(values[offset], 2),
+  fmt(values[offset + 1], 2),
+  invalid ? "-" : fmt(values[offset + 2], 3),
+  invalid ? "-" : fmt(values[offset + 3], 3),
+  invalid ? "母液不足" : fmt(values[offset + 4], 1),
+];
+const doubleTable = new VirtualBody(doubleBody, 5, formatMatrixRow);
 
 document.getElementById("double-calc").addEventListener("click", () => {
-  doubleBody.innerHTML = "";
+  doubleTable.clear();
   doubleWarning.textContent = "";
 
   const stockA = getNumber("double-stock-a");
   const stockB = getNumber("double-stock-b");
   const totalVol = getNumber("double-total-vol");
-  const targetsA = parseNumberList(document.getElementById("double-targets-a").value);
-  const targetsB = parseNumberList(document.getElementById("double-targets-b").value);
+  const targetsA = parseNumberList(document.getElementById("double-target-a").value);
+  const targetsB = parseNumberList(document.getElementById("double-target-b").value);
   const mode = document.querySelector("input[name='double-mode']:checked").value;
   const multiplier = mode === "add" ? 2 : 1;
 
@@ -286,58 +452,126 @@ document.getElementById("double-calc").addEventListener("click", () => {
     return;
   }
 
-  const stockAUM = stockA * 1000;
-  const stockBUM = stockB * 1000;
-
-  const notes = [];
-  let hasError = false;
-
-  if (mode === "add") {
-    notes.push("方式B 已按 2X 计算配液浓度。");
-  }
+  const message = {
+    kind: "double",
+    targetsA,
+    targetsB,
+    stockAUM: stockA * 1000,
+    stockBUM: stockB * 1000,
+    totalVol,
+    multiplier,
+  };
+
+  doubleWarning.textContent = "计算中...";
+  doublePlanner.run(message, (reply) => {
+    if (reply.type === "batch") {
+      // A restarted plan (worker fallback) begins again at row 0.
+      if (reply.start === 0) doubleTable.clear();
+      doubleTable.append(reply.values, reply.invalid);
+      doubleWarning.textContent = `计算中... 已生成 ${fmt(doubleTable.count, 0)} 个组合`;
+      return;
+    }
 
-  targetsA.forEach((targetA) => {
-    targetsB.forEach((targetB) => {
-      const solutionA = targetA * multiplier;
-      const solutionB = targetB * multiplier;
-      const volA = (solutionA * totalVol) / stockAUM;
-      const volB = (solutionB * totalVol) / stockBUM;
-      const volMedia = totalVol - volA - volB;
-
-      let invalid = false;
-      if (!Number.isFinite(volMedia) || volMedia < 0) {
-        invalid = true;
-        hasError = true;
-      }
+    if (!reply.count) {
+      doubleWarning.textContent = "请输入药A与药B的终浓度序列 (μM)。";
+      return;
+    }
 
-      const row = document.createElement("tr");
-      row.innerHTML = `
-        <td>${fmt(targetA, 2)}</td>
-        <td>${fmt(targetB, 2)}</td>
-        <td>${invalid ? "-" : fmt(volA, 3)}</td>
-        <td>${invalid ? "-" : fmt(volB, 3)}</td>
-        <td>${invalid ? "母液不足" : fmt(volMedia, 1)}</td>
-      `;
-      doubleBody.appendChild(row);
-    });
-  });
+    const notes = [`共 ${fmt(reply.count, 0)} 个组合。`];
 
-  if (!doubleBody.children.length) {
-    doubleWarning.textContent = "请输入药A与药B的终浓度序列 (μM)。";
-    return;
-  }
+    if (mode === "add") {
+      notes.push("方式B 已按 2X 计算配液浓度。");
+    }
 
-  if (hasError) {
-    notes.push("部分组合过高，当前母液浓度无法配制。");
-  }
+    if (reply.hasError) {
+      notes.push("部分组合过高，当前母液浓度无法配制。");
+    }
 
-  if (notes.length) {
     doubleWarning.textContent = notes.join(" ");
-  }
+  });
 });
 
+// =======================
+// Offline updates
+// =======================
+// A new version installs in the background; the banner lets the user switch when convenient
+// (never mid-calculation), then the page reloads once the new worker takes control.
+const updateBanner = document.getElementById("update-banner");
+let acceptedUpdate = false;
+
+function promptUpdate(worker) {
+  updateBanner.hidden = false;
+  document.getElementById("update-reload").onclick = () => {
+    acceptedUpdate = true;
+    worker.postMessage({ type: "SKIP_WAITING" });
+  };
+}
+
 if ("serviceWorker" in navigator) {
   window.addEventListener("load", () => {
-    navigator.serviceWorker.register("./sw.js").catch(() => {});
+    navigator.serviceWorker
+      .register("./sw.js", { updateViaCache: "none" })
+      .then((registration) => {
+        if (registration.waiting && navigator.serviceWorker.controller) {
+          promptUpdate(registration.waiting);
+        }
+        registration.addEventListener("updatefound", () => {
+          const worker = registration.installing;
+          worker.addEventListener("statechange", () => {
+            if (worker.state === "installed" && navigator.serviceWorker.controller) {
+              promptUpdate(worker);
+            }
+          });
+        });
+        // The page may stay open at the hood for hours: re-check whenever it comes back.
+        document.addEventListener("visibilitychange", () => {
+          if (document.visibilityState === "visible") registration.update().catch(() => {});
+        });
+      })
+      .catch(() => {});
+
+    navigator.serviceWorker.addEventListener("controllerchange", () => {
+      if (acceptedUpdate) window.location.reload();
+    });
   });
 }
+
+// =======================
+// Load timing
+// =======================
+// Each page load (navigation start -> load event end) is kept in localStorage, split into
+// first loads (network, no service worker yet) and repeat loads (served from the offline cache).
+const LOAD_HISTORY_KEY = "mtt-load-times";
+const LOAD_HISTORY_SIZE = 20;
+
+const median = (values) => {
+  const sorted = [...values].sort((a, b) => a - b);
+  return sorted.length ? sorted[Math.floor(sorted.length / 2)] : NaN;
+};
+
+window.addEventListener("load", () => {
+  // loadEventEnd is only filled in after the load handlers have returned.
+  setTimeout(() => {
+    const [nav] = performance.getEntriesByType("navigation");
+    if (!nav) return;
+    const entry = {
+      ms: Math.round(nav.loadEventEnd || performance.now()),
+      cached: Boolean(navigator.serviceWorker && navigator.serviceWorker.controller),
+    };
+    let history = [];
+    try {
+      history = JSON.parse(localStorage.getItem(LOAD_HISTORY_KEY)) || [];
+      history = [...history, entry].slice(-LOAD_HISTORY_SIZE);
+      localStorage.setItem(LOAD_HISTORY_KEY, JSON.stringify(history));
+    } catch (err) {
+      history = [entry];
+    }
+    const first = history.filter((item) => !item.cached).map((item) => item.ms);
+    const repeat = history.filter((item) => item.cached).map((item) => item.ms);
+    const parts = [`本次加载 ${entry.ms} ms (${entry.cached ? "离线缓存" : "网络"})`];
+    if (first.length) parts.push(`首次加载中位数 ${median(first)} ms`);
+    if (repeat.length) parts.push(`重复加载中位数 ${median(repeat)} ms (${repeat.length} 次)`);
+    document.getElementById("load-info").textContent = parts.join(" · ");
+    console.info("[mtt] load", entry, { first, repeat });
+  }, 0);
+});
@@ -0,0 +1,210 @@
+﻿"use strict";
+
+// Plan computation for the mobile page. Runs inside a Web Worker (see app.js) so large
+// matrices never block the tab; loaded as a plain script as well, as the fallback when
+// workers are unavailable (e.g. MTT.html opened from file://).
+//
+// runPlan(message, post) handles one request and reports through post(reply, transferList):
+//   { kind: "single", ... } -> { type: "single", steps }, { type: "single", error } or { type: "single", results, ... }
+//   { kind: "double", ... } -> { type: "batch", start, values, invalid } ... then { type: "done", count, hasError }
+
+// Matrix rows per posted batch; values holds MATRIX_COLUMNS numbers per row.
+const PLAN_BATCH_ROWS = 2048;
+const MATRIX_COLUMNS = 5; // targetA, targetB, volA, volB, volMedia
+// Most intermediate tubes between two targets (same limit as mtt_core.chain).
+const MAX_INTERMEDIATE = 100;
+
+// Whole-chain solver: every transfer (stock included) >= minVol.
+// Inserts geometric intermediate tubes when one step would need more than maxVol,
+// then walks low -> high growing tubes whose transfer is too small.
+// Throws RangeError when maxVol <= minVol or the span needs too many intermediate tubes.
+function solveChain(stockUM, solutions, baseVol, minVol, maxVol) {
+  const concs = [];
+  const sources = [];
+  const intermediate = [];
+  let source = stockUM;
+  const limited = maxVol > 0 && minVol > 0;
+  if (limited && maxVol <= minVol) {
+    throw new RangeError("单管最大体积必须大于最小取样体积。");
+  }
+
+  solutions.forEach((conc) => {
+    const ratio = source / conc;
+    if (limited && ratio > maxVol / minVol) {
+      const steps = Math.ceil(Math.log(ratio) / Math.log(maxVol / minVol));
+      if (!(steps - 1 <= MAX_INTERMEDIATE)) {
+        throw new RangeError("需插入的中间稀释管过多，请增大单管最大体积或减小最小取样体积。");
+      }
+      const factor = ratio ** (1 / steps);
+      for (let k = 1; k < steps; k += 1) {
+        concs.push(Number((source / factor ** k).toPrecision(3)));
+        sources.push(k === 1 ? source : concs[concs.length - 2]);
+        intermediate.push(true);
+      }
+      source = concs[concs.length - 1];
+    }
+    concs.push(conc);
+    sources.push(source);
+    intermediate.push(false);
+    source = conc;
+  });
+
+  const results = new Array(concs.length);
+  let carry = 0;
+  for (let index = concs.length - 1; index >= 0; index -= 1) {
+    let totalVol = intermediate[index] ? carry : baseVol + carry;
+    let transferVol = (concs[index] * totalVol) / sources[index];
+    const expanded = transferVol < minVol;
+    if (expanded) {
+      transferVol = minVol;
+      totalVol = (minVol * sources[index]) / concs[index];
+    }
+    results[index] = {
+      solution: concs[index],
+      sourceSolution: sources[index],
+      transferVol,
+      mediaVol: totalVol - transferVol,
+      totalVol,
+      intermediate: intermediate[index],
+      expanded,
+    };
+    carry = transferVol;
+  }
+  return results;
+}
+
+// Serial dilution where only the stock transfer is grown to minStockVol;
+// each tube's volume includes what the next tube draws from it.
+function solveSerial(stockUM, chainTargets, multiplier, baseVol, minStockVol) {
+  const calcData = chainTargets.map((target, index) => {
+    const solution = target * multiplier;
+    const isStock = index === 0;
+    const sourceSolution = isStock ? stockUM : chainTargets[index - 1] * multiplier;
+    return { target, solution, sourceSolution, isStock };
+  });
+
+  const transferNeeds = new Array(calcData.length).fill(0);
+  const results = new Array(calcData.length);
+  let smallTransfers = false;
+  let hasError = false;
+  let stockAdjust = null;
+
+  for (let index = calcData.length - 1; index >= 0; index -= 1) {
+    const item = calcData[index];
+    const baseTotalVol = baseVol + transferNeeds[index];
+    let totalVol = baseTotalVol;
+    let transferVol = (item.solution * totalVol) / item.sourceSolution;
+
+    if (item.isStock && transferVol > 0 && transferVol < minStockVol) {
+      const factor = minStockVol / transferVol;
+      totalVol = baseTotalVol * factor;
+      transferVol = minStockVol;
+      stockAdjust = { from: baseTotalVol, to: totalVol };
+    }
+
+    if (!item.isStock) {
+      transferNeeds[index - 1] += transferVol;
+      if (transferVol > 0 && transferVol < minStockVol) {
+        smallTransfers = true;
+      }
+    }
+
+    const mediaVol = totalVol - transferVol;
+    const invalid = !Number.isFinite(mediaVol) || mediaVol < 0;
+
+    if (invalid) {
+      hasError = true;
+    }
+
+    results[index] = { ...item, transferVol, mediaVol, totalVol, invalid };
+  }
+  return { results, smallTransfers, hasError, stockAdjust };
+}
+
+// Lazily yields every combination of k concentration series (last series varies fastest),
+// so k-drug matrices never need the full Cartesian product in memory.
+function* iterCombos(seriesList) {
+  if (!seriesList.length || seriesList.some((series) => !series.length)) return;
+  const index = new Array(seriesList.length).fill(0);
+  while (true) {
+    yield index.map((i, d) => seriesList[d][i]);
+    let d = index.length - 1;
+    while (d >= 0) {
+      index[d] += 1;
+      if (index[d] < seriesList[d].length) break;
+      index[d] = 0;
+      d -= 1;
+    }
+    if (d < 0) return;
+  }
+}
+
+// A x B matrix, posted in PLAN_BATCH_ROWS batches of typed arrays (transferred, not copied).
+function planMatrix(message, post) {
+  const { targetsA, targetsB, stockAUM, stockBUM, totalVol, multiplier } = message;
+  let values = new Float64Array(PLAN_BATCH_ROWS * MATRIX_COLUMNS);
+  let invalid = new Uint8Array(PLAN_BATCH_ROWS);
+  let rows = 0;
+  let count = 0;
+  let hasError = false;
+
+  const flush = () => {
+    const batchValues = values.slice(0, rows * MATRIX_COLUMNS);
+    const batchInvalid = invalid.slice(0, rows);
+    post({ type: "batch", start: count - rows, values: batchValues, invalid: batchInvalid }, [
+      batchValues.buffer,
+      batchInvalid.buffer,
+    ]);
+    rows = 0;
+  };
+
+  for (const [targetA, targetB] of iterCombos([targetsA, targetsB])) {
+    const volA = (targetA * multiplier * totalVol) / stockAUM;
+    const volB = (targetB * multiplier * totalVol) / stockBUM;
+    const volMedia = totalVol - volA - volB;
+    const bad = !Number.isFinite(volMedia) || volMedia < 0;
+    hasError = hasError || bad;
+
+    const offset = rows * MATRIX_COLUMNS;
+    values[offset] = targetA;
+    values[offset + 1] = targetB;
+    values[offset + 2] = volA;
+    values[offset + 3] = volB;
+    values[offset + 4] = volMedia;
+    invalid[rows] = bad ? 1 : 0;
+    rows += 1;
+    count += 1;
+    if (rows === PLAN_BATCH_ROWS) flush();
+  }
+  if (rows) flush();
+  post({ type: "done", count, hasError });
+}
+
+function runPlan(message, post) {
+  if (message.kind === "single") {
+    const { stockUM, chainTargets, multiplier, baseVol, minVol, maxVol, wholeChain } = message;
+    if (wholeChain) {
+      const solutions = chainTargets.map((target) => target * multiplier);
+      let steps;
+      try {
+        steps = solveChain(stockUM, solutions, baseVol, minVol, maxVol);
+      } catch (err) {
+        if (!(err instanceof RangeError)) throw err;
+        post({ type: "single", error: err.message });
+        return;
+      }
+      post({ type: "single", steps });
+    } else {
+      post({ type: "single", ...solveSerial(stockUM, chainTargets, multiplier, baseVol, minVol) });
+    }
+  } else if (message.kind === "double") {
+    planMatrix(message, post);
+  }
+}
+
+if (typeof WorkerGlobalScope !== "undefined" && self instanceof WorkerGlobalScope) {
+  self.onmessage = (event) => {
+    const { id } = event.data;
+    runPlan(event.data, (reply, transfer = []) => self.postMessage({ id, ...reply }, transfer));
+  };
+}
@@ -0,0 +1,10 @@
+// Generated by tools/build_web.py from file contents; do not edit by hand.
+self.PRECACHE_VERSION = "6a085d546a8c";
+self.PRECACHE_ASSETS = [
+  { url: "./MTT.html", revision: "c68f2de1cbb0" },
+  { url: "./styles.css", revision: "ea9957eae0d4" },
+  { url: "./app.js", revision: "385a36b73e09" },
+  { url: "./planner.js", revision: "c57c8552ce87" },
+  { url: "./manifest.json", revision: "38de17a4e1e9" },
+  { url: "./icon.svg", revision: "81a43638d34b" },
+];
@@ -1,29 +1,94 @@
-﻿const CACHE_NAME = "mtt-assistant-v1";
-const ASSETS = [
-  "./",
-  "./index.html",
-  "./styles.css",
-  "./app.js",
-  "./manifest.json",
-  "./icon.svg"
-];
+﻿"use strict";
+
+// Offline shell for the mobile page.
+// - Precache: the files listed in precache-manifest.js (generated by tools/build_web.py from
+//   content hashes) live in one cache per version and are served cache-first, so a page never
+//   mixes files from two versions.
+// - Updates: the browser re-checks sw.js and the manifest on navigation; a changed manifest
+//   installs a new worker in the background, which waits until the page's refresh prompt
+//   asks it to take over (SKIP_WAITING).
+// - Anything else on this origin is stale-while-revalidate from a runtime cache.
+importScripts("./precache-manifest.js");
+
+const PRECACHE = `mtt-precache-${self.PRECACHE_VERSION}`;
+const RUNTIME = "mtt-runtime";
+const ENTRY = new URL(self.PRECACHE_ASSETS[0].url, self.registration.scope).href;
+const PRECACHE_URLS = new Set(
+  self.PRECACHE_ASSETS.map((asset) => new URL(asset.url, self.registration.scope).href)
+);
 
 self.addEventListener("install", (event) => {
-  event.waitUntil(
-    caches.open(CACHE_NAME).then((cache) => cache.addAll(ASSETS))
-  );
+  // Bypass the HTTP cache so a new version never precaches stale copies.
+  const requests = [...PRECACHE_URLS].map((url) => new Request(url, { cache: "reload" }));
+  event.waitUntil(caches.open(PRECACHE).then((cache) => cache.addAll(requests)));
 });
 
 self.addEventListener("activate", (event) => {
   event.waitUntil(
-    caches.keys().then((keys) =>
-      Promise.all(keys.filter((key) => key !== CACHE_NAME).map((key) => caches.delete(key)))
-    )
+    caches
+      .keys()
+      .then((keys) =>
+        Promise.all(
+          keys
+            .filter((key) => key.startsWith("mtt-") && key !== PRECACHE && key !== RUNTIME)
+            .map((key) => caches.delete(key))
+        )
+      )
+      .then(() => self.clients.claim())
   );
 });
 
+self.addEventListener("message", (event) => {
+  if (event.data && event.data.type === "SKIP_WAITING") {
+    self.skipWaiting();
+  }
+});
+
+async function fromPrecache(url) {
+  const cache = await caches.open(PRECACHE);
+  return cache.match(url);
+}
+
+// Navigations inside the scope (including "./") get the precached entry page; unknown pages
+// go to the network and fall back to the entry page when offline.
+async function navigate(request, url) {
+  if (PRECACHE_URLS.has(url) || url === self.registration.scope) {
+    return (await fromPrecache(url === self.registration.scope ? ENTRY : url)) || fetch(request);
+  }
+  try {
+    return await fetch(request);
+  } catch (err) {
+    return (await fromPrecache(ENTRY)) || Response.error();
+  }
+}
+
+async function staleWhileRevalidate(event) {
+  const cache = await caches.open(RUNTIME);
+  const cached = await cache.match(event.request);
+  const network = fetch(event.request).then((response) => {
+    if (response.ok) {
+      cache.put(event.request, response.clone());
+    }
+    return response;
+  });
+  if (cached) {
+    event.waitUntil(network.catch(() => {}));
+    return cached;
+  }
+  return network;
+}
+
 self.addEventListener("fetch", (event) => {
-  event.respondWith(
-    caches.match(event.request).then((cached) => cached || fetch(event.request))
-  );
+  const { request } = event;
+  const url = new URL(request.url);
+  if (request.method !== "GET" || url.origin !== self.location.origin) return;
+  const key = url.origin + url.pathname;
+
+  if (request.mode === "navigate") {
+    event.respondWith(navigate(request, key));
+  } else if (PRECACHE_URLS.has(key)) {
+    event.respondWith(fromPrecache(key).then((cached) => cached || fetch(request)));
+  } else {
+    event.respondWith(staleWhileRevalidate(event));
+  }
 });
@@ -2,6 +2,17 @@
 import tkinter as tk
 from tkinter import ttk, messagebox
 
+from mtt_core import (
+    BLANK,
+    INSUFFICIENT,
+    ResultTable,
+    calc_seeding_plan,
+    direct_table,
+    matrix_plan,
+    parse_pairs,
+)
+from mtt_tk import BATCH_ROWS, BackgroundJob, VirtualTable, summarize
+
 
 class MTTLabAssistant:
     def __init__(self, root):
@@ -97,31 +108,24 @@ class MTTLabAssistant:
             if sq <= 0 or vol_per_well <= 0 or wells_per_plate <= 0 or plates <= 0:
                 raise ValueError
 
-            conc_cells_ml = (n / sq) * 10000 * df
-            target_conc = target_per_well / vol_per_well
-            total_wells = wells_per_plate * plates
-            total_prep_vol = (total_wells * vol_per_well) + safety
-
-            if conc_cells_ml <= 0 or target_conc <= 0 or total_prep_vol <= 0:
+            plan = calc_seeding_plan(
+                n, sq, df, target_per_well, vol_per_well, plates, safety, wells_per_plate
+            )
+            if plan is None or plan.conc_cells_ml <= 0 or plan.target_conc <= 0 or plan.total_prep_vol <= 0:
                 raise ValueError
 
-            vol_cell_stock = (target_conc * total_prep_vol) / conc_cells_ml
-            vol_medium = total_prep_vol - vol_cell_stock
-
-            if vol_medium < 0:
+            if plan.vol_medium < 0:
                 messagebox.showwarning("警告", "原液浓度偏低，无法配到目标浓度。")
 
-            total_cells_needed = target_per_well * total_wells
-
             res_text = (
                 f"【计算结果】\n"
-                f"1. 原液细胞密度: {conc_cells_ml/10000:.2f} x 10^4 /mL\n"
-                f"2. 铺板液目标密度: {target_conc/10000:.2f} x 10^4 /mL\n"
-                f"3. 需要细胞总数: {total_cells_needed:,.0f} 个\n"
-                f"4. 需配制总体积: {total_prep_vol:.2f} mL (含余量)\n\n"
+                f"1. 原液细胞密度: {plan.conc_cells_ml/10000:.2f} x 10^4 /mL\n"
+                f"2. 铺板液目标密度: {plan.target_conc/10000:.2f} x 10^4 /mL\n"
+                f"3. 需要细胞总数: {plan.total_cells:,.0f} 个\n"
+                f"4. 需配制总体积: {plan.total_prep_vol:.2f} mL (含余量)\n\n"
                 f"操作方案:\n"
-                f"  取细胞悬液: {vol_cell_stock:.3f} mL ({vol_cell_stock*1000:.1f} μL)\n"
-                f"  + 培养基  : {vol_medium:.3f} mL"
+                f"  取细胞悬液: {plan.vol_cell_stock:.3f} mL ({plan.vol_cell_stock*1000:.1f} μL)\n"
+                f"  + 培养基  : {plan.vol_medium:.3f} mL"
             )
             self.seed_result_label.config(text=res_text)
 
@@ -200,17 +204,16 @@ class MTTLabAssistant:
                 if x.strip()
             ]
 
-            for t in targets:
-                solution = t * multiplier
-                if solution == 0:
+            table = direct_table(targets, stock, total_vol, multiplier)
+            too_high = []
+            for solution, _, v_stock, v_media, _, flags in table.iter_rows():
+                t = solution / multiplier
+                if flags & BLANK:
                     self.tree1.insert("", "end", values=(t, solution, 0, f"{total_vol:.1f}"))
                     continue
 
-                v_stock = (solution * total_vol) / stock
-                v_media = total_vol - v_stock
-
-                if v_media < 0:
-                    messagebox.showwarning("警告", f"终浓度 {t} μM 过高，母液不足以配制")
+                if flags & INSUFFICIENT:
+                    too_high.append(f"终浓度 {t} μM")
                     continue
 
                 self.tree1.insert(
@@ -218,6 +221,8 @@ class MTTLabAssistant:
                     "end",
                     values=(t, f"{solution:.2f}", f"{v_stock:.3f}", f"{v_media:.1f}"),
                 )
+            if too_high:
+                messagebox.showwarning("警告", summarize("以下浓度过高，母液不足以配制，已跳过", too_high))
 
         except ValueError:
             messagebox.showerror("错误", "请输入有效数字，注意单位换算 (母液mM, 目标μM)")
@@ -280,25 +285,30 @@ class MTTLabAssistant:
         self.text_input.insert("1.0", "10, 0\n10, 10\n10, 20\n20, 20\n")
 
         ttk.Button(tab, text="计算混合配方", command=self.calc_double).pack(pady=5)
-
-        columns = ("conc_a", "conc_b", "vol_a", "vol_b", "vol_media")
-        self.tree2 = ttk.Treeview(tab, columns=columns, show="headings", height=9)
-        self.tree2.heading("conc_a", text="药A终浓度")
-        self.tree2.heading("conc_b", text="药B终浓度")
-        self.tree2.heading("vol_a", text="加药A (μL)")
-        self.tree2.heading("vol_b", text="加药B (μL)")
-        self.tree2.heading("vol_media", text="加培养基 (μL)")
-
-        self.tree2.column("conc_a", width=100)
-        self.tree2.column("conc_b", width=100)
-        self.tree2.column("vol_a", width=110)
-        self.tree2.column("vol_b", width=110)
-        self.tree2.column("vol_media", width=120)
-
+        self.double_job = None
+        self.double_status = ttk.Label(tab, text="", foreground="gray")
+        self.double_status.pack(anchor="w", padx=10)
+
+        self.tree2 = VirtualTable(
+            tab,
+            [
+                ("conc_a", "药A终浓度", 100),
+                ("conc_b", "药B终浓度", 100),
+                ("vol_a", "加药A (μL)", 110),
+                ("vol_b", "加药B (μL)", 110),
+                ("vol_media", "加培养基 (μL)", 120),
+            ],
+            height=9,
+        )
         self.tree2.pack(fill="both", expand=True, padx=10, pady=10)
 
     def calc_double(self):
-        self._clear_tree(self.tree2)
+        # 解析与计算在后台线程中分批进行；母液不足的组合与格式错误的行最后汇总为一次提示
+        if self.double_job is not None:
+            self.double_job.cancel()
+            self.double_job = None
+        self.tree2.clear()
+        self.double_status.config(text="")
 
         try:
             stock_a = float(self.d_stock_a.get())
@@ -309,47 +319,64 @@ class MTTLabAssistant:
 
             if stock_a <= 0 or stock_b <= 0 or total_vol <= 0:
                 raise ValueError
-
-            content = self.text_input.get("1.0", tk.END).strip()
-            lines = content.split("\n") if content else []
-
-            for line in lines:
-                line = line.strip().replace("，", ",")
-                if not line or "," not in line:
-                    continue
-
-                parts = [p.strip() for p in line.split(",") if p.strip()]
-                if len(parts) < 2:
-                    continue
-
-                target_a = float(parts[0])
-                target_b = float(parts[1])
-
-                solution_a = target_a * multiplier
-                solution_b = target_b * multiplier
-
-                vol_a = (solution_a * total_vol) / stock_a
-                vol_b = (solution_b * total_vol) / stock_b
-                vol_media = total_vol - vol_a - vol_b
-
-                if vol_media < 0:
-                    messagebox.showwarning("警告", f"浓度 {target_a}, {target_b} 过高，母液不足以配制")
-                    continue
-
-                self.tree2.insert(
-                    "",
-                    "end",
-                    values=(
-                        f"{target_a:g}",
-                        f"{target_b:g}",
-                        f"{vol_a:.3f}",
-                        f"{vol_b:.3f}",
-                        f"{vol_media:.1f}",
-                    ),
-                )
-
         except ValueError:
             messagebox.showerror("错误", "请输入有效数字。")
+            return
+
+        content = self.text_input.get("1.0", tk.END).strip()
+        errors = []
+        too_high = []
+        n_too_high = [0]
+
+        def work(cancelled):
+            conc_a, conc_b = parse_pairs(content, errors)
+            for start in range(0, len(conc_a), BATCH_ROWS):
+                if cancelled():
+                    return
+                stop = start + BATCH_ROWS
+                table = matrix_plan(
+                    conc_a[start:stop], conc_b[start:stop], stock_a, stock_b, total_vol, multiplier
+                )
+                valid = table.valid()
+                yield ResultTable(table.data[valid]), ResultTable(table.data[~valid])
+
+        def format_cell(row):
+            target_a, target_b, _, _, vol_a, vol_b, vol_media, _ = row
+            return (
+                f"{target_a:g}",
+                f"{target_b:g}",
+                f"{vol_a:.3f}",
+                f"{vol_b:.3f}",
+                f"{vol_media:.1f}",
+            )
+
+        def on_batch(batch):
+            shown, short = batch
+            self.tree2.append(shown, format_cell)
+            n_too_high[0] += len(short)
+            for target_a, target_b, *_ in short.iter_rows(stop=10 - len(too_high)):
+                too_high.append(f"浓度 {target_a:g}, {target_b:g}")
+            done = len(self.tree2) + n_too_high[0]
+            self.double_status.config(text=f"计算中... 已完成 {done} 个组合")
+
+        def on_done(error):
+            self.double_job = None
+            self.double_status.config(text=f"共 {len(self.tree2)} 个组合" if error is None else "")
+            if error is not None:
+                messagebox.showerror("错误", str(error))
+                return
+            warnings = []
+            if errors:
+                lines = [f"第 {e.line} 行 \"{e.text}\"：{e.reason}" for e in errors[:10]]
+                warnings.append(summarize(f"{len(errors)} 行格式有误，已跳过", lines, len(errors)))
+            if n_too_high[0]:
+                title = f"{n_too_high[0]} 个组合浓度过高，母液不足以配制，已跳过"
+                warnings.append(summarize(title, too_high, n_too_high[0]))
+            if warnings:
+                messagebox.showwarning("警告", "\n\n".join(warnings))
+
+        self.double_status.config(text="计算中...")
+        self.double_job = BackgroundJob(self.root, work, on_batch, on_done)
 
 
 if __name__ == "__main__":
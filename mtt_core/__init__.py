@@ -0,0 +1,188 @@
+# -*- coding: utf-8 -*-
+# MTT 配液计算核心：不依赖任何界面 (tkinter / Streamlit)，三个前端与批处理脚本共用
+# 子模块按需加载：import mtt_core 本身不导入 numpy，首次用到某个名字时才导入其所在子模块，
+# 纯 Python 部分 (chain / seeding / cache / plans / flags) 可在 30 ms 内完成导入
+import importlib
+
+_EXPORTS = {
+    "LRUCache": "cache",
+    "memoize": "cache",
+    "plan_cache": "cache",
+    "CampaignPlan": "campaign",
+    "all_pairs": "campaign",
+    "iter_campaign_blocks": "campaign",
+    "plan_campaign": "campaign",
+    "plan_pair_block": "campaign",
+    "stock_blocks": "campaign",
+    "ChainStep": "chain",
+    "solve_chain": "chain",
+    "ComboPlan": "combo",
+    "calc_combo_block": "combo",
+    "combo_block": "combo",
+    "combo_page": "combo",
+    "count_combinations": "combo",
+    "iter_combinations": "combo",
+    "iter_combo_plan": "combo",
+    "DilutionPlan": "dilution",
+    "calc_dilution_batch": "dilution",
+    "normalize_series": "dilution",
+    "EXPORT_FORMATS": "exporter",
+    "export_blocks": "exporter",
+    "flag_notes": "exporter",
+    "iter_combo_blocks": "exporter",
+    "iter_frame_blocks": "exporter",
+    "iter_table_blocks": "exporter",
+    "seeding_blocks": "exporter",
+    "write_csv": "exporter",
+    "write_parquet": "exporter",
+    "write_xlsx": "exporter",
+    "BLANK": "flags",
+    "EXPANDED": "flags",
+    "FROM_STOCK": "flags",
+    "INSUFFICIENT": "flags",
+    "INTERMEDIATE": "flags",
+    "FIT_DTYPE": "ic50",
+    "fit_4pl": "ic50",
+    "fit_notes": "ic50",
+    "fit_plate_map": "ic50",
+    "percent_of_control": "ic50",
+    "PairChunk": "importer",
+    "PairError": "importer",
+    "detect_format": "importer",
+    "iter_pair_chunks": "importer",
+    "iter_text_rows": "importer",
+    "iter_xlsx_rows": "importer",
+    "load_pairs": "importer",
+    "parse_pair_fields": "importer",
+    "LiveChain": "live",
+    "LiveMatrix": "live",
+    "Metrics": "metrics",
+    "metrics": "metrics",
+    "MatrixPlan": "matrix",
+    "TwoStagePlan": "matrix",
+    "calc_matrix": "matrix",
+    "grid_pairs": "matrix",
+    "parse_pairs": "matrix",
+    "plan_two_stage": "matrix",
+    "matrix_plan": "plans",
+    "parse_targets": "plans",
+    "single_plan": "plans",
+    "PlateMap": "readout",
+    "PlateRead": "readout",
+    "PlateStack": "readout",
+    "ReadoutError": "readout",
+    "iter_plates": "readout",
+    "load_plates": "readout",
+    "map_plates": "readout",
+    "plate_layout": "readout",
+    "plate_levels": "readout",
+    "subtract_reference": "readout",
+    "well_index": "readout",
+    "CELL_DTYPE": "records",
+    "STEP_DTYPE": "records",
+    "ResultTable": "records",
+    "dilution_table": "records",
+    "direct_table": "records",
+    "matrix_table": "records",
+    "step_table": "records",
+    "SeedingPlan": "seeding",
+    "calc_seeding_plan": "seeding",
+}
+
+__all__ = [
+    "BLANK",
+    "CELL_DTYPE",
+    "EXPANDED",
+    "EXPORT_FORMATS",
+    "FIT_DTYPE",
+    "FROM_STOCK",
+    "INSUFFICIENT",
+    "INTERMEDIATE",
+    "STEP_DTYPE",
+    "CampaignPlan",
+    "ChainStep",
+    "ComboPlan",
+    "DilutionPlan",
+    "LRUCache",
+    "LiveChain",
+    "LiveMatrix",
+    "MatrixPlan",
+    "Metrics",
+    "PairChunk",
+    "PairError",
+    "PlateMap",
+    "PlateRead",
+    "PlateStack",
+    "ReadoutError",
+    "ResultTable",
+    "SeedingPlan",
+    "TwoStagePlan",
+    "all_pairs",
+    "calc_combo_block",
+    "calc_dilution_batch",
+    "calc_matrix",
+    "calc_seeding_plan",
+    "combo_block",
+    "combo_page",
+    "count_combinations",
+    "detect_format",
+    "dilution_table",
+    "direct_table",
+    "export_blocks",
+    "fit_4pl",
+    "fit_notes",
+    "fit_plate_map",
+    "flag_notes",
+    "grid_pairs",
+    "iter_campaign_blocks",
+    "iter_combinations",
+    "iter_combo_blocks",
+    "iter_combo_plan",
+    "iter_frame_blocks",
+    "iter_pair_chunks",
+    "iter_plates",
+    "iter_table_blocks",
+    "iter_text_rows",
+    "iter_xlsx_rows",
+    "load_pairs",
+    "load_plates",
+    "map_plates",
+    "matrix_plan",
+    "matrix_table",
+    "memoize",
+    "metrics",
+    "normalize_series",
+    "parse_pair_fields",
+    "parse_pairs",
+    "parse_targets",
+    "percent_of_control",
+    "plan_cache",
+    "plan_campaign",
+    "plan_pair_block",
+    "plan_two_stage",
+    "plate_layout",
+    "plate_levels",
+    "seeding_blocks",
+    "single_plan",
+    "solve_chain",
+    "step_table",
+    "stock_blocks",
+    "subtract_reference",
+    "well_index",
+    "write_csv",
+    "write_parquet",
+    "write_xlsx",
+]
+
+
+def __getattr__(name):
+    module = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(f".{module}", __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
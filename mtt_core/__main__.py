@@ -0,0 +1,8 @@
+# -*- coding: utf-8 -*-
+# python -m mtt_core：JSONL 批处理入口，见 mtt_core/batch.py
+import sys
+
+from .batch import main
+
+if __name__ == "__main__":
+    sys.exit(main())
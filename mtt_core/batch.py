@@ -0,0 +1,256 @@
+# -*- coding: utf-8 -*-
+# 无界面批处理：每行一个 JSON 请求 (JSONL)，逐行计算、逐行输出 JSON 结果
+# 单位与界面一致：母液 mM，浓度 μM，配液体积 μL；铺板体积 mL
+#
+#   {"id": "s1", "type": "seeding", "count": 120, "target_per_well": 5000, "vol_per_well": 0.09}
+#   {"id": "d1", "type": "single", "stock_mm": 10, "targets": [0, 1, 10, 100], "needed_vol": 1000}
+#   {"id": "m1", "type": "matrix", "stock_a_mm": 10, "stock_b_mm": 10, "total_vol": 1000,
+#    "pairs": [[0, 0], [10, 20]]}
+#
+# 输出：{"id", "type", "ok": true, "result": {...}} 或 {"id", "line", "ok": false, "error": "..."}
+import argparse
+import itertools
+import json
+import math
+import os
+import sys
+
+from .flags import FLAG_NOTES
+from .plans import parse_targets, single_plan
+from .seeding import calc_seeding_plan
+
+
+def _number(request, name, default=None):
+    value = request.get(name, default)
+    if value is None:
+        raise ValueError(f"缺少参数 {name}")
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        raise ValueError(f"参数 {name} 需为数字")
+    return float(value)
+
+
+_NOT_FINITE = (math.inf, -math.inf)
+
+
+def _clean(value):
+    # JSON 不支持 NaN / inf，统一写为 null
+    return None if value != value or value in _NOT_FINITE else value
+
+
+def _note(flags):
+    for flag, note in FLAG_NOTES:
+        if flags & flag:
+            return note
+    return ""
+
+
+def table_rows(table):
+    # ResultTable -> [{字段: 值, ..., "note": 备注}]；备注与导出文件一致
+    fields = table.fields
+    return [dict(zip(fields, map(_clean, row)), note=_note(row[-1])) for row in table.iter_rows()]
+
+
+def run_seeding(request):
+    wells_per_plate = _number(request, "wells_per_plate", 96)
+    squares = _number(request, "squares", 4)
+    vol_per_well = _number(request, "vol_per_well")
+    if squares <= 0 or vol_per_well <= 0 or wells_per_plate <= 0:
+        raise ValueError("计数格数、每孔体积、每块孔数必须大于 0")
+    plan = calc_seeding_plan(
+        _number(request, "count"),
+        squares,
+        _number(request, "dilution", 1),
+        _number(request, "target_per_well"),
+        vol_per_well,
+        _number(request, "plates", 1),
+        _number(request, "safety", 2),
+        wells_per_plate,
+    )
+    if plan is None:
+        raise ValueError("细胞计数为 0")
+    return {name: _clean(float(value)) for name, value in plan._asdict().items()}
+
+
+def run_single(request):
+    stock_mm = _number(request, "stock_mm")
+    needed_vol = _number(request, "needed_vol")
+    if stock_mm <= 0 or needed_vol <= 0:
+        raise ValueError("母液浓度与每管需用量必须大于 0")
+    targets = request.get("targets")
+    if isinstance(targets, str):
+        targets = parse_targets(targets)
+    elif not isinstance(targets, list) or not targets:
+        raise ValueError("targets 需为浓度列表或逗号分隔的字符串")
+    whole_chain = bool(request.get("whole_chain", True))
+    table = single_plan(
+        stock_mm * 1000,
+        [float(t) for t in targets],
+        needed_vol,
+        _number(request, "min_pipette", 2),
+        whole_chain,
+        _number(request, "max_vol", 5000) if whole_chain else None,
+    )
+    return {"rows": table_rows(table)}
+
+
+def _pairs(request):
+    from .matrix import grid_pairs
+
+    if "pairs" in request:
+        pairs = request["pairs"]
+        return [float(p[0]) for p in pairs], [float(p[1]) for p in pairs]
+    if "series_a" in request and "series_b" in request:
+        return grid_pairs(request["series_a"], request["series_b"])
+    raise ValueError("需提供 pairs，或 series_a 与 series_b")
+
+
+def run_matrix(request):
+    from .matrix import plan_two_stage
+    from .plans import matrix_plan
+    from .records import matrix_table, step_table
+
+    stock_a = _number(request, "stock_a_mm") * 1000
+    stock_b = _number(request, "stock_b_mm") * 1000
+    total_vol = _number(request, "total_vol")
+    if stock_a <= 0 or stock_b <= 0 or total_vol <= 0:
+        raise ValueError("母液浓度与每管配制体积必须大于 0")
+    multiplier = _number(request, "multiplier", 1)
+    conc_a, conc_b = _pairs(request)
+
+    if not request.get("two_stage"):
+        return {"rows": table_rows(matrix_plan(conc_a, conc_b, stock_a, stock_b, total_vol, multiplier))}
+
+    fold = _number(request, "fold", 2)
+    plan = plan_two_stage(
+        conc_a,
+        conc_b,
+        stock_a,
+        stock_b,
+        total_vol,
+        fold_a=fold,
+        fold_b=fold,
+        min_pipette=_number(request, "min_pipette", 2),
+        max_vol=_number(request, "max_vol", 5000),
+        multiplier=multiplier,
+    )
+    return {
+        "tubes_a": table_rows(step_table(plan.tubes_a)),
+        "tubes_b": table_rows(step_table(plan.tubes_b)),
+        "rows": table_rows(matrix_table(plan.cells, plan.ws_a, plan.ws_b)),
+    }
+
+
+RUNNERS = {
+    "seeding": run_seeding,
+    "single": run_single,
+    "matrix": run_matrix,
+}
+
+
+def _json_safe(value):
+    # 原样回显的 id / type 需能写为 JSON：json.loads 接受 NaN / Infinity，输出时 allow_nan=False 不接受
+    try:
+        json.dumps(value, allow_nan=False)
+    except ValueError:
+        return False
+    return True
+
+
+def run_request(request):
+    # 单个请求 (dict) -> 结果 dict；出错时 ok 为 false 并给出原因，不抛出异常
+    # 批处理与 HTTP 接口共用，结果总能用 json.dumps(..., allow_nan=False) 写出
+    if not isinstance(request, dict):
+        return {"ok": False, "error": "请求需为 JSON 对象"}
+    kind = request.get("type")
+    if not (_json_safe(request.get("id")) and _json_safe(kind)):
+        return {"id": None, "ok": False, "error": "id 或 type 中含 NaN / Infinity，无法写为 JSON"}
+    response = {"id": request.get("id"), "type": kind}
+    runner = RUNNERS.get(kind)
+    if runner is None:
+        response.update(ok=False, error=f"未知的请求类型: {kind}")
+        return response
+    try:
+        response.update(ok=True, result=runner(request))
+    except (ValueError, TypeError, KeyError, IndexError, ArithmeticError) as exc:
+        # ArithmeticError 含 ZeroDivisionError 与 OverflowError (极大的输入)
+        response.update(ok=False, error=str(exc) or type(exc).__name__)
+    return response
+
+
+def process_line(item):
+    # (行号, 原始文本) -> (是否成功, 一行 JSON 输出)；在子进程中执行时只传递字符串
+    line_no, line = item
+    try:
+        request = json.loads(line)
+    except ValueError as exc:
+        response = {"ok": False, "error": f"JSON 格式错误: {exc}"}
+    else:
+        response = run_request(request)
+    if not response["ok"]:
+        response["line"] = line_no
+    return response["ok"], json.dumps(response, ensure_ascii=False, allow_nan=False)
+
+
+def iter_requests(paths):
+    # 逐行读取各输入 ("-" 为 stdin)，跳过空行；行号在所有输入中连续编号
+    line_no = 0
+    for path in paths:
+        stream = sys.stdin if path == "-" else open(path, encoding="utf-8-sig")
+        try:
+            for line in stream:
+                line_no += 1
+                if line.strip():
+                    yield line_no, line
+        finally:
+            if stream is not sys.stdin:
+                stream.close()
+
+
+def iter_results(items, jobs=1, chunk_size=64):
+    # 逐条产出 (是否成功, 输出行)，顺序与输入一致
+    # jobs > 1 时分窗口交给进程池，内存中最多保留 jobs * chunk_size * 4 条请求
+    if jobs <= 1:
+        for item in items:
+            yield process_line(item)
+        return
+
+    import multiprocessing
+
+    items = iter(items)
+    window = jobs * chunk_size * 4
+    with multiprocessing.Pool(jobs) as pool:
+        while True:
+            batch = list(itertools.islice(items, window))
+            if not batch:
+                break
+            yield from pool.imap(process_line, batch, chunk_size)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m mtt_core",
+        description="MTT 配液批处理：读取 JSONL 请求，输出 JSONL 结果",
+    )
+    parser.add_argument("inputs", nargs="*", default=["-"], help="输入文件，缺省或 - 为标准输入")
+    parser.add_argument("-o", "--output", default="-", help="输出文件，缺省为标准输出")
+    parser.add_argument("-j", "--jobs", type=int, default=1, help="并行进程数，0 为 CPU 核数")
+    parser.add_argument("--chunk-size", type=int, default=64, help="每次分给子进程的请求数")
+    parser.add_argument("--strict", action="store_true", help="有请求失败时退出码为 1")
+    args = parser.parse_args(argv)
+
+    jobs = args.jobs or os.cpu_count() or 1
+    out = sys.stdout if args.output == "-" else open(args.output, "w", encoding="utf-8")
+    total = failed = 0
+    try:
+        for ok, line in iter_results(iter_requests(args.inputs), jobs, max(1, args.chunk_size)):
+            out.write(line + "\n")
+            total += 1
+            failed += not ok
+    finally:
+        if out is not sys.stdout:
+            out.close()
+        else:
+            out.flush()
+
+    print(f"共 {total} 条请求，失败 {failed} 条", file=sys.stderr)
+    return 1 if args.strict and failed else 0
@@ -0,0 +1,125 @@
+# -*- coding: utf-8 -*-
+# 计算结果缓存：条目数 / 字节数上限 + LRU/TTL 淘汰，带命中统计；同一进程内所有会话共享
+import functools
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+
+def sizeof(value):
+    # 缓存值的大致内存占用 (字节)：DataFrame 按 memory_usage(deep=True)，numpy 数组按 nbytes，
+    # 元组 / 列表逐项累加 (前端缓存的是 (表格, 错误信息) 之类的元组)；不导入 pandas / numpy
+    if isinstance(value, (tuple, list)):
+        return sys.getsizeof(value) + sum(sizeof(item) for item in value)
+    memory_usage = getattr(value, "memory_usage", None)
+    if callable(memory_usage):
+        return int(memory_usage(index=True, deep=True).sum())
+    nbytes = getattr(value, "nbytes", None)
+    if isinstance(nbytes, int):
+        return nbytes
+    return sys.getsizeof(value)
+
+
+class LRUCache:
+    # maxbytes: 所有条目按 sizeof 估算的总字节数上限 (None 为不限)；单个条目超过上限时不缓存
+    def __init__(self, maxsize=256, ttl=None, clock=time.monotonic, maxbytes=None, sizeof=sizeof):
+        self.maxsize = maxsize
+        self.maxbytes = maxbytes
+        self.ttl = ttl
+        self._clock = clock
+        self._sizeof = sizeof
+        self._data = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.oversize = 0  # 超过 maxbytes 而未缓存的条目数
+
+    def get(self, key):
+        # 返回 (是否命中, 值)
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None:
+                expires, value, nbytes = entry
+                if expires is None or expires > self._clock():
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    return True, value
+                del self._data[key]
+                self._bytes -= nbytes
+                self.expirations += 1
+            self.misses += 1
+            return False, None
+
+    def put(self, key, value):
+        expires = None if not self.ttl else self._clock() + self.ttl
+        nbytes = self._sizeof(value) if self.maxbytes is not None else 0
+        with self._lock:
+            old = self._data.pop(key, None)
+            if old is not None:
+                self._bytes -= old[2]
+            if self.maxbytes is not None and nbytes > self.maxbytes:
+                self.oversize += 1
+                return
+            self._data[key] = (expires, value, nbytes)
+            self._bytes += nbytes
+            while len(self._data) > self.maxsize or (self.maxbytes is not None and self._bytes > self.maxbytes):
+                self._bytes -= self._data.popitem(last=False)[1][2]
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self._bytes = 0
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "bytes": self._bytes,
+                "maxbytes": self.maxbytes,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "oversize": self.oversize,
+            }
+
+    def __len__(self):
+        return len(self._data)
+
+
+def memoize(cache, key=None):
+    # key(*args, **kwargs) 返回归一化后的可哈希键；缺省按函数名 + 原始参数
+    def decorator(func):
+        name = func.__qualname__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if key is None:
+                cache_key = (name, args, tuple(sorted(kwargs.items())))
+            else:
+                cache_key = (name, key(*args, **kwargs))
+            hit, value = cache.get(cache_key)
+            if hit:
+                return value
+            value = func(*args, **kwargs)
+            cache.put(cache_key, value)
+            return value
+
+        wrapper.cache = cache
+        return wrapper
+
+    return decorator
+
+
+# Streamlit 等前端共用的默认缓存 (模块只导入一次，跨会话共享)；
+# 双药矩阵结果单条可达数十 MB，故同时按字节数限制
+PLAN_CACHE_BYTES = 256 * 1024 * 1024
+plan_cache = LRUCache(maxsize=512, ttl=3600, maxbytes=PLAN_CACHE_BYTES)
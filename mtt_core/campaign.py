@@ -0,0 +1,228 @@
+# -*- coding: utf-8 -*-
+# 药物组合库规划：化合物两两配对，每对一个 A×B 矩阵 (与 calc_double 相同的直接配制)，
+# 按块分发到进程池计算，汇总每对的配液量与每个化合物的母液总消耗
+from collections import namedtuple
+
+import numpy as np
+
+from .matrix import calc_matrix
+
+CampaignPlan = namedtuple(
+    "CampaignPlan",
+    [
+        "pair_a",  # (P,) 每对中药A的化合物序号
+        "pair_b",  # (P,) 药B的化合物序号
+        "n_cells",  # (P,) 该对矩阵的组合数
+        "n_insufficient",  # (P,) 母液不足、无法配制的组合数
+        "vol_a",  # (P,) 该对共取药A母液 (μL，仅计可配制的组合)
+        "vol_b",  # (P,) 共取药B母液 (μL)
+        "vol_media",  # (P,) 共加培养基 (μL)
+        "stock_used",  # (N,) 每个化合物在整个组合库中的母液总消耗 (μL)
+    ],
+)
+
+# 进程池子进程的共享输入，由 _init_worker 设置一次，避免每块重复传输
+_WORKER_STATE = None
+
+
+def _pad_series(series, n_compounds):
+    # 每个化合物各自的浓度序列 -> (N, L) 数组，长度不足处补 NaN；传入单个序列时所有化合物共用
+    if len(series) and np.ndim(series[0]) == 0:
+        series = [series] * n_compounds
+    if len(series) != n_compounds:
+        raise ValueError("浓度序列个数与化合物个数不一致")
+    width = max((len(s) for s in series), default=0)
+    padded = np.full((n_compounds, width), np.nan)
+    for i, s in enumerate(series):
+        padded[i, : len(s)] = s
+    return padded
+
+
+def all_pairs(n_compounds):
+    # 每个化合物与其他每个化合物配对一次 (i < j)
+    pair_a, pair_b = np.triu_indices(n_compounds, k=1)
+    return pair_a.astype(np.int64), pair_b.astype(np.int64)
+
+
+def plan_pair_block(series, stocks, total_vol, pair_a, pair_b, multiplier=1):
+    # 一块配对的矩阵一次性按数组计算：(P, La, Lb) 个组合展平后交给 calc_matrix
+    conc_a = series[pair_a][:, :, None]
+    conc_b = series[pair_b][:, None, :]
+    conc_a, conc_b = np.broadcast_arrays(conc_a, conc_b)
+    shape = conc_a.shape
+    stock_a = np.broadcast_to(stocks[pair_a][:, None, None], shape)
+    stock_b = np.broadcast_to(stocks[pair_b][:, None, None], shape)
+    plan = calc_matrix(conc_a, conc_b, stock_a.ravel(), stock_b.ravel(), total_vol, multiplier)
+
+    n_pairs = len(pair_a)
+    valid = ~(np.isnan(conc_a) | np.isnan(conc_b)).reshape(n_pairs, -1)
+    insufficient = plan.insufficient.reshape(n_pairs, -1) & valid
+    usable = valid & ~insufficient
+
+    vol_a = np.where(usable, plan.vol_a.reshape(n_pairs, -1), 0.0).sum(axis=1)
+    vol_b = np.where(usable, plan.vol_b.reshape(n_pairs, -1), 0.0).sum(axis=1)
+    vol_media = np.where(usable, plan.vol_media.reshape(n_pairs, -1), 0.0).sum(axis=1)
+    return valid.sum(axis=1), insufficient.sum(axis=1), vol_a, vol_b, vol_media
+
+
+def _init_worker(series, stocks, total_vol, multiplier, pair_a, pair_b):
+    global _WORKER_STATE
+    _WORKER_STATE = (series, stocks, total_vol, multiplier, pair_a, pair_b)
+
+
+def _run_block(bounds):
+    series, stocks, total_vol, multiplier, pair_a, pair_b = _WORKER_STATE
+    start, stop = bounds
+    return start, plan_pair_block(series, stocks, total_vol, pair_a[start:stop], pair_b[start:stop], multiplier)
+
+
+def plan_campaign(
+    stocks,
+    series,
+    total_vol,
+    multiplier=1,
+    pairs=None,
+    jobs=1,
+    chunk_size=256,
+    progress=None,
+):
+    # stocks: (N,) 每个化合物的母液浓度 (μM)
+    # series: 共用的终浓度序列，或每个化合物各自的序列 (N 个)，单位 μM
+    # pairs: (pair_a, pair_b) 化合物序号数组；缺省为全部两两配对
+    # jobs > 1 时按 chunk_size 对一块分发到进程池；progress(已完成对数, 总对数) 每完成一块调用一次
+    stocks = np.asarray(stocks, dtype=np.float64).ravel()
+    n_compounds = stocks.size
+    series = _pad_series(series, n_compounds)
+    if pairs is None:
+        pair_a, pair_b = all_pairs(n_compounds)
+    else:
+        pair_a = np.asarray(pairs[0], dtype=np.int64)
+        pair_b = np.asarray(pairs[1], dtype=np.int64)
+    n_pairs = pair_a.size
+
+    n_cells = np.zeros(n_pairs, dtype=np.int64)
+    n_insufficient = np.zeros(n_pairs, dtype=np.int64)
+    vol_a = np.zeros(n_pairs)
+    vol_b = np.zeros(n_pairs)
+    vol_media = np.zeros(n_pairs)
+
+    bounds = [(start, min(start + chunk_size, n_pairs)) for start in range(0, n_pairs, chunk_size)]
+    state = (series, stocks, total_vol, multiplier, pair_a, pair_b)
+    if jobs > 1 and len(bounds) > 1:
+        import multiprocessing
+
+        pool = multiprocessing.Pool(jobs, initializer=_init_worker, initargs=state)
+        results = pool.imap_unordered(_run_block, bounds)
+    else:
+        pool = None
+        _init_worker(*state)
+        results = map(_run_block, bounds)
+
+    done = 0
+    try:
+        for start, (cells, short, used_a, used_b, media) in results:
+            rows = slice(start, start + cells.size)
+            n_cells[rows] = cells
+            n_insufficient[rows] = short
+            vol_a[rows] = used_a
+            vol_b[rows] = used_b
+            vol_media[rows] = media
+            done += cells.size
+            if progress is not None:
+                progress(done, n_pairs)
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+
+    stock_used = np.bincount(pair_a, weights=vol_a, minlength=n_compounds) + np.bincount(
+        pair_b, weights=vol_b, minlength=n_compounds
+    )
+    return CampaignPlan(pair_a, pair_b, n_cells, n_insufficient, vol_a, vol_b, vol_media, stock_used)
+
+
+def iter_campaign_blocks(plan, names, block_rows=65536):
+    # 每对一行的汇总表 -> 导出用数据块 (见 exporter.export_blocks)
+    names = np.asarray(names, dtype=object)
+    for start in range(0, max(plan.pair_a.size, 1), block_rows):
+        rows = slice(start, start + block_rows)
+        yield {
+            "药A": names[plan.pair_a[rows]],
+            "药B": names[plan.pair_b[rows]],
+            "组合数": plan.n_cells[rows],
+            "母液不足组合数": plan.n_insufficient[rows],
+            "取药A母液合计 (μL)": plan.vol_a[rows],
+            "取药B母液合计 (μL)": plan.vol_b[rows],
+            "培养基合计 (μL)": plan.vol_media[rows],
+        }
+
+
+def stock_blocks(plan, names):
+    # 每个化合物的母液总消耗 -> 单块数据
+    n_pairs = np.bincount(plan.pair_a, minlength=len(names)) + np.bincount(plan.pair_b, minlength=len(names))
+    yield {"化合物": list(names), "参与配对数": n_pairs, "母液总消耗 (μL)": plan.stock_used}
+
+
+def main(argv=None):
+    # python -m mtt_core.campaign spec.json -j 32 -o pairs.csv --stock-output stock.csv
+    # spec: {"total_vol": 1000, "multiplier": 1, "series": [0, 1, 10],
+    #        "compounds": [{"name": "DrugA", "stock_mm": 10, "series": [...] (可选)}, ...]}
+    import argparse
+    import json
+    import os
+    import sys
+    import time
+
+    from .exporter import EXPORT_FORMATS, export_blocks
+
+    parser = argparse.ArgumentParser(prog="python -m mtt_core.campaign", description="药物两两组合库配液规划")
+    parser.add_argument("spec", help="组合库描述 (JSON)")
+    parser.add_argument("-o", "--output", required=True, help="每对汇总表 (.csv / .xlsx / .parquet)")
+    parser.add_argument("--stock-output", help="每个化合物母液总消耗表")
+    parser.add_argument("-j", "--jobs", type=int, default=1, help="并行进程数，0 为 CPU 核数")
+    parser.add_argument("--chunk-size", type=int, default=256, help="每块配对数")
+    args = parser.parse_args(argv)
+
+    with open(args.spec, encoding="utf-8-sig") as f:
+        spec = json.load(f)
+    compounds = spec["compounds"]
+    names = [c["name"] for c in compounds]
+    stocks = [c["stock_mm"] * 1000 for c in compounds]
+    shared = spec.get("series")
+    series = [c.get("series", shared) for c in compounds]
+    if any(s is None for s in series):
+        parser.error("每个化合物需有 series，或在顶层给出共用的 series")
+
+    started = time.perf_counter()
+
+    def report(done, total):
+        print(f"\r已完成 {done}/{total} 对 ({done / total:.0%})", end="", file=sys.stderr, flush=True)
+
+    plan = plan_campaign(
+        stocks,
+        series,
+        spec["total_vol"],
+        spec.get("multiplier", 1),
+        jobs=args.jobs or os.cpu_count() or 1,
+        chunk_size=max(1, args.chunk_size),
+        progress=report,
+    )
+    elapsed = time.perf_counter() - started
+    print(
+        f"\n{plan.pair_a.size} 对，{int(plan.n_cells.sum())} 个组合，"
+        f"{int(plan.n_insufficient.sum())} 个母液不足，用时 {elapsed:.2f} s",
+        file=sys.stderr,
+    )
+
+    def export(path, blocks):
+        fmt = os.path.splitext(path)[1].lower().lstrip(".")
+        export_blocks(blocks, path, fmt if fmt in EXPORT_FORMATS else "csv")
+
+    export(args.output, iter_campaign_blocks(plan, names))
+    if args.stock_output:
+        export(args.stock_output, stock_blocks(plan, names))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,83 @@
+# -*- coding: utf-8 -*-
+# 整条稀释链求解 (纯 Python，不依赖 numpy)：批处理脚本、API 可直接调用，启动快
+import math
+from collections import namedtuple
+
+ChainStep = namedtuple(
+    "ChainStep",
+    ["conc", "source_conc", "vol_take", "vol_media", "total_vol", "intermediate", "expanded"],
+)
+
+
+# 两管之间最多插入的中间稀释管数 (防止 max_vol 只略大于 min_pipette 时插入成千上万管)
+MAX_INTERMEDIATE = 100
+
+
+def intermediate_concs(source_c, conc, max_vol, min_pipette):
+    # 从 source_c 稀释到 conc 需插入的中间稀释管浓度 (从高到低)，solve_chain 与 LiveChain 共用
+    # 相邻两管浓度比超过 max_vol / min_pipette 时按等比插入，浓度取 3 位有效数字方便配制
+    if not max_vol or min_pipette <= 0:
+        return []
+    if max_vol <= min_pipette:
+        raise ValueError("单管最大体积必须大于最小取样体积")
+    ratio = source_c / conc
+    limit = max_vol / min_pipette
+    if not (math.isfinite(ratio) and math.isfinite(limit)):
+        raise ValueError(f"浓度比无效: {source_c:g} / {conc:g}")
+    if ratio <= limit:
+        return []
+    n_steps = math.ceil(math.log(ratio) / math.log(limit))
+    if n_steps - 1 > MAX_INTERMEDIATE:
+        raise ValueError(f"需插入 {n_steps - 1} 个中间稀释管，请增大单管最大体积或减小最小取样体积")
+    step = ratio ** (1.0 / n_steps)
+    return [float(f"{source_c / step**k:.3g}") for k in range(1, n_steps)]
+
+
+def chain_step(conc, source_c, total, min_pipette, intermediate=False):
+    # 一管的体积：需配 total μL 时从 source_c 取样，取样不足 min_pipette 时扩大该管总量
+    # solve_chain 与 LiveChain 逐管倒推时共用，两者结果逐位一致
+    take = conc * total / source_c
+    expanded = take < min_pipette
+    if expanded:
+        take = min_pipette
+        total = min_pipette * source_c / conc
+    return ChainStep(conc, source_c, take, total - take, total, intermediate, expanded)
+
+
+def solve_chain(stock, targets, needed_vol, min_pipette, max_vol=None):
+    # 整条稀释链的每一步取样都 >= min_pipette：
+    # 1. 相邻两管浓度比超过 max_vol / min_pipette 时，按等比插入中间稀释管 (不用于实验，
+    #    见 intermediate_concs；max_vol <= min_pipette 时抛出 ValueError)
+    # 2. 从低浓度往高浓度倒推，取样不足时扩大该管总量，增量随传递体积向上游累加
+    # 纯 Python 实现，12 点链只需几十微秒，可在批量任务中逐条调用
+    # needed_vol 可为标量，或 {浓度: 需用量} 字典 (每管用量不同时)
+    chain = sorted({t for t in targets if t > 0}, reverse=True)
+
+    concs = []
+    sources = []
+    intermediate = []
+    source_c = stock
+    for conc in chain:
+        for tube in intermediate_concs(source_c, conc, max_vol, min_pipette):
+            concs.append(tube)
+            sources.append(source_c)
+            intermediate.append(True)
+            source_c = tube
+        concs.append(conc)
+        sources.append(source_c)
+        intermediate.append(False)
+        source_c = conc
+
+    steps = [None] * len(concs)
+    carry = 0.0
+    for i in range(len(concs) - 1, -1, -1):
+        conc = concs[i]
+        if intermediate[i]:
+            total = carry
+        elif isinstance(needed_vol, dict):
+            total = needed_vol[conc] + carry
+        else:
+            total = needed_vol + carry
+        steps[i] = chain_step(conc, sources[i], total, min_pipette, intermediate[i])
+        carry = steps[i].vol_take
+    return steps
@@ -0,0 +1,79 @@
+# -*- coding: utf-8 -*-
+# 多药 (k 药) 组合配制：按需逐块生成组合，内存占用与组合总数无关
+import math
+from collections import namedtuple
+
+import numpy as np
+
+ComboPlan = namedtuple("ComboPlan", ["index", "conc", "vol", "vol_media", "insufficient"])
+
+
+def count_combinations(series_list):
+    return math.prod(len(series) for series in series_list)
+
+
+def iter_combinations(series_list):
+    # 逐个产出浓度组合 (c1, c2, ..., ck)，最后一个药变化最快，与 A×B 矩阵顺序一致
+    if not series_list:
+        return
+    series_list = [list(series) for series in series_list]
+    index = [0] * len(series_list)
+    sizes = [len(series) for series in series_list]
+    if 0 in sizes:
+        return
+    while True:
+        yield tuple(series[i] for series, i in zip(series_list, index))
+        d = len(index) - 1
+        while d >= 0:
+            index[d] += 1
+            if index[d] < sizes[d]:
+                break
+            index[d] = 0
+            d -= 1
+        if d < 0:
+            return
+
+
+def combo_block(series_list, start, stop):
+    # 第 start..stop-1 个组合的浓度矩阵 (n, k)，按混合进制由序号直接解码，可随机访问任一页
+    series_list = [np.asarray(series, dtype=np.float64).ravel() for series in series_list]
+    index = np.arange(start, stop, dtype=np.int64)
+    conc = np.empty((index.size, len(series_list)))
+    rest = index.copy()
+    for d in range(len(series_list) - 1, -1, -1):
+        size = series_list[d].size
+        conc[:, d] = series_list[d][rest % size]
+        rest //= size
+    return index, conc
+
+
+def calc_combo_block(conc, stocks, total_vol, multiplier=1):
+    # conc: (n, k) 终浓度；stocks: (k,) 母液浓度，单位一致 (μM)
+    stocks = np.asarray(stocks, dtype=np.float64)
+    vol = conc * multiplier * total_vol / stocks
+    vol_media = total_vol - vol.sum(axis=1)
+    insufficient = ~(vol_media >= 0)
+    return vol, vol_media, insufficient
+
+
+def iter_combo_plan(series_list, stocks, total_vol, multiplier=1, chunk_size=4096, start=0, stop=None):
+    # 逐块产出 ComboPlan，每块最多 chunk_size 个组合；可直接逐页写文件或显示
+    if len(stocks) != len(series_list):
+        raise ValueError("母液浓度个数与药物个数不一致")
+    total = count_combinations(series_list)
+    stop = total if stop is None else min(stop, total)
+    for block_start in range(start, stop, chunk_size):
+        block_stop = min(block_start + chunk_size, stop)
+        index, conc = combo_block(series_list, block_start, block_stop)
+        vol, vol_media, insufficient = calc_combo_block(conc, stocks, total_vol, multiplier)
+        yield ComboPlan(index, conc, vol, vol_media, insufficient)
+
+
+def combo_page(series_list, stocks, total_vol, page, page_size=100, multiplier=1):
+    # 取第 page 页 (从 0 开始)，无需生成前面的组合
+    start = page * page_size
+    for plan in iter_combo_plan(
+        series_list, stocks, total_vol, multiplier, page_size, start, start + page_size
+    ):
+        return plan
+    return None
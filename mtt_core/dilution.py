@@ -0,0 +1,84 @@
+# -*- coding: utf-8 -*-
+# 单药连续稀释 (Serial Dilution) 的批量计算引擎：化合物 × 梯度点 的二维数组
+from collections import namedtuple
+
+import numpy as np
+
+from .chain import ChainStep, solve_chain  # noqa: F401 (兼容旧的导入路径)
+
+DilutionPlan = namedtuple(
+    "DilutionPlan",
+    ["conc", "source_conc", "vol_take", "vol_media", "total_vol", "expanded", "insufficient"],
+)
+
+
+def normalize_series(targets):
+    # 每行从高到低排序、合并重复浓度；负数与 NaN 视为空位，统一排到行尾
+    conc = np.array(targets, dtype=np.float64, ndmin=2)
+    conc[~(conc >= 0)] = np.nan
+    conc = -np.sort(-conc, axis=1)
+
+    dup = np.zeros(conc.shape, dtype=bool)
+    dup[:, 1:] = conc[:, 1:] == conc[:, :-1]
+    if dup.any():
+        conc[dup] = np.nan
+        conc = -np.sort(-conc, axis=1)
+    return conc
+
+
+def calc_dilution_batch(stock, targets, needed_vol, min_pipette):
+    # stock: 每个化合物的母液浓度 (与 targets 同单位，μM)，标量或 (C,)
+    # targets: 共用梯度 (P,) 或每个化合物各自的梯度 (C, P)，可用 NaN 补齐长度
+    # needed_vol / min_pipette: 标量或 (C,)
+    stock = np.asarray(stock, dtype=np.float64).reshape(-1)
+    conc = normalize_series(targets)
+    n_compounds = max(stock.shape[0], conc.shape[0])
+    conc = np.broadcast_to(conc, (n_compounds, conc.shape[1]))
+    stock = np.broadcast_to(stock, (n_compounds,))
+    needed_vol = np.broadcast_to(np.asarray(needed_vol, dtype=np.float64), (n_compounds,))
+    min_pipette = np.broadcast_to(np.asarray(min_pipette, dtype=np.float64), (n_compounds,))
+
+    n_points = conc.shape[1]
+    active = conc > 0
+
+    # 最高浓度管从母液取，其余每管从上一管 (更高浓度) 取
+    source_conc = np.empty((n_compounds, n_points))
+    if n_points:
+        source_conc[:, 0] = stock
+        source_conc[:, 1:] = conc[:, :-1]
+    source_conc[~active] = np.nan
+
+    vol_take = np.zeros((n_compounds, n_points))
+    total_vol = np.zeros((n_compounds, n_points))
+
+    # 从低浓度往高浓度倒推：每管总量 = 实验需用量 + 被下一管取走的量
+    carry = np.zeros(n_compounds)
+    for j in range(n_points - 1, -1, -1):
+        total_j = needed_vol + carry
+        take_j = np.where(active[:, j], conc[:, j] * total_j / source_conc[:, j], 0.0)
+        vol_take[:, j] = take_j
+        total_vol[:, j] = total_j
+        carry = take_j
+
+    # 母液取样限制修正：只对第一管扩大体积
+    expanded = np.zeros(n_compounds, dtype=bool)
+    if n_points:
+        take_0 = vol_take[:, 0]
+        expanded = active[:, 0] & (take_0 < min_pipette)
+        factor = np.divide(min_pipette, take_0, out=np.ones(n_compounds), where=expanded)
+        total_vol[:, 0] *= factor
+        vol_take[:, 0] = np.where(expanded, min_pipette, take_0)
+
+    vol_media = total_vol - vol_take
+
+    # 0 浓度管只加培养基；补齐用的空位全部记为 NaN
+    blank = np.isnan(conc)
+    vol_take[blank] = np.nan
+    vol_media[blank] = np.nan
+    total_vol[blank] = np.nan
+
+    insufficient = vol_media < 0
+
+    return DilutionPlan(
+        np.array(conc), source_conc, vol_take, vol_media, total_vol, expanded, insufficient
+    )
@@ -0,0 +1,182 @@
+# -*- coding: utf-8 -*-
+# 配液方案导出：CSV / XLSX / Parquet 逐块 (row group) 写出，直接使用数值结果，
+# 不解析显示用的字符串；大方案边算边写，不在内存中拼出整个文件
+#
+# 数据块：每块是 {表头: 一维数组} 的映射 (dict 或 DataFrame)，各列等长
+# 写出：dest 可为文件路径或二进制文件对象 (如 BytesIO / SpooledTemporaryFile)
+import csv
+import io
+import os
+
+import numpy as np
+
+from .combo import iter_combo_plan
+from .flags import FLAG_NOTES
+
+# 格式 -> (MIME, 后缀)
+EXPORT_FORMATS = {
+    "csv": ("text/csv", ".csv"),
+    "xlsx": ("application/vnd.openxmlformats-officedocument.spreadsheetml.sheet", ".xlsx"),
+    "parquet": ("application/vnd.apache.parquet", ".parquet"),
+}
+
+BLOCK_ROWS = 65536
+
+
+def flag_notes(flags):
+    flags = np.asarray(flags)
+    return np.select([(flags & flag) != 0 for flag, _ in FLAG_NOTES], [note for _, note in FLAG_NOTES], "")
+
+
+def iter_frame_blocks(frame, block_rows=BLOCK_ROWS):
+    # DataFrame 按行切块；空表也产出一个空块，保证输出文件带表头
+    for start in range(0, max(len(frame), 1), block_rows):
+        yield frame.iloc[start : start + block_rows]
+
+
+def iter_table_blocks(table, columns, notes=True, block_rows=BLOCK_ROWS):
+    # ResultTable -> 数据块；columns: [(字段名, 表头), ...]，notes 时追加由状态位得到的 "备注" 列
+    for start in range(0, max(len(table), 1), block_rows):
+        data = table.data[start : start + block_rows]
+        block = {header: data[field] for field, header in columns}
+        if notes:
+            block["备注"] = flag_notes(data["flags"])
+        yield block
+
+
+def iter_combo_blocks(series_list, stocks, total_vol, names=None, multiplier=1, block_rows=BLOCK_ROWS):
+    # 多药组合方案逐块计算、逐块写出，组合总数再大也只占一块的内存
+    names = names or [f"药{chr(ord('A') + d)}" for d in range(len(series_list))]
+    for plan in iter_combo_plan(series_list, stocks, total_vol, multiplier, block_rows):
+        block = {"序号": plan.index + 1}
+        for d, name in enumerate(names):
+            block[f"{name}终浓度 (μM)"] = plan.conc[:, d]
+        for d, name in enumerate(names):
+            block[f"取{name} (μL)"] = plan.vol[:, d]
+        block["加培养基 (μL)"] = np.where(plan.insufficient, np.nan, plan.vol_media)
+        block["可配制"] = ~plan.insufficient
+        yield block
+
+
+def seeding_blocks(plan):
+    # SeedingPlan -> 单块 "项目 / 数值 / 单位" 表
+    yield {
+        "项目": [
+            "原液细胞密度",
+            "铺板液目标密度",
+            "总孔数",
+            "需要细胞总数",
+            "需配制总体积 (含余量)",
+            "取细胞悬液",
+            "加培养基",
+        ],
+        "数值": [
+            plan.conc_cells_ml,
+            plan.target_conc,
+            plan.total_wells,
+            plan.total_cells,
+            plan.total_prep_vol,
+            plan.vol_cell_stock,
+            plan.vol_medium,
+        ],
+        "单位": ["个/mL", "个/mL", "孔", "个", "mL", "mL", "mL"],
+    }
+
+
+def _block_columns(block):
+    headers = []
+    columns = []
+    for header, values in block.items():
+        headers.append(str(header))
+        columns.append(np.asarray(values))
+    return headers, columns
+
+
+def _block_rows(columns):
+    # 按行产出 Python 标量，NaN 写为空单元格
+    for row in zip(*(column.tolist() for column in columns)):
+        yield [None if value != value else value for value in row]
+
+
+def write_csv(blocks, dest, encoding="utf-8-sig"):
+    # 默认带 BOM，Excel 直接打开中文表头不乱码
+    if isinstance(dest, (str, os.PathLike)):
+        stream = open(dest, "w", encoding=encoding, newline="")
+    else:
+        stream = io.TextIOWrapper(dest, encoding=encoding, newline="")
+    n_rows = 0
+    try:
+        writer = csv.writer(stream)
+        header_written = False
+        for block in blocks:
+            headers, columns = _block_columns(block)
+            if not header_written:
+                writer.writerow(headers)
+                header_written = True
+            writer.writerows(_block_rows(columns))
+            n_rows += len(columns[0]) if columns else 0
+    finally:
+        if isinstance(dest, (str, os.PathLike)):
+            stream.close()
+        else:
+            stream.flush()
+            stream.detach()
+    return n_rows
+
+
+def write_xlsx(blocks, dest, sheet_title="方案"):
+    # openpyxl 只写模式：逐行落盘，不保留单元格对象
+    try:
+        from openpyxl import Workbook
+    except ImportError:
+        raise ImportError("导出 XLSX 需要安装 openpyxl (pip install openpyxl)") from None
+
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet(sheet_title)
+    n_rows = 0
+    header_written = False
+    for block in blocks:
+        headers, columns = _block_columns(block)
+        if not header_written:
+            sheet.append(headers)
+            header_written = True
+        for row in _block_rows(columns):
+            sheet.append(row)
+            n_rows += 1
+    workbook.save(dest)
+    return n_rows
+
+
+def write_parquet(blocks, dest, compression="snappy"):
+    # 每个数据块写成一个 row group
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise ImportError("导出 Parquet 需要安装 pyarrow (pip install pyarrow)") from None
+
+    writer = None
+    n_rows = 0
+    try:
+        for block in blocks:
+            headers, columns = _block_columns(block)
+            batch = pa.table([pa.array(column) for column in columns], names=headers)
+            if writer is None:
+                writer = pq.ParquetWriter(dest, batch.schema, compression=compression)
+            writer.write_table(batch)
+            n_rows += batch.num_rows
+    finally:
+        if writer is not None:
+            writer.close()
+    return n_rows
+
+
+def export_blocks(blocks, dest, fmt="csv"):
+    # 按格式分派，返回写出的行数
+    if fmt == "csv":
+        return write_csv(blocks, dest)
+    if fmt == "xlsx":
+        return write_xlsx(blocks, dest)
+    if fmt == "parquet":
+        return write_parquet(blocks, dest)
+    raise ValueError(f"不支持的导出格式: {fmt}")
@@ -0,0 +1,15 @@
+# -*- coding: utf-8 -*-
+# 结果表每行的状态位 (不依赖 numpy，界面只用它格式化时不必加载 numpy 引擎)
+FROM_STOCK = 1
+EXPANDED = 2
+INTERMEDIATE = 4
+BLANK = 8
+INSUFFICIENT = 16
+
+# 状态位 -> 备注文字，按优先级排列 (导出文件、批处理与接口的 "备注" 共用)
+FLAG_NOTES = [
+    (INSUFFICIENT, "浓度过高(母液不足)"),
+    (INTERMEDIATE, "中间稀释管"),
+    (EXPANDED, "已扩大体积以满足最小取样"),
+    (BLANK, "不加药"),
+]
@@ -0,0 +1,139 @@
+# -*- coding: utf-8 -*-
+# Matrix 浓度组合清单的流式导入：粘贴文本 / CSV / TSV / XLSX 逐行读取、分块产出，
+# 格式错误的行逐条记录行号与原因，不再静默跳过
+import io
+import os
+from collections import namedtuple
+
+import numpy as np
+
+PairChunk = namedtuple("PairChunk", ["conc_a", "conc_b", "errors"])
+PairError = namedtuple("PairError", ["line", "text", "reason"])
+
+XLSX_SUFFIXES = (".xlsx", ".xlsm")
+
+
+def parse_pair_fields(fields):
+    # fields: 一行中的各个单元格 (字符串或数字)；返回 (A, B)，无法解析时抛出 ValueError(原因)
+    values = []
+    for field in fields:
+        if field is None:
+            continue
+        if isinstance(field, str):
+            field = field.strip().strip('"').strip()
+            if not field:
+                continue
+        values.append(field)
+    if len(values) < 2:
+        raise ValueError("需要两列浓度 (药A, 药B)")
+
+    pair = []
+    for value in values[:2]:
+        try:
+            pair.append(float(value))
+        except (TypeError, ValueError):
+            raise ValueError(f"不是数字: {value}") from None
+    return pair[0], pair[1]
+
+
+def split_pair_line(line):
+    # 逗号、中文逗号、制表符 (从 Excel 复制的两列) 均可作分隔符
+    return line.replace("，", ",").replace("\t", ",").split(",")
+
+
+def _open_text(source, encoding):
+    # 返回 (可逐行迭代的文本流, 是否需要由这里关闭)
+    if isinstance(source, str):
+        # 字符串视为粘贴的文本内容；文件路径请传 pathlib.Path
+        return io.StringIO(source), True
+    if isinstance(source, os.PathLike):
+        return open(source, encoding=encoding, newline=""), True
+    if isinstance(source.read(0), bytes):
+        # 上传文件等二进制流，按需解码，不整体读入
+        return io.TextIOWrapper(source, encoding=encoding, errors="replace", newline=""), False
+    return source, False
+
+
+def iter_text_rows(source, encoding="utf-8-sig"):
+    # 逐行产出 (行号, 原始文本, 单元格列表)；空行不产出
+    stream, owned = _open_text(source, encoding)
+    try:
+        for line_no, line in enumerate(stream, start=1):
+            line = line.strip()
+            if line:
+                yield line_no, line, split_pair_line(line)
+    finally:
+        if owned:
+            stream.close()
+        elif isinstance(stream, io.TextIOWrapper):
+            # 交还底层二进制流，避免 wrapper 被回收时顺带关闭它
+            stream.detach()
+
+
+def iter_xlsx_rows(source, sheet=None):
+    # 只读模式逐行读取工作表，内存占用与行数无关；需要 openpyxl
+    try:
+        from openpyxl import load_workbook
+    except ImportError:
+        raise ImportError("读取 XLSX 需要安装 openpyxl (pip install openpyxl)") from None
+
+    workbook = load_workbook(source, read_only=True, data_only=True)
+    try:
+        worksheet = workbook[sheet] if sheet else workbook.active
+        for line_no, cells in enumerate(worksheet.iter_rows(values_only=True), start=1):
+            if all(cell is None or (isinstance(cell, str) and not cell.strip()) for cell in cells):
+                continue
+            text = ", ".join("" if cell is None else str(cell) for cell in cells)
+            yield line_no, text, cells
+    finally:
+        workbook.close()
+
+
+def detect_format(name):
+    # 按文件名后缀判断；无法判断时按文本处理
+    suffix = os.path.splitext(str(name or ""))[1].lower()
+    return "xlsx" if suffix in XLSX_SUFFIXES else "text"
+
+
+def iter_pair_chunks(source, fmt=None, name=None, chunk_size=65536, encoding="utf-8-sig"):
+    # source: 粘贴的文本、文件路径或文件对象 (含 Streamlit 上传文件)
+    # 每 chunk_size 个有效组合产出一个 PairChunk，errors 为本块内的 PairError 列表
+    if fmt is None:
+        if name is None and not isinstance(source, str):
+            name = getattr(source, "name", source)
+        fmt = detect_format(name) if name is not None else "text"
+    if fmt == "xlsx":
+        rows = iter_xlsx_rows(source)
+    else:
+        rows = iter_text_rows(source, encoding)
+
+    conc_a = []
+    conc_b = []
+    errors = []
+    for line_no, text, fields in rows:
+        try:
+            target_a, target_b = parse_pair_fields(fields)
+        except ValueError as exc:
+            errors.append(PairError(line_no, text, str(exc)))
+            continue
+        conc_a.append(target_a)
+        conc_b.append(target_b)
+        if len(conc_a) >= chunk_size:
+            yield PairChunk(np.array(conc_a), np.array(conc_b), errors)
+            conc_a = []
+            conc_b = []
+            errors = []
+    if conc_a or errors:
+        yield PairChunk(np.array(conc_a), np.array(conc_b), errors)
+
+
+def load_pairs(source, fmt=None, name=None, chunk_size=65536, encoding="utf-8-sig"):
+    # 读完整个清单：返回 (conc_a, conc_b, errors)，浓度为 float64 数组
+    parts_a = [np.empty(0)]
+    parts_b = [np.empty(0)]
+    errors = []
+    for chunk in iter_pair_chunks(source, fmt, name, chunk_size, encoding):
+        parts_a.append(chunk.conc_a)
+        parts_b.append(chunk.conc_b)
+        errors.extend(chunk.errors)
+    return np.concatenate(parts_a), np.concatenate(parts_b), errors
@@ -0,0 +1,205 @@
+# -*- coding: utf-8 -*-
+# 边输入边计算的增量方案模型 (纯 Python)：记录每管 / 每行的依赖，输入变化时只重算受影响的部分
+#
+# LiveChain  单药整条稀释链 (结果与 solve_chain 完全一致)。每个目标浓度及其前面插入的中间稀释管
+#            为一段；段的结构只取决于上一管浓度和本管浓度，段的体积只取决于下游传来的取液量。
+#            改动一个浓度只重建它和下一段的结构，再向上游 (高浓度方向) 重算传递体积，
+#            某一段收到的下游取液量不变 (例如扩容到最小取样量的管) 时即停止。
+# LiveMatrix 双药组合清单，一行文本对应一个组合 (结果与 calc_matrix 完全一致)。
+#            改动文本时按公共前缀 / 后缀找出变化的行，只解析并计算这些行。
+#
+# update() 返回 (start, old_stop, new_stop)：旧结果的 [start, old_stop) 行被新结果的
+# [start, new_stop) 行替换，界面只需重绘这一段 (行数变化时其后各行整体移位)
+import math
+
+from .chain import ChainStep, chain_step, intermediate_concs, solve_chain
+from .flags import INSUFFICIENT
+from .importer import PairError, parse_pair_fields, split_pair_line
+
+
+def _diff(old, new):
+    # 公共前缀 / 后缀之外的区间：old[start:old_stop] 被替换为 new[start:new_stop]
+    limit = min(len(old), len(new))
+    start = 0
+    while start < limit and old[start] == new[start]:
+        start += 1
+    end = 0
+    while end < limit - start and old[-1 - end] == new[-1 - end]:
+        end += 1
+    return start, len(old) - end, len(new) - end
+
+
+class LiveChain:
+    def __init__(self, stock, targets, needed_vol, min_pipette, max_vol=None):
+        self.stock = stock
+        self.needed_vol = needed_vol
+        self.min_pipette = min_pipette
+        self.max_vol = max_vol
+        self.targets = []
+        self._segments = []  # 每个目标浓度一段：[中间稀释管..., 目标管] (ChainStep)
+        self._carry_in = []  # 每段收到的下游取液量 (μL)
+        self.update(targets)
+
+    @property
+    def steps(self):
+        return [step for segment in self._segments for step in segment]
+
+    def __len__(self):
+        return sum(len(segment) for segment in self._segments)
+
+    def set_params(self, stock=None, needed_vol=None, min_pipette=None, max_vol=False):
+        # 母液、需用量等全局参数变化时整条链重算；max_vol=None 表示不限制，故缺省用 False
+        if stock is not None:
+            self.stock = stock
+        if needed_vol is not None:
+            self.needed_vol = needed_vol
+        if min_pipette is not None:
+            self.min_pipette = min_pipette
+        if max_vol is not False:
+            self.max_vol = max_vol
+        old_len = len(self)
+        steps = solve_chain(self.stock, self.targets, self.needed_vol, self.min_pipette, self.max_vol)
+        self._segments = []
+        self._carry_in = []
+        segment = []
+        for i, step in enumerate(steps):
+            segment.append(step)
+            if not step.intermediate:
+                self._segments.append(segment)
+                self._carry_in.append(steps[i + 1].vol_take if i + 1 < len(steps) else 0.0)
+                segment = []
+        return 0, old_len, len(self)
+
+    def update(self, targets):
+        # targets: 新的目标浓度 (任意顺序，0 与重复值忽略)
+        new = sorted({t for t in targets if t > 0}, reverse=True)
+        start, old_stop, new_stop = _diff(self.targets, new)
+        if start == old_stop == new_stop:
+            return 0, 0, 0
+        self.targets = new
+
+        # 结构变化的段：被替换的目标，以及紧随其后的一段 (它的来源浓度变了)
+        rebuild_stop = min(new_stop + 1, len(new))
+        old_rows = sum(len(s) for s in self._segments[start : min(old_stop + 1, len(self._segments))])
+        segments = [self._structure(j) for j in range(start, rebuild_stop)]
+        self._segments[start : min(old_stop + 1, len(self._segments))] = segments
+        self._carry_in[start : min(old_stop + 1, len(self._carry_in))] = [None] * len(segments)
+
+        # 从最后一个重建的段向上游重算体积，收到的取液量不变即停止
+        first = self._propagate(rebuild_stop - 1)
+        row_start = sum(len(s) for s in self._segments[:first])
+        changed_old = sum(len(s) for s in self._segments[first:start]) + old_rows
+        changed_new = sum(len(s) for s in self._segments[first:rebuild_stop])
+        return row_start, row_start + changed_old, row_start + changed_new
+
+    def _structure(self, j):
+        # 第 j 段的浓度与来源 (体积待 _propagate 填写)，与 solve_chain 的插管规则相同
+        source_c = self.stock if j == 0 else self.targets[j - 1]
+        conc = self.targets[j]
+        segment = []
+        for tube in intermediate_concs(source_c, conc, self.max_vol, self.min_pipette):
+            segment.append(ChainStep(tube, source_c, 0, 0, 0, True, False))
+            source_c = tube
+        segment.append(ChainStep(conc, source_c, 0, 0, 0, False, False))
+        return segment
+
+    def _propagate(self, j):
+        # 从第 j 段向上游重算：重建过的段 (carry_in 为 None) 必定重算，其余的段收到的取液量不变即停止
+        # 返回实际重算到的最上游段号
+        carry = self._segments[j + 1][0].vol_take if j + 1 < len(self._segments) else 0.0
+        first = j + 1
+        while j >= 0:
+            if self._carry_in[j] is not None and self._carry_in[j] == carry:
+                break
+            segment = self._segments[j]
+            self._carry_in[j] = carry
+            for i in range(len(segment) - 1, -1, -1):
+                step = segment[i]
+                total = carry if step.intermediate else self.needed_vol + carry
+                segment[i] = chain_step(step.conc, step.source_conc, total, self.min_pipette, step.intermediate)
+                carry = segment[i].vol_take
+            first = j
+            j -= 1
+        return first
+
+    def table(self, blank_vol=None):
+        # 当前结果 -> ResultTable (与 single_plan 相同)；blank_vol 不为 None 时追加 0 浓度管
+        from .records import step_table
+
+        return step_table(self.steps, blank_vol)
+
+
+class LiveMatrix:
+    def __init__(self, stock_a, stock_b, total_vol, multiplier=1, text=""):
+        self.stock_a = stock_a
+        self.stock_b = stock_b
+        self.total_vol = total_vol
+        self.multiplier = multiplier
+        self.lines = []
+        self._rows = []  # 每行文本：None (空行) / str (格式错误原因) / CELL_DTYPE 顺序的元组
+        self.update(text)
+
+    def __len__(self):
+        return len(self.lines)
+
+    def _cell(self, conc_a, conc_b):
+        # 与 calc_matrix 相同的运算顺序，结果逐位一致
+        vol_a = (conc_a * self.multiplier) * self.total_vol / self.stock_a
+        vol_b = (conc_b * self.multiplier) * self.total_vol / self.stock_b
+        vol_media = self.total_vol - vol_a - vol_b
+        flags = 0 if vol_media >= 0 else INSUFFICIENT
+        return (conc_a, conc_b, math.nan, math.nan, vol_a, vol_b, vol_media, flags)
+
+    def _row(self, line):
+        line = line.strip()
+        if not line:
+            return None
+        try:
+            conc_a, conc_b = parse_pair_fields(split_pair_line(line))
+        except ValueError as exc:
+            return str(exc)
+        return self._cell(conc_a, conc_b)
+
+    def update(self, text):
+        # text: 整个文本框的内容；只重算与上次相比变化了的行
+        lines = text.split("\n")
+        start, old_stop, new_stop = _diff(self.lines, lines)
+        self._rows[start:old_stop] = [self._row(line) for line in lines[start:new_stop]]
+        self.lines = lines
+        return start, old_stop, new_stop
+
+    def set_params(self, stock_a=None, stock_b=None, total_vol=None, multiplier=None):
+        # 母液、体积、给药方式变化时重算所有组合 (不重新解析文本)
+        if stock_a is not None:
+            self.stock_a = stock_a
+        if stock_b is not None:
+            self.stock_b = stock_b
+        if total_vol is not None:
+            self.total_vol = total_vol
+        if multiplier is not None:
+            self.multiplier = multiplier
+        self._rows = [
+            row if row is None or isinstance(row, str) else self._cell(row[0], row[1]) for row in self._rows
+        ]
+        return 0, len(self._rows), len(self._rows)
+
+    def row(self, index):
+        # 第 index 行文本的结果：None (空行) / PairError / CELL_DTYPE 顺序的元组
+        row = self._rows[index]
+        if isinstance(row, str):
+            return PairError(index + 1, self.lines[index].strip(), row)
+        return row
+
+    def rows(self):
+        return [row for row in self._rows if isinstance(row, tuple)]
+
+    def errors(self):
+        return [self.row(i) for i, row in enumerate(self._rows) if isinstance(row, str)]
+
+    def table(self):
+        # 所有有效组合 -> ResultTable (与 matrix_plan 相同，可直接导出)
+        import numpy as np
+
+        from .records import CELL_DTYPE, ResultTable
+
+        return ResultTable(np.array(self.rows(), dtype=CELL_DTYPE))
@@ -0,0 +1,116 @@
+# -*- coding: utf-8 -*-
+# 双药混合配制 (A+B) 的批量计算引擎：一次性按数组计算所有组合
+from collections import namedtuple
+
+import numpy as np
+
+from .chain import solve_chain
+from .importer import PairError, iter_text_rows, parse_pair_fields
+
+MatrixPlan = namedtuple(
+    "MatrixPlan", ["conc_a", "conc_b", "vol_a", "vol_b", "vol_media", "insufficient"]
+)
+
+
+def parse_pairs(content, errors=None):
+    # 每行 "A浓度, B浓度"，兼容中文逗号与制表符；格式错误的行跳过，
+    # 传入 errors 列表时逐条追加 PairError(行号, 原文, 原因)
+    conc_a = []
+    conc_b = []
+    for line_no, text, fields in iter_text_rows(content):
+        try:
+            target_a, target_b = parse_pair_fields(fields)
+        except ValueError as exc:
+            if errors is not None:
+                errors.append(PairError(line_no, text, str(exc)))
+            continue
+
+        conc_a.append(target_a)
+        conc_b.append(target_b)
+    return conc_a, conc_b
+
+
+def grid_pairs(series_a, series_b):
+    # Checkerboard: A 序列 × B 序列 的全部组合，A 为外层循环 (与网页版一致)
+    series_a = np.asarray(series_a, dtype=np.float64).ravel()
+    series_b = np.asarray(series_b, dtype=np.float64).ravel()
+    conc_a = np.repeat(series_a, series_b.size)
+    conc_b = np.tile(series_b, series_a.size)
+    return conc_a, conc_b
+
+
+def calc_matrix(conc_a, conc_b, stock_a, stock_b, total_vol, multiplier=1):
+    # conc_a/conc_b 为终浓度，与母液 stock_a/stock_b 单位需一致 (均为 μM)
+    # multiplier=2 对应方式B 添加法/2X
+    conc_a, conc_b = np.broadcast_arrays(
+        np.asarray(conc_a, dtype=np.float64).ravel(),
+        np.asarray(conc_b, dtype=np.float64).ravel(),
+    )
+    total_vol = np.asarray(total_vol, dtype=np.float64)
+
+    # C1V1 = C2V2
+    vol_a = (conc_a * multiplier) * total_vol / stock_a
+    vol_b = (conc_b * multiplier) * total_vol / stock_b
+    vol_media = total_vol - vol_a - vol_b
+
+    # 培养基体积为负说明浓度过高或母液太稀
+    insufficient = ~(vol_media >= 0)
+
+    return MatrixPlan(conc_a.copy(), conc_b.copy(), vol_a, vol_b, vol_media, insufficient)
+
+
+TwoStagePlan = namedtuple(
+    "TwoStagePlan",
+    ["tubes_a", "tubes_b", "cells", "ws_a", "ws_b", "stock_draws_direct", "stock_draws"],
+)
+
+
+def plan_two_stage(
+    conc_a,
+    conc_b,
+    stock_a,
+    stock_b,
+    total_vol,
+    fold_a=2,
+    fold_b=2,
+    min_pipette=2.0,
+    max_vol=None,
+    overage=0.1,
+    multiplier=1,
+):
+    # 两步法：先配 A/B 单药工作液 (fold 倍于配液浓度)，再按固定体积混合到每个组合
+    # 每管取 A 工作液 total_vol/fold_a、B 工作液 total_vol/fold_b，其余补培养基；
+    # 浓度为 0 的一侧不取工作液，改补等量培养基。
+    # 工作液按连续稀释配制 (solve_chain)，每一步取样均 >= min_pipette
+    if 1.0 / fold_a + 1.0 / fold_b > 1:
+        raise ValueError("工作液倍数过小：A、B 工作液体积之和超过每管配制体积")
+
+    conc_a, conc_b = np.broadcast_arrays(
+        np.asarray(conc_a, dtype=np.float64).ravel(),
+        np.asarray(conc_b, dtype=np.float64).ravel(),
+    )
+    part_a = total_vol / fold_a
+    part_b = total_vol / fold_b
+
+    # 工作液浓度；每管用量 = 使用该工作液的组合数 × 每次取样体积 × (1 + 余量)
+    ws_a = conc_a * multiplier * fold_a
+    ws_b = conc_b * multiplier * fold_b
+    uniq_a, count_a = np.unique(ws_a[ws_a > 0], return_counts=True)
+    uniq_b, count_b = np.unique(ws_b[ws_b > 0], return_counts=True)
+    need_a = {c: n * part_a * (1 + overage) for c, n in zip(uniq_a.tolist(), count_a.tolist())}
+    need_b = {c: n * part_b * (1 + overage) for c, n in zip(uniq_b.tolist(), count_b.tolist())}
+
+    tubes_a = solve_chain(stock_a, need_a, need_a, min_pipette, max_vol)
+    tubes_b = solve_chain(stock_b, need_b, need_b, min_pipette, max_vol)
+
+    vol_a = np.where(ws_a > 0, part_a, 0.0)
+    vol_b = np.where(ws_b > 0, part_b, 0.0)
+    vol_media = total_vol - vol_a - vol_b
+    insufficient = (ws_a > stock_a) | (ws_b > stock_b)
+    cells = MatrixPlan(conc_a.copy(), conc_b.copy(), vol_a, vol_b, vol_media, insufficient)
+
+    # 母液取样次数：直接配制每个非零组合都要从母液取；两步法只有每条稀释链的第一管
+    stock_draws_direct = int(np.count_nonzero(conc_a) + np.count_nonzero(conc_b))
+    stock_draws = int(bool(tubes_a)) + int(bool(tubes_b))
+
+    return TwoStagePlan(tubes_a, tubes_b, cells, ws_a, ws_b, stock_draws_direct, stock_draws)
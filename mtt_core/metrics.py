@@ -0,0 +1,148 @@
+# -*- coding: utf-8 -*-
+# 可选的耗时 / 内存分配统计 (默认关闭)：按名称累计调用次数、耗时分布、净分配块数，
+# 可导出为 Prometheus 文本格式供本机抓取；同一进程内所有会话共享
+# 开启：环境变量 MTT_PROFILE=1；同时设置 PYTHONTRACEMALLOC=1 时额外记录净分配字节数
+import functools
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+# 耗时分布的桶上限 (秒)
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _label(name):
+    return name.replace("\\", "\\\\").replace('"', '\\"')
+
+
+class Metrics:
+    def __init__(self, buckets=DEFAULT_BUCKETS, enabled=False):
+        self.buckets = tuple(buckets)
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._series = {}
+
+    def observe(self, name, seconds, blocks=0, nbytes=None):
+        with self._lock:
+            series = self._series.get(name)
+            if series is None:
+                series = self._series[name] = {
+                    "count": 0,
+                    "total": 0.0,
+                    "max": 0.0,
+                    "buckets": [0] * len(self.buckets),
+                    "alloc_blocks": 0,
+                    "alloc_bytes": None,
+                }
+            series["count"] += 1
+            series["total"] += seconds
+            series["max"] = max(series["max"], seconds)
+            for i, bound in enumerate(self.buckets):
+                if seconds <= bound:
+                    series["buckets"][i] += 1
+            series["alloc_blocks"] += blocks
+            if nbytes is not None:
+                series["alloc_bytes"] = (series["alloc_bytes"] or 0) + nbytes
+
+    @contextmanager
+    def timed(self, name):
+        # 关闭时几乎没有开销；净分配块数为区间结束与开始时的差 (多会话并发时为近似值)
+        if not self.enabled:
+            yield
+            return
+        tracing = tracemalloc.is_tracing()
+        start_bytes = tracemalloc.get_traced_memory()[0] if tracing else None
+        start_blocks = sys.getallocatedblocks()
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            blocks = sys.getallocatedblocks() - start_blocks
+            nbytes = tracemalloc.get_traced_memory()[0] - start_bytes if tracing else None
+            self.observe(name, elapsed, blocks, nbytes)
+
+    def instrument(self, name=None):
+        def decorator(func):
+            label = name or func.__qualname__
+
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return func(*args, **kwargs)
+                with self.timed(label):
+                    return func(*args, **kwargs)
+
+            return wrapper
+
+        return decorator
+
+    def reset(self):
+        with self._lock:
+            self._series.clear()
+
+    def snapshot(self):
+        # [{name, count, total, mean, max, alloc_blocks, alloc_bytes}, ...]，按总耗时从高到低
+        with self._lock:
+            rows = [
+                {
+                    "name": name,
+                    "count": s["count"],
+                    "total": s["total"],
+                    "mean": s["total"] / s["count"],
+                    "max": s["max"],
+                    "alloc_blocks": s["alloc_blocks"],
+                    "alloc_bytes": s["alloc_bytes"],
+                }
+                for name, s in self._series.items()
+            ]
+        return sorted(rows, key=lambda row: row["total"], reverse=True)
+
+    def render_text(self, prefix="mtt"):
+        # Prometheus 文本格式 (histogram + 分配计数)
+        with self._lock:
+            items = [(name, dict(s, buckets=list(s["buckets"]))) for name, s in sorted(self._series.items())]
+        lines = [
+            f"# HELP {prefix}_latency_seconds 计算、提交处理与渲染的耗时",
+            f"# TYPE {prefix}_latency_seconds histogram",
+        ]
+        for name, s in items:
+            label = _label(name)
+            for bound, count in zip(self.buckets, s["buckets"]):
+                lines.append(f'{prefix}_latency_seconds_bucket{{name="{label}",le="{bound:g}"}} {count}')
+            lines.append(f'{prefix}_latency_seconds_bucket{{name="{label}",le="+Inf"}} {s["count"]}')
+            lines.append(f'{prefix}_latency_seconds_sum{{name="{label}"}} {s["total"]:.6f}')
+            lines.append(f'{prefix}_latency_seconds_count{{name="{label}"}} {s["count"]}')
+        # 净分配量为区间前后之差的累计，释放多于分配时会减小，故为 gauge 而非 counter
+        lines += [
+            f"# HELP {prefix}_alloc_blocks 区间内净分配的内存块数 (累计)",
+            f"# TYPE {prefix}_alloc_blocks gauge",
+        ]
+        for name, s in items:
+            label = _label(name)
+            lines.append(f'{prefix}_alloc_blocks{{name="{label}"}} {s["alloc_blocks"]}')
+        if any(s["alloc_bytes"] is not None for _, s in items):
+            lines += [
+                f"# HELP {prefix}_alloc_bytes 区间内净分配的字节数 (tracemalloc，累计)",
+                f"# TYPE {prefix}_alloc_bytes gauge",
+            ]
+            for name, s in items:
+                if s["alloc_bytes"] is not None:
+                    label = _label(name)
+                    lines.append(f'{prefix}_alloc_bytes{{name="{label}"}} {s["alloc_bytes"]}')
+        return "\n".join(lines) + "\n"
+
+    def write_textfile(self, path, prefix="mtt"):
+        # 先写临时文件再替换，抓取方不会读到写了一半的文件；同一进程内的多个会话线程可能同时写出，
+        # 临时文件名带上线程号 (不用 tempfile：其 0600 权限会使以其他用户运行的抓取方无法读取)
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(self.render_text(prefix))
+        os.replace(tmp, path)
+
+
+# 各前端共用的默认实例
+metrics = Metrics(enabled=os.environ.get("MTT_PROFILE", "") not in ("", "0"))
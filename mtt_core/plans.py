@@ -0,0 +1,41 @@
+# -*- coding: utf-8 -*-
+# 各前端共用的配液方案入口：只接收数值参数，不读取任何界面控件
+# numpy 引擎在首次调用时才导入，import 本模块不增加启动时间
+from .chain import solve_chain
+
+
+def parse_targets(text):
+    # "0, 1, 5" (中英文逗号均可) -> 去重后从高到低的浓度列表；含非数字时抛出 ValueError
+    raw_targets = text.replace("，", ",").split(",")
+    return sorted({float(x) for x in raw_targets if x.strip()}, reverse=True)
+
+
+def single_plan(stock, targets, needed_vol, min_pipette, whole_chain=True, max_vol=None):
+    # 单药连续稀释方案 (ResultTable)，浓度从高到低，0 浓度管 (只加培养基) 排在最后
+    # stock 与 targets 单位一致 (μM)；whole_chain=False 时只对最高浓度管扩容 (批量引擎)
+    from .dilution import calc_dilution_batch
+    from .records import dilution_table, step_table
+
+    targets = sorted(set(targets), reverse=True)
+    if targets and targets[-1] < 0:
+        raise ValueError("目标浓度需为非负数")
+
+    has_zero = 0 in targets
+    if has_zero:
+        targets.remove(0)
+
+    blank_vol = needed_vol if has_zero else None
+    if targets and whole_chain:
+        # 每一步取样过小都扩容，浓度跨度过大时插入中间稀释管
+        return step_table(solve_chain(stock, targets, needed_vol, min_pipette, max_vol), blank_vol)
+    if targets:
+        return dilution_table(calc_dilution_batch(stock, targets + [0] * has_zero, needed_vol, min_pipette))
+    return step_table([], blank_vol)
+
+
+def matrix_plan(conc_a, conc_b, stock_a, stock_b, total_vol, multiplier=1):
+    # 双药直接配制方案 (ResultTable)；浓度均为 μM
+    from .matrix import calc_matrix
+    from .records import matrix_table
+
+    return matrix_table(calc_matrix(conc_a, conc_b, stock_a, stock_b, total_vol, multiplier))
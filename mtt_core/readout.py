@@ -0,0 +1,380 @@
+# -*- coding: utf-8 -*-
+# 酶标仪读数 (OD570 / OD630 等) 的流式导入，并把孔位对应到配液方案中的浓度
+#
+# 支持两类导出文件 (CSV / TSV / 粘贴文本 / XLSX)：
+#   网格格式  每块板一个 8x12 (或 384 孔等) 的表格，表头为 1..12，行首为 A..H；
+#             块前的 "Plate 1"、"570nm"、"Read 1:630" 等文字行给出板名与波长
+#   长表格式  一行一个孔：Plate, Well, (Wavelength), OD；也可每个波长一列 (OD570, OD630)
+# 逐块板读取、逐块板产出，内存只与单块板的孔数有关；一天几百块板的文件几秒内读完
+import re
+from collections import namedtuple
+
+import numpy as np
+
+from .flags import INTERMEDIATE
+from .importer import detect_format, iter_text_rows, iter_xlsx_rows
+
+# od: (行, 列) float64 数组，空孔 / 无法读取的孔为 NaN；wavelength 为 nm (整数) 或 None
+PlateRead = namedtuple("PlateRead", ["label", "wavelength", "od", "errors"])
+ReadoutError = namedtuple("ReadoutError", ["line", "text", "reason"])
+# 多块板合并后的数组存储：od 为 (板数, 行, 列)
+PlateStack = namedtuple("PlateStack", ["labels", "wavelengths", "od"])
+# 孔位对应到方案之后：levels 为方案中上板的行 (结构化数组，与 ResultTable.data 相同字段)，
+# response 为 (板数, 浓度数, 复孔数)，复孔不足处为 NaN；layout 为每孔对应的浓度序号 (-1 不用)
+PlateMap = namedtuple("PlateMap", ["labels", "levels", "response", "layout"])
+
+# 常见孔板规格 (行, 列)，长表格式按出现过的最大孔位取能容纳它的最小规格
+PLATE_SHAPES = [(2, 3), (3, 4), (4, 6), (6, 8), (8, 12), (16, 24), (32, 48)]
+
+WAVELENGTH_RE = re.compile(
+    r"(\d{3})\s*nm\b|\b(?:od|abs|a|λ)\s*[-_:]?\s*(\d{3})\b|:\s*(\d{3})\b|^\s*(\d{3})\s*$", re.IGNORECASE
+)
+PLATE_RE = re.compile(r"plate|板", re.IGNORECASE)
+WELL_RE = re.compile(r"^\s*([A-Za-z]{1,2})\s*0*(\d{1,2})\s*$")
+
+# 长表格式的列名关键字 (小写)
+WELL_KEYS = ("well", "孔")
+PLATE_KEYS = ("plate", "板", "barcode")
+WAVELENGTH_KEYS = ("wavelength", "波长", "λ")
+VALUE_KEYS = ("od", "abs", "absorbance", "value", "吸光度", "raw", "result", "measurement")
+
+
+def row_name(index):
+    # 0 -> "A"，25 -> "Z"，26 -> "AA" (1536 孔板)
+    return chr(65 + index) if index < 26 else "A" + chr(65 + index - 26)
+
+
+def well_index(name):
+    # "A1" / "a01" / "AB12" -> (行, 列)，从 0 开始；无法解析时抛出 ValueError(原因)
+    match = WELL_RE.match(str(name))
+    if not match:
+        raise ValueError(f"不是孔位: {name}")
+    letters = match.group(1).upper()
+    row = ord(letters[-1]) - 65 + (26 if len(letters) == 2 else 0)
+    col = int(match.group(2)) - 1
+    if col < 0 or (len(letters) == 2 and letters[0] != "A"):
+        raise ValueError(f"不是孔位: {name}")
+    return row, col
+
+
+def _cell_text(cell):
+    if cell is None:
+        return ""
+    if isinstance(cell, float) and cell.is_integer():
+        cell = int(cell)
+    return str(cell).strip().strip('"').strip()
+
+
+def _wavelength(text):
+    # 文字中的波长 (300-1000 nm)，没有时返回 None
+    for match in WAVELENGTH_RE.finditer(text):
+        value = int(next(group for group in match.groups() if group))
+        if 300 <= value <= 1000:
+            return value
+    return None
+
+
+def _grid_header(cells):
+    # 网格表头 "", 1, 2, ..., N (N >= 3)：返回 (第一列 "1" 的位置, N)，不是表头时返回 None
+    texts = [_cell_text(cell) for cell in cells]
+    for start in (0, 1):
+        n = 0
+        while start + n < len(texts) and texts[start + n] == str(n + 1):
+            n += 1
+        if n >= 3:
+            return start, n
+    return None
+
+
+def _long_header(cells):
+    # 长表表头：返回 {"well": 列号, "plate": 列号或 None, "wavelength": 列号或 None,
+    #                 "values": [(列号, 波长或 None), ...]}，不是表头时返回 None
+    names = [_cell_text(cell).lower() for cell in cells]
+    well = next((i for i, name in enumerate(names) if any(key in name for key in WELL_KEYS)), None)
+    if well is None:
+        return None
+    plate = next(
+        (i for i, name in enumerate(names) if i != well and any(key in name for key in PLATE_KEYS)), None
+    )
+    wavelength = next(
+        (i for i, name in enumerate(names) if i != well and any(key in name for key in WAVELENGTH_KEYS)), None
+    )
+    values = []
+    for i, name in enumerate(names):
+        if i in (well, plate, wavelength) or not name:
+            continue
+        value_wavelength = _wavelength(name)
+        if value_wavelength is not None or any(key in name for key in VALUE_KEYS):
+            values.append((i, value_wavelength))
+    if not values:
+        return None
+    return {"well": well, "plate": plate, "wavelength": wavelength, "values": values}
+
+
+def _parse_od(cell):
+    # 单孔读数：数字或 NaN (空单元格)；"OVRFLW"、"*****" 等抛出 ValueError
+    try:
+        return float(cell)
+    except (TypeError, ValueError):
+        pass
+    text = _cell_text(cell)
+    if not text:
+        return np.nan
+    try:
+        return float(text)
+    except ValueError:
+        raise ValueError(f"不是数字 (已记为空孔): {text}") from None
+
+
+def _plate_shape(max_row, max_col):
+    # 孔位已由 _iter_long 限制在最大规格之内
+    for rows, cols in PLATE_SHAPES:
+        if max_row < rows and max_col < cols:
+            return rows, cols
+    return PLATE_SHAPES[-1]
+
+
+class _Labels:
+    # 板名：取最近一行含 "Plate" / "板" 的文字 (去掉其中的波长)；没有时按波长分别编号 1, 2, ...
+    # 同一板名、同一波长重复出现时加 "#2"、"#3"，使 570 与 630 的第 k 块板仍能一一对应
+    def __init__(self):
+        self.plate = None
+        self.counts = {}
+
+    def see(self, text):
+        if PLATE_RE.search(text):
+            label = WAVELENGTH_RE.sub(" ", text.replace(",", " ").replace("\t", " "))
+            self.plate = " ".join(label.split()).strip(" :-_") or None
+
+    def next(self, wavelength, label=None):
+        base = label if label is not None else self.plate
+        key = (base, wavelength)
+        self.counts[key] = self.counts.get(key, 0) + 1
+        count = self.counts[key]
+        if base is None:
+            return str(count)
+        return base if count == 1 else f"{base} #{count}"
+
+
+def _iter_grid(rows):
+    labels = _Labels()
+    context = []  # 上一块板之后的文字行 (找波长)
+    pending = None
+    while True:
+        if pending is None:
+            pending = next(rows, None)
+            if pending is None:
+                return
+        line_no, text, cells = pending
+        pending = None
+        header = _grid_header(cells)
+        if header is None:
+            labels.see(text)
+            context.append(text)
+            continue
+
+        start, n_cols = header
+        wavelength = next((w for w in map(_wavelength, reversed(context)) if w is not None), None)
+        context = []
+        grid = []
+        errors = []
+        for pending in rows:
+            line_no, text, cells = pending
+            if start == 0 or _cell_text(cells[start - 1]).upper() != row_name(len(grid)):
+                break
+            values = np.full(n_cols, np.nan)
+            for col, cell in enumerate(cells[start : start + n_cols]):
+                try:
+                    values[col] = _parse_od(cell)
+                except ValueError as exc:
+                    errors.append(ReadoutError(line_no, text, str(exc)))
+            grid.append(values)
+        else:
+            pending = None
+        if grid:
+            yield PlateRead(labels.next(wavelength), wavelength, np.array(grid), errors)
+
+
+def _iter_long(rows, header, shape):
+    # 同一块板的行需连续出现 (酶标仪导出即是如此)；板名变化时产出上一块板的各个波长
+    labels = _Labels()
+    seen = set()
+    current = None
+    wells = {}  # 波长 -> [(行, 列, OD), ...]
+    errors = []
+    positions = {}  # 孔名 -> (行, 列)，每块板的孔名都相同，只解析一次
+    # 未指定规格时孔位不得超出最大的常见规格，打错的孔名 (如 Z99) 记为错误，不把整块板撑大
+    limit = shape or PLATE_SHAPES[-1]
+
+    def flush():
+        # 同一块板的错误只随第一个波长的 PlateRead 给出一次，load_plates 合并时不重复
+        for i, (wavelength, values) in enumerate(wells.items()):
+            index = np.array([(r, c) for r, c, _ in values], dtype=np.intp).reshape(-1, 2)
+            n_rows, n_cols = shape or _plate_shape(index[:, 0].max(), index[:, 1].max())
+            od = np.full((n_rows, n_cols), np.nan)
+            od[index[:, 0], index[:, 1]] = [value for _, _, value in values]
+            label = current if header["plate"] is not None else None
+            yield PlateRead(labels.next(wavelength, label), wavelength, od, errors if i == 0 else [])
+
+    plate_col = header["plate"]
+    for line_no, text, cells in rows:
+        cells = list(cells)
+        plate = _cell_text(cells[plate_col]) if plate_col is not None and plate_col < len(cells) else ""
+        if plate != current and wells:
+            yield from flush()
+            wells = {}
+            errors = []
+        if plate != current:
+            if plate in seen:
+                errors.append(ReadoutError(line_no, text, f"板 {plate} 的数据不连续，后一段单独作为一块板"))
+            seen.add(plate)
+            current = plate
+
+        try:
+            well = cells[header["well"]] if header["well"] < len(cells) else ""
+            if well not in positions:
+                positions[well] = well_index(_cell_text(well))
+            row, col = positions[well]
+            if row >= limit[0] or col >= limit[1]:
+                raise ValueError(f"孔位超出 {limit[0]}x{limit[1]} 板")
+            line_wavelength = None
+            if header["wavelength"] is not None:
+                line_wavelength = _wavelength(_cell_text(cells[header["wavelength"]]))
+        except (ValueError, IndexError) as exc:
+            errors.append(ReadoutError(line_no, text, str(exc)))
+            continue
+        for index, wavelength in header["values"]:
+            try:
+                value = _parse_od(cells[index] if index < len(cells) else None)
+            except ValueError as exc:
+                errors.append(ReadoutError(line_no, text, str(exc)))
+                value = np.nan
+            wells.setdefault(wavelength or line_wavelength, []).append((row, col, value))
+    if wells:
+        yield from flush()
+
+
+def iter_plates(source, fmt=None, name=None, shape=None, encoding="utf-8-sig"):
+    # source: 粘贴的文本、文件路径 (pathlib.Path) 或文件对象；逐块板产出 PlateRead
+    # 网格 / 长表格式自动识别；shape=(行, 列) 只用于长表格式，缺省按出现过的孔位推断
+    if fmt is None:
+        if name is None and not isinstance(source, str):
+            name = getattr(source, "name", source)
+        fmt = detect_format(name) if name is not None else "text"
+    rows = iter_xlsx_rows(source) if fmt == "xlsx" else iter_text_rows(source, encoding)
+
+    # 表头之前的文字行 (仪器信息、日期等) 只用于网格格式的板名
+    preamble = []
+    for row in rows:
+        header = _long_header(row[2])
+        if header is not None:
+            yield from _iter_long(rows, header, shape)
+            return
+        if _grid_header(row[2]) is not None:
+            yield from _iter_grid(_chain(preamble + [row], rows))
+            return
+        preamble.append(row)
+
+
+def _chain(head, rows):
+    # 把已读过的行 (表头前的文字行与表头) 按原顺序交还给网格解析
+    for row in head:
+        yield row
+    yield from rows
+
+
+def load_plates(source, fmt=None, name=None, shape=None, encoding="utf-8-sig"):
+    # 读完整个文件：返回 (PlateStack, errors)；各板规格不同时按最大的补 NaN
+    labels = []
+    wavelengths = []
+    errors = []
+    od = np.empty((0, 0, 0))
+    n = 0
+    for plate in iter_plates(source, fmt, name, shape, encoding):
+        rows, cols = plate.od.shape
+        if n == len(od) or rows > od.shape[1] or cols > od.shape[2]:
+            # 容量按倍数增长，已读的板整体搬一次
+            grown = np.full((max(2 * len(od), 8), max(rows, od.shape[1]), max(cols, od.shape[2])), np.nan)
+            grown[:n, : od.shape[1], : od.shape[2]] = od[:n]
+            od = grown
+        od[n, :rows, :cols] = plate.od
+        labels.append(plate.label)
+        wavelengths.append(plate.wavelength)
+        errors.extend(plate.errors)
+        n += 1
+    return PlateStack(labels, wavelengths, od[:n].copy()), errors
+
+
+def subtract_reference(stack, reference=630):
+    # 扣除参比波长：每块非参比波长的板减去同名的参比板 (如 OD570 - OD630)，只返回扣除后的板
+    # 没有波长信息的板原样保留；找不到对应参比板的板抛出 ValueError
+    ref_index = {label: i for i, (label, w) in enumerate(zip(stack.labels, stack.wavelengths)) if w == reference}
+    keep = [i for i, w in enumerate(stack.wavelengths) if w != reference]
+    missing = [stack.labels[i] for i in keep if stack.wavelengths[i] is not None and stack.labels[i] not in ref_index]
+    if missing:
+        raise ValueError(f"以下板没有 {reference} nm 参比读数: {', '.join(missing[:5])}")
+    od = stack.od[keep].copy()
+    for j, i in enumerate(keep):
+        if stack.wavelengths[i] is not None:
+            od[j] -= stack.od[ref_index[stack.labels[i]]]
+    return PlateStack([stack.labels[i] for i in keep], [stack.wavelengths[i] for i in keep], od)
+
+
+def plate_layout(n_levels, replicates=3, shape=(8, 12), orientation="columns", skip_edge=True):
+    # 上板布局：每孔对应第几个浓度 (0 起，-1 为不用的孔)
+    # orientation="columns" 时每个浓度占一列、复孔沿行排列 (96 孔板去掉边缘孔即 B-D 行的 2-11 列为
+    # 第一组 10 个浓度，E-G 行为下一组)；"rows" 时每个浓度占一行、复孔沿列排列
+    # skip_edge: 边缘孔只加培养基 (防蒸发)，不放样品
+    rows, cols = shape
+    edge = 1 if skip_edge else 0
+    if orientation == "rows":
+        return plate_layout(n_levels, replicates, (cols, rows), "columns", skip_edge).T.copy()
+    if orientation != "columns":
+        raise ValueError("orientation 只能是 'columns' 或 'rows'")
+    usable_rows = rows - 2 * edge
+    usable_cols = cols - 2 * edge
+    bands = usable_rows // replicates if replicates > 0 else 0
+    if usable_cols <= 0 or n_levels > bands * usable_cols:
+        raise ValueError(f"{n_levels} 个浓度 x {replicates} 复孔放不下 {rows}x{cols} 板")
+    layout = np.full(shape, -1, dtype=np.intp)
+    for level in range(n_levels):
+        band, col = divmod(level, usable_cols)
+        top = edge + band * replicates
+        layout[top : top + replicates, edge + col] = level
+    return layout
+
+
+def plate_levels(table):
+    # 方案中实际上板的行：单药方案去掉中间稀释管 (0 浓度管保留作对照)；双药方案全部
+    data = table.data if hasattr(table, "data") else table
+    if "flags" in data.dtype.names:
+        return data[(data["flags"] & INTERMEDIATE) == 0]
+    return data
+
+
+def map_plates(stack, table, layout=None, **layout_options):
+    # 把每块板的读数对应到方案中的浓度：返回 PlateMap
+    # table: single_plan / matrix_plan 的 ResultTable (或其 .data)；layout 缺省由 plate_layout 生成，
+    # layout_options 传给 plate_layout (replicates / orientation / skip_edge)
+    levels = plate_levels(table)
+    if layout is None:
+        layout = plate_layout(len(levels), shape=stack.od.shape[1:], **layout_options)
+    layout = np.asarray(layout)
+    if layout.shape != stack.od.shape[1:]:
+        raise ValueError(f"布局为 {layout.shape[0]}x{layout.shape[1]}，读数为 {stack.od.shape[1]}x{stack.od.shape[2]}")
+    if layout.max(initial=-1) >= len(levels):
+        raise ValueError(f"布局用到第 {layout.max() + 1} 个浓度，方案只有 {len(levels)} 个")
+
+    flat = layout.ravel()
+    wells = np.flatnonzero(flat >= 0)
+    level = flat[wells]
+    # 每个浓度的第几个复孔：按浓度稳定排序后减去该浓度的起始位置
+    order = np.argsort(level, kind="stable")
+    counts = np.bincount(level, minlength=len(levels))
+    starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+    replicate = np.empty_like(level)
+    replicate[order] = np.arange(len(level)) - starts[level[order]]
+
+    response = np.full((len(stack.od), len(levels), max(counts.max(initial=0), 1)), np.nan)
+    response[:, level, replicate] = stack.od.reshape(len(stack.od), -1)[:, wells]
+    return PlateMap(list(stack.labels), levels, response, layout)
@@ -0,0 +1,140 @@
+# -*- coding: utf-8 -*-
+# 各前端共用的紧凑结果模型：结构化数组，每行几十字节；只在显示时才格式化
+import numpy as np
+
+from .flags import BLANK, EXPANDED, FROM_STOCK, INSUFFICIENT, INTERMEDIATE  # noqa: F401 (兼容旧的导入路径)
+
+STEP_DTYPE = np.dtype(
+    [
+        ("conc", "f8"),
+        ("source_conc", "f8"),
+        ("vol_take", "f8"),
+        ("vol_media", "f8"),
+        ("total_vol", "f8"),
+        ("flags", "u1"),
+    ]
+)
+
+CELL_DTYPE = np.dtype(
+    [
+        ("conc_a", "f8"),
+        ("conc_b", "f8"),
+        ("ws_a", "f8"),
+        ("ws_b", "f8"),
+        ("vol_a", "f8"),
+        ("vol_b", "f8"),
+        ("vol_media", "f8"),
+        ("flags", "u1"),
+    ]
+)
+
+
+class ResultTable:
+    __slots__ = ("data",)
+
+    def __init__(self, data):
+        self.data = data
+
+    def __len__(self):
+        return self.data.shape[0]
+
+    def __getitem__(self, item):
+        if isinstance(item, slice):
+            return ResultTable(self.data[item])
+        return self.data[item]
+
+    @property
+    def fields(self):
+        return self.data.dtype.names
+
+    @property
+    def nbytes(self):
+        return self.data.nbytes
+
+    def column(self, name):
+        return self.data[name]
+
+    def has(self, flag):
+        return (self.data["flags"] & flag) != 0
+
+    def valid(self):
+        return ~self.has(INSUFFICIENT)
+
+    def iter_rows(self, formatter=None, start=0, stop=None):
+        # 逐行产出 (按字段顺序的元组)，formatter 只作用于实际取出的这些行
+        for row in self.data[start:stop].tolist():
+            yield row if formatter is None else formatter(row)
+
+    def to_frame(self, columns):
+        # columns: [(字段名, 表头), ...]；pandas 只在需要时导入
+        import pandas as pd
+
+        return pd.DataFrame({header: self.data[field] for field, header in columns})
+
+
+def step_table(steps, blank_vol=None):
+    # solve_chain 的结果 (ChainStep 列表) -> ResultTable；blank_vol 不为 None 时追加 0 浓度管
+    data = np.zeros(len(steps) + (blank_vol is not None), dtype=STEP_DTYPE)
+    for i, step in enumerate(steps):
+        flags = FROM_STOCK if i == 0 else 0
+        if step.expanded:
+            flags |= EXPANDED
+        if step.intermediate:
+            flags |= INTERMEDIATE
+        if step.vol_media < 0:
+            flags |= INSUFFICIENT
+        data[i] = (step.conc, step.source_conc, step.vol_take, step.vol_media, step.total_vol, flags)
+    if blank_vol is not None:
+        data[-1] = (0.0, np.nan, 0.0, blank_vol, blank_vol, BLANK)
+    return ResultTable(data)
+
+
+def dilution_table(plan, row=0):
+    # calc_dilution_batch 结果中某个化合物的一行 -> ResultTable (去掉补齐的空位)
+    keep = ~np.isnan(plan.conc[row])
+    n = int(keep.sum())
+    data = np.zeros(n, dtype=STEP_DTYPE)
+    data["conc"] = plan.conc[row][keep]
+    data["source_conc"] = plan.source_conc[row][keep]
+    data["vol_take"] = plan.vol_take[row][keep]
+    data["vol_media"] = plan.vol_media[row][keep]
+    data["total_vol"] = plan.total_vol[row][keep]
+    flags = np.zeros(n, dtype=np.uint8)
+    flags[data["conc"] == 0] |= BLANK
+    if n and not flags[0]:
+        flags[0] |= FROM_STOCK
+        if plan.expanded[row]:
+            flags[0] |= EXPANDED
+    flags[plan.insufficient[row][keep]] |= INSUFFICIENT
+    data["flags"] = flags
+    return ResultTable(data)
+
+
+def matrix_table(plan, ws_a=None, ws_b=None):
+    # MatrixPlan (直接配制或两步法的每管配方) -> ResultTable
+    n = plan.conc_a.shape[0]
+    data = np.zeros(n, dtype=CELL_DTYPE)
+    data["conc_a"] = plan.conc_a
+    data["conc_b"] = plan.conc_b
+    data["ws_a"] = np.nan if ws_a is None else ws_a
+    data["ws_b"] = np.nan if ws_b is None else ws_b
+    data["vol_a"] = plan.vol_a
+    data["vol_b"] = plan.vol_b
+    data["vol_media"] = plan.vol_media
+    data["flags"] = np.where(plan.insufficient, INSUFFICIENT, 0)
+    return ResultTable(data)
+
+
+def direct_table(targets, stock, total_vol, multiplier=1):
+    # 每个浓度都直接从母液配制 (不连续稀释)，conc 记为配液浓度 (终浓度 × multiplier)
+    conc = np.asarray(targets, dtype=np.float64).ravel() * multiplier
+    data = np.zeros(conc.shape[0], dtype=STEP_DTYPE)
+    data["conc"] = conc
+    data["source_conc"] = stock
+    data["vol_take"] = conc * total_vol / stock
+    data["vol_media"] = total_vol - data["vol_take"]
+    data["total_vol"] = total_vol
+    data["flags"] = np.where(conc == 0, BLANK, FROM_STOCK) | np.where(
+        data["vol_media"] < 0, INSUFFICIENT, 0
+    )
+    return ResultTable(data)
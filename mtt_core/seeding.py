@@ -0,0 +1,39 @@
+# -*- coding: utf-8 -*-
+# 细胞计数与铺板：由计数结果算出铺板液的配制方案 (数值，显示/导出时再格式化)
+from collections import namedtuple
+
+SeedingPlan = namedtuple(
+    "SeedingPlan",
+    [
+        "conc_cells_ml",
+        "target_conc",
+        "total_wells",
+        "total_cells",
+        "total_prep_vol",
+        "vol_cell_stock",
+        "vol_medium",
+    ],
+)
+
+
+def calc_seeding_plan(n, squares, dilution, target_per_well, vol_per_well, plates, safety, wells_per_plate=96):
+    # 细胞密度单位 个/mL，体积单位 mL；计数为 0 时返回 None
+    # 公式: 原液密度 = (N / 格数) * 10000 * 稀释倍数；C1V1 = C2V2
+    conc_cells_ml = (n / squares) * 10000 * dilution
+    if conc_cells_ml == 0:
+        return None
+
+    total_wells = wells_per_plate * plates
+    total_prep_vol = (total_wells * vol_per_well) + safety
+    target_conc = target_per_well / vol_per_well
+    vol_cell_stock = (target_conc * total_prep_vol) / conc_cells_ml
+    vol_medium = total_prep_vol - vol_cell_stock
+    return SeedingPlan(
+        conc_cells_ml,
+        target_conc,
+        total_wells,
+        target_per_well * total_wells,
+        total_prep_vol,
+        vol_cell_stock,
+        vol_medium,
+    )
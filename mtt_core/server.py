@@ -0,0 +1,265 @@
+# -*- coding: utf-8 -*-
+# 本机 JSON HTTP 接口：供 LIMS / 移液脚本直接调用与 Streamlit 相同的计算
+# 只用标准库 asyncio，HTTP/1.1 长连接 (keep-alive)；只允许绑定并接受本机 (loopback) 连接
+#
+#   POST /seeding         单个请求 (参数同 mtt_core/batch.py)
+#   POST /single
+#   POST /double
+#   POST /<类型>/batch     {"plans": [请求, ...]} 或直接一个 JSON 数组，逐条返回结果
+#   POST /batch           同上，每条请求自带 "type"
+#   GET  /health
+#
+# 启动: python -m mtt_core.server [--port 8765]
+import asyncio
+import ipaddress
+import json
+import logging
+
+from .batch import run_request
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+MAX_BODY_BYTES = 64 * 1024 * 1024
+MAX_HEADER_BYTES = 64 * 1024
+IDLE_TIMEOUT = 30.0
+# 估计的结果行数超过这个值时放到线程中计算，不阻塞其他连接 (单个大矩阵与大批量同样对待)
+INLINE_WORKLOAD = 2048
+
+# 路径 -> 请求类型 (与前端函数名 calc_seeding / calc_single / calc_double 对应)
+ROUTES = {
+    "/seeding": "seeding",
+    "/single": "single",
+    "/double": "matrix",
+}
+
+REASONS = {
+    200: "OK",
+    400: "Bad Request",
+    403: "Forbidden",
+    404: "Not Found",
+    405: "Method Not Allowed",
+    411: "Length Required",
+    413: "Payload Too Large",
+    431: "Request Header Fields Too Large",
+    500: "Internal Server Error",
+}
+
+INTERNAL_ERROR = {"ok": False, "error": "服务器内部错误"}
+
+
+class HTTPError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+def is_loopback(host):
+    if host == "localhost":
+        return True
+    try:
+        return ipaddress.ip_address(host.split("%")[0]).is_loopback
+    except ValueError:
+        return False
+
+
+def workload(plan):
+    # 请求的大致计算量 (结果行数)；格式不对的请求按 1 计，由 run_request 报错
+    if not isinstance(plan, dict):
+        return 1
+    size = 1
+    for name in ("pairs", "targets"):
+        value = plan.get(name)
+        if isinstance(value, (list, str)):
+            size = max(size, len(value))
+    series_a, series_b = plan.get("series_a"), plan.get("series_b")
+    if isinstance(series_a, list) and isinstance(series_b, list):
+        size = max(size, len(series_a) * len(series_b))
+    return size
+
+
+def _encode(payload):
+    return json.dumps(payload, ensure_ascii=False, allow_nan=False).encode("utf-8")
+
+
+async def _compute(size, func, *args):
+    # 计算量大时连同 JSON 编码一起放到线程中 (大结果的编码与计算耗时相当)，返回编码好的 bytes
+    if size > INLINE_WORKLOAD:
+        return await asyncio.get_running_loop().run_in_executor(None, lambda: _encode(func(*args)))
+    return func(*args)
+
+
+def run_batch(plans, kind=None):
+    # kind 不为 None 时统一设置请求类型 (如 /single/batch)
+    results = []
+    for plan in plans:
+        if kind is not None and isinstance(plan, dict):
+            plan = dict(plan, type=kind)
+        results.append(run_request(plan))
+    return results
+
+
+def _batch_payload(plans, kind):
+    results = run_batch(plans, kind)
+    return {"ok": all(r["ok"] for r in results), "results": results}
+
+
+async def handle_request(method, path, body):
+    # 返回 (状态码, JSON 对象或已编码的 JSON bytes)
+    path = path.split("?", 1)[0].rstrip("/") or "/"
+    if path == "/health":
+        return 200, {"ok": True}
+    if method != "POST":
+        raise HTTPError(405, "只支持 POST")
+
+    try:
+        payload = json.loads(body or b"null")
+    except ValueError as exc:
+        raise HTTPError(400, f"JSON 格式错误: {exc}") from None
+
+    batch = path == "/batch" or path.endswith("/batch")
+    route = path[: -len("/batch")] if batch else path
+    if batch:
+        kind = ROUTES.get(route) if route else None
+        if route and kind is None:
+            raise HTTPError(404, f"未知路径: {path}")
+        plans = payload.get("plans") if isinstance(payload, dict) else payload
+        if not isinstance(plans, list):
+            raise HTTPError(400, "批量请求需为 JSON 数组，或 {\"plans\": [...]}")
+        return 200, await _compute(sum(map(workload, plans)), _batch_payload, plans, kind)
+
+    kind = ROUTES.get(route)
+    if kind is None:
+        raise HTTPError(404, f"未知路径: {path}")
+    if not isinstance(payload, dict):
+        raise HTTPError(400, "请求需为 JSON 对象")
+    return 200, await _compute(workload(payload), run_request, dict(payload, type=kind))
+
+
+def _response(status, payload, keep_alive):
+    body = payload if isinstance(payload, bytes) else _encode(payload)
+    head = (
+        f"HTTP/1.1 {status} {REASONS.get(status, '')}\r\n"
+        "Content-Type: application/json; charset=utf-8\r\n"
+        f"Content-Length: {len(body)}\r\n"
+        f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n"
+        "\r\n"
+    )
+    return head.encode("latin-1") + body
+
+
+async def _read_request(reader):
+    # 返回 (method, path, headers, body)；连接关闭时返回 None
+    try:
+        head = await asyncio.wait_for(reader.readuntil(b"\r\n\r\n"), IDLE_TIMEOUT)
+    except asyncio.IncompleteReadError:
+        return None
+    except asyncio.LimitOverrunError:
+        raise HTTPError(431, "请求头过大") from None
+
+    lines = head.decode("latin-1").split("\r\n")
+    try:
+        method, path, version = lines[0].split(" ", 2)
+    except ValueError:
+        raise HTTPError(400, "请求行格式错误") from None
+    headers = {}
+    for line in lines[1:]:
+        if ":" in line:
+            name, value = line.split(":", 1)
+            headers[name.strip().lower()] = value.strip()
+    headers[":version"] = version
+
+    if "chunked" in headers.get("transfer-encoding", "").lower():
+        raise HTTPError(411, "不支持分块传输，请提供 Content-Length")
+    try:
+        length = int(headers.get("content-length", "0"))
+    except ValueError:
+        raise HTTPError(400, "Content-Length 无效") from None
+    if length > MAX_BODY_BYTES:
+        raise HTTPError(413, "请求体过大")
+    body = await reader.readexactly(length) if length else b""
+    return method.upper(), path, headers, body
+
+
+async def handle_connection(reader, writer):
+    peer = writer.get_extra_info("peername")
+    if not peer or not is_loopback(str(peer[0])):
+        writer.write(_response(403, {"ok": False, "error": "只接受本机连接"}, False))
+        writer.close()
+        return
+
+    try:
+        while True:
+            try:
+                request = await _read_request(reader)
+            except HTTPError as exc:
+                writer.write(_response(exc.status, {"ok": False, "error": str(exc)}, False))
+                break
+            except (asyncio.TimeoutError, ConnectionError):
+                break
+            except Exception:
+                logger.exception("读取请求时出错")
+                writer.write(_response(500, INTERNAL_ERROR, False))
+                break
+            if request is None:
+                break
+
+            method, path, headers, body = request
+            connection = headers.get("connection", "").lower()
+            if headers[":version"] == "HTTP/1.0":
+                keep_alive = connection == "keep-alive"
+            else:
+                keep_alive = connection != "close"
+
+            try:
+                status, payload = await handle_request(method, path, body)
+                response = _response(status, payload, keep_alive)
+            except HTTPError as exc:
+                response = _response(exc.status, {"ok": False, "error": str(exc)}, keep_alive)
+            except Exception:
+                # 计算或序列化中未预料的错误：记录后返回 500 并关闭连接，不让客户端等到超时
+                logger.exception("处理 %s %s 时出错", method, path)
+                keep_alive = False
+                response = _response(500, INTERNAL_ERROR, keep_alive)
+            writer.write(response)
+            await writer.drain()
+            if not keep_alive:
+                break
+    except ConnectionError:
+        pass
+    finally:
+        writer.close()
+
+
+async def serve(host=DEFAULT_HOST, port=DEFAULT_PORT):
+    if not is_loopback(host):
+        raise ValueError(f"只允许绑定本机地址 (127.0.0.1 / ::1 / localhost)，收到: {host}")
+    server = await asyncio.start_server(handle_connection, host, port, limit=MAX_HEADER_BYTES)
+    return server
+
+
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(prog="python -m mtt_core.server", description="MTT 配液计算本机 JSON 接口")
+    parser.add_argument("--host", default=DEFAULT_HOST, help="只能是本机地址")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    args = parser.parse_args(argv)
+
+    async def run():
+        server = await serve(args.host, args.port)
+        addresses = ", ".join(str(sock.getsockname()[:2]) for sock in server.sockets)
+        print(f"MTT 接口已启动: {addresses}", flush=True)
+        async with server:
+            await server.serve_forever()
+
+    try:
+        asyncio.run(run())
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
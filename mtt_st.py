@@ -0,0 +1,251 @@
+# -*- coding: utf-8 -*-
+# Streamlit 版 (streamlit_app.py) 的计算与表格格式化：不导入 streamlit，基准测试 (tools/benchmark.py) 可直接调用
+# calc_* 返回数值结果 (ResultTable) 并放入共享缓存；*_frame 只把要显示或导出的行格式化为 DataFrame
+import hashlib
+
+import numpy as np
+
+from mtt_core import (
+    BLANK,
+    EXPANDED,
+    FROM_STOCK,
+    INTERMEDIATE,
+    calc_seeding_plan,
+    matrix_plan,
+    matrix_table,
+    memoize,
+    metrics,
+    parse_targets,
+    plan_cache,
+    plan_two_stage,
+    single_plan,
+    step_table,
+)
+
+# 导出时每次格式化的行数
+EXPORT_BLOCK_ROWS = 65536
+
+
+def _targets_key(targets_text):
+    # 同一组浓度无论顺序、空格、中英文逗号都命中同一缓存
+    try:
+        return tuple(parse_targets(targets_text))
+    except ValueError:
+        return targets_text
+
+
+def _single_key(stock_mm, min_pipette, needed_vol, targets_text, whole_chain=False, max_vol=None):
+    return (
+        stock_mm,
+        min_pipette,
+        needed_vol,
+        _targets_key(targets_text),
+        whole_chain,
+        max_vol if whole_chain else None,
+    )
+
+
+def _double_key(stock_a_mm, stock_b_mm, total_vol, conc_a, conc_b, *options):
+    # 组合清单可能有十万行，键里只放其摘要
+    digest = hashlib.blake2b(digest_size=16)
+    for conc in (conc_a, conc_b):
+        digest.update(np.ascontiguousarray(conc, dtype=np.float64).tobytes())
+    return (stock_a_mm, stock_b_mm, total_vol, len(conc_a), digest.hexdigest()) + options
+
+
+@metrics.instrument("calc.seeding")
+@memoize(plan_cache)
+def calc_seeding(n, sq, df, target_per_well, vol_per_well, plates, safety, wells_per_plate):
+    if sq <= 0:
+        return None, "计数的格数必须大于 0"
+    if wells_per_plate <= 0:
+        return None, "每块使用孔数必须大于 0"
+
+    plan = calc_seeding_plan(n, sq, df, target_per_well, vol_per_well, plates, safety, wells_per_plate)
+    if plan is None:
+        return None, "错误：细胞计数为 0"
+    return plan, None
+
+
+def seeding_text(plan):
+    return (
+        "【计算结果】\n"
+        f"1. 原液细胞密度: {plan.conc_cells_ml / 10000:.2f} x 10^4 /mL\n"
+        f"2. 铺板液目标密度: {plan.target_conc / 10000:.2f} x 10^4 /mL\n"
+        f"3. 需配制总体积: {plan.total_prep_vol:.1f} mL (含余量)\n\n"
+        "👉 操作方案:\n"
+        f"   取细胞悬液: {plan.vol_cell_stock:.2f} mL ({plan.vol_cell_stock * 1000:.1f} μL)\n"
+        f"   + 培养基  : {plan.vol_medium:.2f} mL"
+    )
+
+
+@metrics.instrument("calc.single")
+@memoize(plan_cache, key=_single_key)
+def calc_single(stock_mm, min_pipette, needed_vol, targets_text, whole_chain=False, max_vol=None):
+    # 缓存的是数值结果 (ResultTable)，文字列只在显示、导出时逐页生成
+    if stock_mm <= 0:
+        return None, "母液浓度必须大于 0"
+    if needed_vol <= 0:
+        return None, "每管实验需用量必须大于 0"
+
+    try:
+        targets = parse_targets(targets_text)
+    except ValueError:
+        return None, "请输入有效数字，注意单位换算"
+
+    if targets and targets[-1] < 0:
+        return None, "目标浓度需为非负数"
+    if not targets:
+        return None, "请输入至少一个目标浓度"
+
+    try:
+        table = single_plan(stock_mm * 1000, targets, needed_vol, min_pipette, whole_chain, max_vol)
+    except ValueError as exc:
+        # 单管最大体积不大于最小取样体积等设置问题
+        return None, str(exc)
+    return table, None
+
+
+def step_frame(table, whole_chain):
+    source_names = [
+        "不加药" if flags & BLANK else "母液 Stock" if flags & FROM_STOCK else f"上一管 ({c} μM)"
+        for c, flags in zip(table.column("source_conc").tolist(), table.column("flags").tolist())
+    ]
+    expanded_note = "已扩大体积以满足最小取样" if whole_chain else "已扩大体积以满足母液取样"
+    rows = table.to_frame(
+        [
+            ("conc", "目标浓度 (μM)"),
+            ("vol_take", "取液体积 (μL)"),
+            ("vol_media", "加培养基 (μL)"),
+            ("total_vol", "该管配制总量 (μL)"),
+        ]
+    )
+    rows.insert(1, "取液来源", source_names)
+    rows["可配制"] = table.valid()
+    rows["备注"] = np.select(
+        [table.has(INTERMEDIATE), table.has(EXPANDED)],
+        ["中间稀释管，不用于实验", expanded_note],
+        "",
+    )
+    return rows
+
+
+def matrix_frame(table):
+    # 数值列保持 float64，母液不足的组合体积记为 NaN，并用“可配制”列标记
+    valid = table.valid()
+    rows = table.to_frame(
+        [
+            ("conc_a", "药A终浓度 (μM)"),
+            ("conc_b", "药B终浓度 (μM)"),
+            ("vol_a", "取药A (μL)"),
+            ("vol_b", "取药B (μL)"),
+            ("vol_media", "加培养基 (μL)"),
+        ]
+    )
+    rows.loc[~valid, ["取药A (μL)", "取药B (μL)", "加培养基 (μL)"]] = np.nan
+    rows["可配制"] = valid
+    rows["备注"] = np.where(valid, "", "浓度过高(母液不足)")
+    return rows
+
+
+def _tube_name(i, n_a):
+    return f"A{i + 1}" if i < n_a else f"B{i - n_a + 1}"
+
+
+def tube_frame(tubes, n_a, start, stop):
+    # 两步法工作液：A、B 两条稀释链首尾相接，前 n_a 行为 A；名称按整表中的行号生成
+    table = tubes[start:stop]
+    index = range(start, start + len(table))
+    sources = [
+        "母液 Stock" if flags & FROM_STOCK else f"上一管 {_tube_name(i - 1, n_a)}"
+        for i, flags in zip(index, table.column("flags").tolist())
+    ]
+    rows = table.to_frame(
+        [
+            ("conc", "工作液浓度 (μM)"),
+            ("vol_take", "取液体积 (μL)"),
+            ("vol_media", "加培养基 (μL)"),
+            ("total_vol", "该管配制总量 (μL)"),
+        ]
+    )
+    rows.insert(0, "工作液", [_tube_name(i, n_a) for i in index])
+    rows.insert(2, "取液来源", sources)
+    rows["备注"] = np.select(
+        [table.has(INTERMEDIATE), table.has(EXPANDED)],
+        ["中间稀释管", "已扩大体积以满足最小取样"],
+        "",
+    )
+    return rows
+
+
+def cell_frame(table):
+    valid = table.valid()
+    rows = table.to_frame(
+        [
+            ("conc_a", "药A终浓度 (μM)"),
+            ("conc_b", "药B终浓度 (μM)"),
+            ("ws_a", "A工作液 (μM)"),
+            ("vol_a", "取A工作液 (μL)"),
+            ("ws_b", "B工作液 (μM)"),
+            ("vol_b", "取B工作液 (μL)"),
+            ("vol_media", "加培养基 (μL)"),
+        ]
+    )
+    rows.loc[~valid, "加培养基 (μL)"] = np.nan
+    rows["可配制"] = valid
+    rows["备注"] = np.where(valid, "", "浓度过高(母液不足)")
+    return rows
+
+
+@metrics.instrument("calc.double")
+@memoize(plan_cache, key=_double_key)
+def calc_double(stock_a_mm, stock_b_mm, total_vol, conc_a, conc_b):
+    if stock_a_mm <= 0 or stock_b_mm <= 0:
+        return None, "母液浓度必须大于 0"
+    if total_vol <= 0:
+        return None, "每管配制体积必须大于 0"
+
+    stock_a_um = stock_a_mm * 1000
+    stock_b_um = stock_b_mm * 1000
+
+    return matrix_plan(conc_a, conc_b, stock_a_um, stock_b_um, total_vol), None
+
+
+@metrics.instrument("calc.double_two_stage")
+@memoize(plan_cache, key=_double_key)
+def calc_double_two_stage(stock_a_mm, stock_b_mm, total_vol, conc_a, conc_b, fold, min_pipette, max_vol):
+    # 返回 ((工作液 ResultTable, A 链管数), 每管配方 ResultTable, 错误)
+    if stock_a_mm <= 0 or stock_b_mm <= 0:
+        return None, None, "母液浓度必须大于 0"
+    if total_vol <= 0:
+        return None, None, "每管配制体积必须大于 0"
+    if fold < 2:
+        return None, None, "工作液倍数需 ≥ 2"
+
+    try:
+        plan = plan_two_stage(
+            conc_a,
+            conc_b,
+            stock_a_mm * 1000,
+            stock_b_mm * 1000,
+            total_vol,
+            fold_a=fold,
+            fold_b=fold,
+            min_pipette=min_pipette,
+            max_vol=max_vol,
+        )
+    except ValueError as exc:
+        # 单管最大体积不大于最小取样体积等设置问题
+        return None, None, str(exc)
+
+    tubes = step_table(plan.tubes_a + plan.tubes_b)
+    # 每条链的第一管从母液取，step_table 只标记整表的第一行
+    if plan.tubes_a and plan.tubes_b:
+        tubes.data["flags"][len(plan.tubes_a)] |= FROM_STOCK
+    return (tubes, len(plan.tubes_a)), matrix_table(plan.cells, plan.ws_a, plan.ws_b), None
+
+
+def frame_blocks(table, frame, block_rows=EXPORT_BLOCK_ROWS):
+    # 导出时同样逐块格式化；空表也产出一个空块，保证输出文件带表头
+    for start in range(0, max(len(table), 1), block_rows):
+        yield frame(start, start + block_rows)
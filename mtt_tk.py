@@ -0,0 +1,248 @@
+# -*- coding: utf-8 -*-
+# 两个桌面版 (mtt_tool.py / mtt_assistant.py) 共用的 Tk 组件：
+# 计算放到后台线程，主线程用 after() 定时分批取回结果；结果表格虚拟化，只为可见行创建条目
+import bisect
+import importlib
+import json
+import queue
+import sys
+import threading
+import time
+from tkinter import ttk
+
+# 主线程取回后台结果的间隔 (毫秒) 与每次最多处理的批数
+POLL_MS = 30
+MAX_BATCHES_PER_POLL = 8
+# 后台线程每批计算的行数
+BATCH_ROWS = 4096
+# 窗口显示后多久开始在后台预先导入较重的模块 (毫秒)
+PRELOAD_MS = 100
+
+
+class BackgroundJob:
+    # 在后台线程中运行 work(cancelled)，它逐批 yield 结果；
+    # 主线程中每批调用 on_batch(结果)，结束后调用 on_done(异常或 None)。Tk 控件只在主线程中访问
+    def __init__(self, root, work, on_batch, on_done):
+        self.root = root
+        self.on_batch = on_batch
+        self.on_done = on_done
+        self._queue = queue.Queue()
+        self._cancelled = threading.Event()
+        self._thread = threading.Thread(target=self._run, args=(work,), daemon=True)
+        self._thread.start()
+        self._after = root.after(POLL_MS, self._poll)
+
+    def _run(self, work):
+        try:
+            for batch in work(self._cancelled.is_set):
+                if self._cancelled.is_set():
+                    return
+                self._queue.put(("batch", batch))
+        except Exception as exc:  # 交给主线程提示
+            self._queue.put(("done", exc))
+        else:
+            self._queue.put(("done", None))
+
+    def _poll(self):
+        self._after = None
+        for _ in range(MAX_BATCHES_PER_POLL):
+            try:
+                kind, payload = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if self._cancelled.is_set():
+                return
+            if kind == "done":
+                self.on_done(payload)
+                return
+            self.on_batch(payload)
+        self._after = self.root.after(POLL_MS, self._poll)
+
+    def cancel(self):
+        # 重新计算时丢弃旧任务：后台线程在下一批后退出，已排队的结果不再显示
+        self._cancelled.set()
+        if self._after is not None:
+            self.root.after_cancel(self._after)
+            self._after = None
+
+
+class VirtualTable(ttk.Frame):
+    # 只显示可见的若干行的 Treeview：数据按块 (ResultTable, 格式化函数) 追加，
+    # 滚动时复用同一组条目、只格式化可见行，几十万行也不会创建几十万个条目
+    def __init__(self, parent, columns, height=10):
+        # columns: [(列名, 表头, 宽度), ...]
+        super().__init__(parent)
+        self.tree = ttk.Treeview(
+            self, columns=[c[0] for c in columns], show="headings", height=height, selectmode="none"
+        )
+        for name, heading, width in columns:
+            self.tree.heading(name, text=heading)
+            self.tree.column(name, width=width, anchor="center")
+        self.scrollbar = ttk.Scrollbar(self, orient="vertical", command=self._on_scrollbar)
+        self.tree.pack(side="left", fill="both", expand=True)
+        self.scrollbar.pack(side="right", fill="y")
+
+        self.visible = height
+        self.top = 0
+        self._chunks = []  # [(ResultTable, formatter), ...]
+        self._offsets = []  # 每块第一行的行号
+        self._count = 0
+
+        self.tree.bind("<Configure>", self._on_resize)
+        self.tree.bind("<MouseWheel>", self._on_wheel)
+        self.tree.bind("<Button-4>", lambda event: self.scroll(-3))
+        self.tree.bind("<Button-5>", lambda event: self.scroll(3))
+        for key, step in (("<Up>", -1), ("<Down>", 1), ("<Prior>", "-page"), ("<Next>", "page")):
+            self.tree.bind(key, lambda event, step=step: self._on_key(step))
+        self.tree.bind("<Home>", lambda event: self.scroll_to(0))
+        self.tree.bind("<End>", lambda event: self.scroll_to(self._count))
+
+    def __len__(self):
+        return self._count
+
+    def clear(self):
+        self._chunks = []
+        self._offsets = []
+        self._count = 0
+        self.top = 0
+        self._render()
+
+    def append(self, table, formatter=None):
+        if not len(table):
+            return
+        self._chunks.append((table, formatter))
+        self._offsets.append(self._count)
+        self._count += len(table)
+        # 新增的行在可见范围内时才需要重新填充
+        if self._count - len(table) < self.top + self.visible:
+            self._render()
+        else:
+            self._update_scrollbar()
+
+    def replace(self, table, formatter=None):
+        # 整体换成新结果但保持滚动位置 (边输入边计算时使用)
+        self._chunks = [(table, formatter)] if len(table) else []
+        self._offsets = [0] if len(table) else []
+        self._count = len(table)
+        self.top = max(0, min(self.top, self._count - self.visible))
+        self._render()
+
+    def table(self):
+        # 已追加的全部行合并为一个 ResultTable (供导出)
+        if len(self._chunks) == 1:
+            return self._chunks[0][0]
+        import numpy as np
+
+        from mtt_core import ResultTable
+
+        return ResultTable(np.concatenate([table.data for table, _ in self._chunks]))
+
+    def rows(self, start, stop):
+        # 第 start..stop 行的显示值 (跨块)
+        rows = []
+        i = max(0, bisect.bisect_right(self._offsets, start) - 1)
+        while start < stop and i < len(self._chunks):
+            table, formatter = self._chunks[i]
+            offset = self._offsets[i]
+            end = min(stop, offset + len(table))
+            rows.extend(table.iter_rows(formatter, start - offset, end - offset))
+            start = end
+            i += 1
+        return rows
+
+    def scroll(self, delta):
+        self.scroll_to(self.top + delta)
+
+    def scroll_to(self, top):
+        top = max(0, min(int(top), self._count - self.visible))
+        if top != self.top:
+            self.top = top
+            self._render()
+
+    def _render(self):
+        values = self.rows(self.top, min(self._count, self.top + self.visible))
+        items = self.tree.get_children()
+        for iid in items[len(values):]:
+            self.tree.delete(iid)
+        for i, row in enumerate(values):
+            if i < len(items):
+                self.tree.item(items[i], values=row)
+            else:
+                self.tree.insert("", "end", values=row)
+        self._update_scrollbar()
+
+    def _update_scrollbar(self):
+        if self._count <= self.visible:
+            self.scrollbar.set(0, 1)
+        else:
+            self.scrollbar.set(self.top / self._count, (self.top + self.visible) / self._count)
+
+    def _on_scrollbar(self, action, amount, unit=None):
+        if action == "moveto":
+            self.scroll_to(float(amount) * self._count)
+        elif unit == "pages":
+            self.scroll(int(amount) * max(1, self.visible - 1))
+        else:
+            self.scroll(int(amount))
+
+    def _on_wheel(self, event):
+        # Windows 每格 delta 为 120，macOS 为 1
+        step = event.delta // 120 if abs(event.delta) >= 120 else event.delta
+        self.scroll(-3 * step)
+
+    def _on_key(self, step):
+        if step == "page":
+            self.scroll(max(1, self.visible - 1))
+        elif step == "-page":
+            self.scroll(-max(1, self.visible - 1))
+        else:
+            self.scroll(step)
+        return "break"
+
+    def _on_resize(self, event):
+        # 窗口拉伸后按实际行高重新计算可见行数
+        items = self.tree.get_children()
+        if not items:
+            return
+        bbox = self.tree.bbox(items[0])
+        if not bbox:
+            return
+        visible = max(1, (event.height - bbox[1]) // bbox[3])
+        if visible != self.visible:
+            self.visible = visible
+            self.top = max(0, min(self.top, self._count - visible))
+            self._render()
+
+
+def preload(root, modules):
+    # 窗口显示后在后台线程中导入 modules (numpy 引擎等)，首次点击“计算”时不必再等导入；
+    # 用户在导入完成前点击也没关系，主线程会等同一把导入锁
+    def run():
+        for name in modules:
+            try:
+                importlib.import_module(name)
+            except ImportError:  # 可选依赖缺失时在真正用到时再提示
+                pass
+
+    root.after(PRELOAD_MS, lambda: threading.Thread(target=run, daemon=True).start())
+
+
+def report_startup(root, path):
+    # 启动耗时测量用：窗口第一次画出后把当时的时间 (time.time()) 写入 path 并退出；
+    # 同时记下此时是否已加载 numpy，确认重模块没有拖慢启动
+    def done():
+        root.update_idletasks()
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"ready": time.time(), "numpy": "numpy" in sys.modules}, f)
+        root.destroy()
+
+    root.after_idle(lambda: root.after(0, done))
+
+
+def summarize(title, lines, total=None):
+    # 多条提示合并为一次对话框的文字：lines 为列出的前几条，total 为总条数
+    total = len(lines) if total is None else total
+    text = f"{title}：\n" + "\n".join(lines)
+    if total > len(lines):
+        text += f"\n... 另有 {total - len(lines)} 条"
+    return text
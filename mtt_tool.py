@@ -1,5 +1,74 @@
 import tkinter as tk
-from tkinter import ttk, messagebox
+from tkinter import ttk, messagebox, filedialog
+
+import os
+
+# 启动时只导入纯 Python 部分，窗口先出来；numpy 引擎、导入导出等在用到时才导入 (窗口显示后后台预先加载)
+from mtt_core import (
+    BLANK, EXPANDED, FROM_STOCK, INSUFFICIENT, INTERMEDIATE, calc_seeding_plan, matrix_plan, parse_targets, single_plan
+)
+from mtt_tk import BATCH_ROWS, BackgroundJob, VirtualTable, preload, report_startup
+
+PRELOAD_MODULES = ("mtt_core.records", "mtt_core.importer", "mtt_core.live", "mtt_core.matrix", "mtt_core.exporter")
+
+# 导出表头：直接取数值结果的字段，备注由状态位生成
+SINGLE_EXPORT_COLUMNS = [
+    ("conc", "目标浓度 (μM)"),
+    ("source_conc", "取液来源浓度 (μM)"),
+    ("vol_take", "取液体积 (μL)"),
+    ("vol_media", "加培养基 (μL)"),
+    ("total_vol", "该管配制总量 (μL)"),
+]
+MATRIX_EXPORT_COLUMNS = [
+    ("conc_a", "药A终浓度 (μM)"),
+    ("conc_b", "药B终浓度 (μM)"),
+    ("vol_a", "取药A (μL)"),
+    ("vol_b", "取药B (μL)"),
+    ("vol_media", "加培养基 (μL)"),
+]
+# 边输入边计算：停止输入这么久 (毫秒) 后才读取文本框重算
+LIVE_DELAY_MS = 150
+
+
+def step_formatter(needed_vol, whole_chain):
+    # 单药方案一行 -> 表格显示值
+    expanded_note = " (已扩大体积以满足最小取样)" if whole_chain else " (已扩大体积以满足母液取样)"
+
+    def format_step(row):
+        conc, source_c, vol_take, vol_media, final_total, flags = row
+        if flags & BLANK:
+            return (0, "不加药", "0", needed_vol, needed_vol)
+        if flags & INTERMEDIATE:
+            note = " (中间稀释管，不用于实验)"
+        elif flags & EXPANDED:
+            note = expanded_note
+        else:
+            note = ""
+        return (
+            conc,
+            "母液 Stock" if flags & FROM_STOCK else f"上一管 ({source_c} μM)",
+            f"{vol_take:.2f}",  # 保留2位小数
+            f"{vol_media:.1f}",
+            f"{final_total:.1f}" + note
+        )
+
+    return format_step
+
+
+def format_cell(row):
+    # 双药方案一行 -> 表格显示值
+    target_a, target_b, _, _, vol_a, vol_b, vol_media, flags = row
+    # 检查逻辑：如果体积不够，说明浓度太高或母液太稀
+    if flags & INSUFFICIENT:
+        return (target_a, target_b, "Error", "Error", "浓度过高(母液不足)")
+    return (
+        target_a, 
+        target_b, 
+        f"{vol_a:.3f}", 
+        f"{vol_b:.3f}", 
+        f"{vol_media:.1f}"
+    )
+
 
 class MTTLabAssistant:
     def __init__(self, root):
@@ -88,33 +157,20 @@ class MTTLabAssistant:
 
             # 1. 计算原液浓度 (Cells/mL)
             # 公式: (N / Squares) * 10000 * Dilution
-            conc_cells_ml = (n / sq) * 10000 * df
-            
-            # 2. 计算需要配制的总体积 (mL)
-            # 96孔板按100孔算比较保险，或者按实际 (96 * plates)
-            total_wells = 96 * plates
-            total_prep_vol = (total_wells * vol_per_well) + safety # mL
-
-            # 3. 计算需要的细胞总数
-            # 目标浓度 (Cells/mL) = target_per_well / vol_per_well
-            target_conc = target_per_well / vol_per_well
-            
-            # C1 * V1 = C2 * V2
-            # V1 (取原液) = (Target_Conc * Total_Prep_Vol) / Stock_Conc
-            if conc_cells_ml == 0:
+            # 2. 需要配制的总体积 (mL)：96孔板按实际 (96 * plates)
+            # 3. C1 * V1 = C2 * V2，V1 (取原液) = (Target_Conc * Total_Prep_Vol) / Stock_Conc
+            plan = calc_seeding_plan(n, sq, df, target_per_well, vol_per_well, plates, safety)
+            if plan is None:
                 self.seed_result_label.config(text="错误：细胞计数为0")
                 return
 
-            vol_cell_stock = (target_conc * total_prep_vol) / conc_cells_ml
-            vol_medium = total_prep_vol - vol_cell_stock
-
             res_text = (f"【计算结果】\n"
-                        f"1. 原液细胞密度: {conc_cells_ml/10000:.2f} x 10^4 /mL\n"
-                        f"2. 铺板液目标密度: {target_conc/10000:.2f} x 10^4 /mL\n"
-                        f"3. 需配制总体积: {total_prep_vol:.1f} mL (含余量)\n\n"
+                        f"1. 原液细胞密度: {plan.conc_cells_ml/10000:.2f} x 10^4 /mL\n"
+                        f"2. 铺板液目标密度: {plan.target_conc/10000:.2f} x 10^4 /mL\n"
+                        f"3. 需配制总体积: {plan.total_prep_vol:.1f} mL (含余量)\n\n"
                         f"👉 操作方案:\n"
-                        f"   取细胞悬液: {vol_cell_stock:.2f} mL ({vol_cell_stock*1000:.1f} μL)\n"
-                        f"   + 培养基  : {vol_medium:.2f} mL")
+                        f"   取细胞悬液: {plan.vol_cell_stock:.2f} mL ({plan.vol_cell_stock*1000:.1f} μL)\n"
+                        f"   + 培养基  : {plan.vol_medium:.2f} mL")
             self.seed_result_label.config(text=res_text)
 
         except ValueError:
@@ -142,6 +198,18 @@ class MTTLabAssistant:
         self.s1_needed_vol = tk.StringVar(value="1000") # 铺板用的量
         ttk.Entry(top_frame, textvariable=self.s1_needed_vol, width=8).grid(row=1, column=1, padx=5, pady=5)
         ttk.Label(top_frame, text="(程序会自动计算所需的额外传递体积)").grid(row=1, column=2, columnspan=2, sticky="w")
+
+        # 第三行：整条稀释链的最小取样约束
+        self.s1_whole_chain = tk.BooleanVar(value=True)
+        ttk.Checkbutton(top_frame, text="每一步取样都满足最小取样量", variable=self.s1_whole_chain).grid(row=2, column=0, columnspan=2, sticky="w")
+        ttk.Label(top_frame, text="单管最大体积 (μL):").grid(row=2, column=2, sticky="w")
+        self.s1_max_vol = tk.StringVar(value="5000") # 超过则插入中间稀释管
+        ttk.Entry(top_frame, textvariable=self.s1_max_vol, width=8).grid(row=2, column=3, padx=5)
+
+        # 第四行：边输入边计算 (只重算改动的管及其上游的传递体积)
+        self.s1_live = tk.BooleanVar(value=False)
+        ttk.Checkbutton(top_frame, text="边输入边计算", variable=self.s1_live).grid(row=3, column=0, columnspan=2, sticky="w")
+        self.single_live = None  # (参数, LiveChain, 是否有 0 浓度管)
         
         # 浓度梯度输入
         input_frame = ttk.LabelFrame(tab, text="浓度梯度设置 (μM) - 自动按高到低稀释", padding=10)
@@ -152,7 +220,15 @@ class MTTLabAssistant:
         ttk.Entry(input_frame, textvariable=self.s1_targets, width=60).pack(fill="x", pady=5)
 
         # 按钮
-        ttk.Button(tab, text="计算连续稀释方案", command=self.calc_single).pack(pady=10)
+        btn_frame = ttk.Frame(tab)
+        btn_frame.pack(pady=10)
+        ttk.Button(btn_frame, text="计算连续稀释方案", command=self.calc_single).pack(side="left", padx=5)
+        ttk.Button(
+            btn_frame,
+            text="导出方案...",
+            command=lambda: self.export_table(self.single_table, SINGLE_EXPORT_COLUMNS, "连续稀释方案"),
+        ).pack(side="left", padx=5)
+        self.single_table = None
 
         # 结果表格
         columns = ("conc", "source", "vol_source", "vol_media", "total_prep")
@@ -171,6 +247,78 @@ class MTTLabAssistant:
 
         self.tree1.pack(fill="both", expand=True, padx=10, pady=10)
 
+        for var in (self.s1_live, self.s1_targets, self.s1_stock, self.min_pipette, self.s1_needed_vol,
+                    self.s1_whole_chain, self.s1_max_vol):
+            var.trace_add("write", lambda *args: self.live_single())
+
+    def live_single(self):
+        # 边输入边计算：输入不完整 (如 "10, 5,") 时保留上次结果，不弹出错误
+        from mtt_core import LiveChain
+
+        if not self.s1_live.get():
+            self.single_live = None
+            return
+        try:
+            params = (
+                float(self.s1_stock.get()) * 1000,
+                float(self.s1_needed_vol.get()),
+                float(self.min_pipette.get()),
+                float(self.s1_max_vol.get()),
+            )
+            targets = parse_targets(self.s1_targets.get())
+        except ValueError:
+            return
+        stock_um, needed_vol, min_pipette, max_vol = params
+        # 输入到一半 (如母液从 "0" 改到 "0.5") 时保留上次结果，不在回调中除以 0
+        if stock_um <= 0 or needed_vol <= 0 or any(t < 0 for t in targets):
+            return
+        if not self.s1_whole_chain.get():
+            # 只对最高浓度管扩容的批量引擎没有依赖关系可追踪，直接整体重算
+            self.single_live = None
+            self.show_single(single_plan(stock_um, targets, needed_vol, min_pipette, False, max_vol), needed_vol, False)
+            return
+
+        has_zero = 0 in targets
+        if self.single_live is None or self.single_live[0] != params:
+            try:
+                live = LiveChain(stock_um, targets, needed_vol, min_pipette, max_vol)
+            except (ValueError, ArithmeticError):
+                # 单管最大体积不大于最小取样体积等：保留上次结果，点“计算”时再提示
+                self.single_live = None
+                return
+            self.single_live = (params, live, has_zero)
+            self.show_single(live.table(needed_vol if has_zero else None), needed_vol, True)
+            return
+
+        _, live, had_zero = self.single_live
+        try:
+            start, old_stop, new_stop = live.update(targets)
+        except (ValueError, ArithmeticError):
+            # 更新到一半的模型不再可用，下次输入时整条重建
+            self.single_live = None
+            return
+        self.single_live = (params, live, has_zero)
+        table = live.table(needed_vol if has_zero else None)
+        self.single_table = table
+        # 只替换变化的行；0 浓度管固定在最后
+        format_step = step_formatter(needed_vol, True)
+        items = self.tree1.get_children()
+        for iid in items[start:old_stop]:
+            self.tree1.delete(iid)
+        for i, values in enumerate(table.iter_rows(format_step, start, new_stop)):
+            self.tree1.insert("", start + i, values=values)
+        if has_zero and not had_zero:
+            self.tree1.insert("", "end", values=format_step(table.data[-1]))
+        elif had_zero and not has_zero:
+            self.tree1.delete(self.tree1.get_children()[-1])
+
+    def show_single(self, table, needed_vol, whole_chain):
+        # 插入 Treeview，高->低 显示，符合操作顺序；只在插入时才格式化
+        self.tree1.delete(*self.tree1.get_children())
+        self.single_table = table
+        for values in table.iter_rows(step_formatter(needed_vol, whole_chain)):
+            self.tree1.insert("", "end", values=values)
+
     def calc_single(self):
         # 清空
         for item in self.tree1.get_children():
@@ -181,127 +329,31 @@ class MTTLabAssistant:
             stock_um = stock_mm * 1000 # 换算为 uM
             min_pipette = float(self.min_pipette.get())
             needed_vol = float(self.s1_needed_vol.get()) # 实验最终要用的量
+            max_vol = float(self.s1_max_vol.get())
             
-            raw_targets = self.s1_targets.get().replace("，", ",").split(",")
-            # 过滤空值并去重，排序从大到小
-            targets = sorted(list(set([float(x) for x in raw_targets if x.strip()])), reverse=True)
-            
-            # 用一个字典来存储每一级“需要被下一级取走多少体积”
-            # Key: 浓度, Value: 被取走的体积
-            transfer_needs = {t: 0 for t in targets}
-            
-            # 存储计算结果，方便最后按从小到大或从大到小显示
-            results = []
-
-            # === 核心逻辑：从低浓度往高浓度倒推 ===
-            # 因为低浓度是从高浓度里取走的，所以必须先算低浓度
-            
-            # 0浓度特殊处理（最后加）
-            has_zero = False
-            if 0 in targets:
-                has_zero = True
-                targets.remove(0)
-
-            # 倒序遍历（从低到高：1 -> 5 -> 10 -> ...）
-            # targets 现在是 [100, 50, 10, 5, 1]
-            # reversed(targets) 就是 [1, 5, 10, 50, 100]
-            
-            prev_conc = 0 # 实际上对于低浓度，它的上级是列表中下一个大的
-            
-            # 我们需要构建一个链条：Source -> Target
-            # 100 (Source=Stock) -> 50 (Source=100) -> 10 (Source=50) ...
-            
-            # 重新正向遍历来确定 Source，但计算需要反向？
-            # 不，最简单的思路：
-            # 1. 确定每一级的 Source 是谁
-            # 2. 确定每一级需要配制的 Total Vol = Needed + (被下一级取走的量)
-            
-            # 让我们用列表索引操作
-            calc_data = [] # 存临时数据
-            for i in range(len(targets)):
-                current_c = targets[i]
-                is_highest = (i == 0)
-                
-                # 确定来源
-                if is_highest:
-                    source_c = stock_um
-                    source_name = "母液 Stock"
-                else:
-                    source_c = targets[i-1] # 上一个更高的浓度
-                    source_name = f"上一管 ({source_c} μM)"
-                
-                calc_data.append({
-                    "conc": current_c,
-                    "source_c": source_c,
-                    "source_name": source_name,
-                    "is_stock": is_highest
-                })
-            
-            # 现在从低浓度 (List尾部) 开始往回算
-            # 比如 targets = [100, 10, 1]
-            # calc_data = [{100, src=Stock}, {10, src=100}, {1, src=10}]
-            
-            for i in range(len(calc_data)-1, -1, -1):
-                item = calc_data[i]
-                conc = item["conc"]
-                source_c = item["source_c"]
-                
-                # 1. 确定这管要做多少体积
-                # 基础是 needed_vol
-                # 加上 被下一级取走的量 (transfer_needs)
-                total_make_vol = needed_vol + transfer_needs[conc]
-                
-                # 2. 计算从来源取多少 (C1V1 = C2V2)
-                # V_take = (Target_Conc * Total_Make_Vol) / Source_Conc
-                vol_take = (conc * total_make_vol) / source_c
-                
-                # === 关键：母液取样限制修正 ===
-                if item["is_stock"] and vol_take < min_pipette:
-                    # 如果算出来只要 0.5ul，但限制是 2ul
-                    # 比例因子 factor = 2.0 / 0.5 = 4倍
-                    factor = min_pipette / vol_take
-                    
-                    # 修正：我们需要配更多的体积
-                    vol_take = min_pipette
-                    total_make_vol = total_make_vol * factor
-                    
-                    # 提示用户
-                    item["note"] = " (已扩大体积以满足母液取样)"
-                else:
-                    item["note"] = ""
-
-                # 3. 记录需要从上一级取走的量 (传给上一级循环用)
-                if not item["is_stock"]:
-                    transfer_needs[source_c] = vol_take
-                
-                vol_media = total_make_vol - vol_take
-                
-                # 存结果
-                item["vol_take"] = vol_take
-                item["vol_media"] = vol_media
-                item["final_total"] = total_make_vol
-                results.append(item)
-
-            # 结果现在是 低->高 的顺序，我们反转回 高->低 显示，符合操作顺序
-            results.reverse()
-            
-            # 插入 Treeview
-            for res in results:
-                self.tree1.insert("", "end", values=(
-                    res["conc"],
-                    res["source_name"],
-                    f"{res['vol_take']:.2f}",  # 保留2位小数
-                    f"{res['vol_media']:.1f}",
-                    f"{res['final_total']:.1f}" + res["note"]
-                ))
-                
-            if has_zero:
-                self.tree1.insert("", "end", values=(
-                    0, "不加药", "0", needed_vol, needed_vol
-                ))
-                    
+            # 去重，排序从大到小；0 浓度管 (只加培养基) 放在最后
+            targets = parse_targets(self.s1_targets.get())
+            whole_chain = self.s1_whole_chain.get()
         except ValueError:
             messagebox.showerror("错误", "请输入有效数字，注意单位换算")
+            return
+        if stock_mm <= 0:
+            messagebox.showerror("错误", "母液浓度必须大于 0")
+            return
+        if needed_vol <= 0:
+            messagebox.showerror("错误", "每管实验需用量必须大于 0")
+            return
+
+        # === 核心逻辑 (mtt_core.single_plan)：从低浓度往高浓度倒推 ===
+        # 最高浓度管从母液取，其余每管从上一管取
+        try:
+            table = single_plan(stock_um, targets, needed_vol, min_pipette, whole_chain, max_vol)
+        except ValueError as exc:
+            # 单管最大体积不大于最小取样体积等设置问题
+            messagebox.showerror("错误", str(exc))
+            return
+        self.show_single(table, needed_vol, whole_chain)
+        self.single_live = None
 
 
     # =========================================================================
@@ -343,35 +395,143 @@ class MTTLabAssistant:
         self.text_input.pack(fill="both", expand=True, pady=5)
         self.text_input.insert("1.0", "0, 0\n10, 0\n0, 20\n10, 20\n5, 50\n")
 
+        # 从文件导入的大清单只保存为数组，不塞进文本框
+        self.imported_pairs = None
+        self.import_label = ttk.Label(input_frame, text="", foreground="gray")
+        self.import_label.pack(anchor="w")
+
         # 3. 按钮
         btn_frame = ttk.Frame(tab)
         btn_frame.pack(pady=5)
         ttk.Button(btn_frame, text="计算 Matrix 配液方案", command=self.calc_double).pack(side="left", padx=5)
-        ttk.Button(btn_frame, text="清空列表", command=lambda: self.text_input.delete("1.0", tk.END)).pack(side="left", padx=5)
-
-        # 4. 结果表格
-        columns = ("conc_a", "conc_b", "vol_a", "vol_b", "vol_media")
-        self.tree2 = ttk.Treeview(tab, columns=columns, show="headings", height=10)
-        
-        self.tree2.heading("conc_a", text="药A终浓度 (μM)")
-        self.tree2.heading("conc_b", text="药B终浓度 (μM)")
-        self.tree2.heading("vol_a", text="取药A (μL)")
-        self.tree2.heading("vol_b", text="取药B (μL)")
-        self.tree2.heading("vol_media", text="加培养基 (μL)")
-        
-        self.tree2.column("conc_a", width=100, anchor="center")
-        self.tree2.column("conc_b", width=100, anchor="center")
-        self.tree2.column("vol_a", width=100, anchor="center")
-        self.tree2.column("vol_b", width=100, anchor="center")
-        self.tree2.column("vol_media", width=120, anchor="center")
-        
+        ttk.Button(btn_frame, text="导入文件...", command=self.import_pairs).pack(side="left", padx=5)
+        ttk.Button(
+            btn_frame,
+            text="导出方案...",
+            command=lambda: self.export_table(self.double_table, MATRIX_EXPORT_COLUMNS, "Matrix配液方案"),
+        ).pack(side="left", padx=5)
+        self.double_table = None
+        ttk.Button(btn_frame, text="清空列表", command=self.clear_pairs).pack(side="left", padx=5)
+        self.d_live = tk.BooleanVar(value=False)
+        ttk.Checkbutton(btn_frame, text="边输入边计算", variable=self.d_live).pack(side="left", padx=5)
+        self.double_live = None  # (参数, LiveMatrix)
+        self.double_live_after = None
+        self.double_job = None
+        self.double_status = ttk.Label(tab, text="", foreground="gray")
+        self.double_status.pack(anchor="w", padx=10)
+
+        # 4. 结果表格 (只为可见行创建条目，十万行也能流畅滚动)
+        self.tree2 = VirtualTable(
+            tab,
+            [
+                ("conc_a", "药A终浓度 (μM)", 100),
+                ("conc_b", "药B终浓度 (μM)", 100),
+                ("vol_a", "取药A (μL)", 100),
+                ("vol_b", "取药B (μL)", 100),
+                ("vol_media", "加培养基 (μL)", 120),
+            ],
+            height=10,
+        )
         self.tree2.pack(fill="both", expand=True, padx=10, pady=10)
 
+        self.text_input.bind("<<Modified>>", self.on_text_modified)
+        for var in (self.d_live, self.d_stock_a, self.d_stock_b, self.d_total_vol):
+            var.trace_add("write", lambda *args: self.schedule_live_double())
+
+    def on_text_modified(self, event):
+        self.text_input.edit_modified(False)
+        self.schedule_live_double()
+
+    def schedule_live_double(self):
+        # 连续输入时只在停顿后重算一次
+        if self.double_live_after is not None:
+            self.root.after_cancel(self.double_live_after)
+        self.double_live_after = self.root.after(LIVE_DELAY_MS, self.live_double)
+
+    def live_double(self):
+        # 边输入边计算：只解析并计算与上次相比改动过的行；格式错误的行只在状态栏计数，不弹窗
+        from mtt_core import LiveMatrix
+
+        self.double_live_after = None
+        if not self.d_live.get() or self.imported_pairs is not None:
+            self.double_live = None
+            return
+        try:
+            params = (float(self.d_stock_a.get()) * 1000, float(self.d_stock_b.get()) * 1000, float(self.d_total_vol.get()))
+        except ValueError:
+            return
+        if min(params) <= 0:
+            # 母液或体积输入到一半 (如 "0")：保留上次结果
+            return
+        if self.double_job is not None:
+            self.double_job.cancel()
+            self.double_job = None
+
+        text = self.text_input.get("1.0", "end-1c")
+        if self.double_live is None:
+            self.double_live = (params, LiveMatrix(*params, text=text))
+        else:
+            old_params, live = self.double_live
+            if old_params != params:
+                live.set_params(*params)
+                self.double_live = (params, live)
+            live.update(text)
+        live = self.double_live[1]
+
+        table = live.table()
+        self.tree2.replace(table, format_cell)
+        self.double_table = table if len(table) else None
+        status = f"共 {len(table)} 个组合"
+        n_short = int(table.has(INSUFFICIENT).sum())
+        if n_short:
+            status += f"，其中 {n_short} 个浓度过高 (母液不足)"
+        n_errors = len(live.errors())
+        if n_errors:
+            status += f"，{n_errors} 行格式有误"
+        self.double_status.config(text=status)
+
+    def clear_pairs(self):
+        self.text_input.delete("1.0", tk.END)
+        self.imported_pairs = None
+        self.import_label.config(text="")
+
+    def import_pairs(self):
+        from mtt_core import load_pairs
+
+        path = filedialog.askopenfilename(
+            title="导入 Matrix 浓度组合清单",
+            filetypes=[("CSV / TSV / Excel", "*.csv *.tsv *.txt *.xlsx"), ("所有文件", "*.*")],
+        )
+        if not path:
+            return
+        try:
+            with open(path, "rb") as f:
+                conc_a, conc_b, errors = load_pairs(f, name=path)
+        except (ImportError, OSError) as exc:
+            messagebox.showerror("导入失败", str(exc))
+            return
+        self.imported_pairs = (conc_a, conc_b)
+        self.import_label.config(text=f"已导入 {path}：{len(conc_a)} 个组合 (计算时以文件为准，清空列表可取消)")
+        self.show_pair_errors(errors)
+
+    def show_pair_errors(self, errors, limit=10):
+        # 格式错误的行不再静默跳过：汇总为一次提示，列出前 limit 条
+        if not errors:
+            return
+        lines = [f"第 {e.line} 行 \"{e.text}\"：{e.reason}" for e in errors[:limit]]
+        if len(errors) > limit:
+            lines.append(f"... 另有 {len(errors) - limit} 行")
+        messagebox.showwarning("部分行已跳过", f"{len(errors)} 行格式有误：\n" + "\n".join(lines))
+
     def calc_double(self):
-        # 清空旧结果
-        for item in self.tree2.get_children():
-            self.tree2.delete(item)
-            
+        # 计算在后台线程中分批进行，结果每批追加到表格，窗口不会卡住
+        if self.double_job is not None:
+            self.double_job.cancel()
+            self.double_job = None
+        self.tree2.clear()
+        self.double_table = None
+        self.double_status.config(text="")
+
         try:
             # === 核心修正：自动单位换算 ===
             # 输入的是 mM，计算时乘 1000 变成 μM
@@ -379,57 +539,92 @@ class MTTLabAssistant:
             stock_b_um = float(self.d_stock_b.get()) * 1000 
             
             total_vol = float(self.d_total_vol.get())
-            
-            # 读取文本框内容
+        except ValueError:
+            messagebox.showerror("输入错误", "请检查母液浓度或体积是否输入了非数字字符。")
+            return
+
+        if self.imported_pairs is not None:
+            content = None
+            conc_a, conc_b = self.imported_pairs
+        else:
+            # 读取文本框内容 (Tk 控件只能在主线程读取)，解析放到后台线程
             content = self.text_input.get("1.0", tk.END).strip()
             if not content:
                 return
-                
-            lines = content.split("\n")
-            
-            for line in lines:
-                # 处理中文逗号和多余空格
-                line = line.replace("，", ",").strip()
-                if not line or "," not in line: 
-                    continue
-                    
-                parts = line.split(",")
-                if len(parts) < 2: 
-                    continue
-                
-                try:
-                    target_a = float(parts[0].strip())
-                    target_b = float(parts[1].strip())
-                except ValueError:
-                    continue # 跳过格式错误的行
-                
-                # === 计算逻辑 (C1V1 = C2V2) ===
-                # 都是 μM 单位，直接除
-                vol_a = (target_a * total_vol) / stock_a_um
-                vol_b = (target_b * total_vol) / stock_b_um
-                
-                # 培养基体积 = 总量 - 两个药的体积
-                vol_media = total_vol - vol_a - vol_b
-                
-                # 检查逻辑：如果体积不够，说明浓度太高或母液太稀
-                if vol_media < 0:
-                    self.tree2.insert("", "end", values=(
-                        target_a, target_b, "Error", "Error", "浓度过高(母液不足)"
-                    ))
-                else:
-                    self.tree2.insert("", "end", values=(
-                        target_a, 
-                        target_b, 
-                        f"{vol_a:.3f}", 
-                        f"{vol_b:.3f}", 
-                        f"{vol_media:.1f}"
-                    ))
+            conc_a = conc_b = None
+        errors = []
+
+        def work(cancelled):
+            from mtt_core import load_pairs
+
+            pairs_a, pairs_b = conc_a, conc_b
+            if content is not None:
+                pairs_a, pairs_b, parse_errors = load_pairs(content)
+                errors.extend(parse_errors)
+            # === 批量计算 (C1V1 = C2V2)，都是 μM 单位 ===
+            for start in range(0, len(pairs_a), BATCH_ROWS):
+                if cancelled():
+                    return
+                stop = start + BATCH_ROWS
+                yield matrix_plan(pairs_a[start:stop], pairs_b[start:stop], stock_a_um, stock_b_um, total_vol)
+
+        n_short = [0]
+
+        def on_batch(table):
+            n_short[0] += int(table.has(INSUFFICIENT).sum())
+            self.tree2.append(table, format_cell)
+            self.double_status.config(text=f"计算中... 已完成 {len(self.tree2)} 个组合")
+
+        def on_done(error):
+            self.double_job = None
+            if error is not None:
+                self.double_status.config(text="")
+                messagebox.showerror("计算失败", str(error))
+                return
+            if len(self.tree2):
+                self.double_table = self.tree2.table()
+            status = f"共 {len(self.tree2)} 个组合"
+            if n_short[0]:
+                status += f"，其中 {n_short[0]} 个浓度过高 (母液不足)"
+            self.double_status.config(text=status)
+            self.show_pair_errors(errors)
 
-        except ValueError:
-            messagebox.showerror("输入错误", "请检查母液浓度或体积是否输入了非数字字符。")
+        self.double_status.config(text="计算中...")
+        self.double_job = BackgroundJob(self.root, work, on_batch, on_done)
+
+    # =========================================================================
+    # 导出 (CSV / Excel / Parquet)：直接写数值结果，不读取表格中的显示文字
+    # =========================================================================
+    def export_table(self, table, columns, default_name):
+        from mtt_core import EXPORT_FORMATS, export_blocks, iter_table_blocks
+
+        if table is None:
+            messagebox.showinfo("提示", "请先计算方案再导出。")
+            return
+        path = filedialog.asksaveasfilename(
+            title="导出方案",
+            initialfile=default_name,
+            defaultextension=".csv",
+            filetypes=[("CSV", "*.csv"), ("Excel", "*.xlsx"), ("Parquet", "*.parquet")],
+        )
+        if not path:
+            return
+        fmt = os.path.splitext(path)[1].lower().lstrip(".")
+        if fmt not in EXPORT_FORMATS:
+            fmt = "csv"
+        try:
+            n_rows = export_blocks(iter_table_blocks(table, columns), path, fmt)
+        except (ImportError, OSError) as exc:
+            messagebox.showerror("导出失败", str(exc))
+            return
+        messagebox.showinfo("导出完成", f"已导出 {n_rows} 行到\n{path}")
             
 
 if __name__ == "__main__":
     root = tk.Tk()
     app = MTTLabAssistant(root)
-    root.mainloop()
\ No newline at end of file
+    # 启动耗时测量 (tools/startup_time.py)：窗口画出后写下时间并退出
+    if os.environ.get("MTT_STARTUP_PROBE"):
+        report_startup(root, os.environ["MTT_STARTUP_PROBE"])
+    preload(root, PRELOAD_MODULES)
+    root.mainloop()
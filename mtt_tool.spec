@@ -1,38 +1,111 @@
 # -*- mode: python ; coding: utf-8 -*-
+# 桌面版打包 (pyinstaller mtt_tool.spec)
+#
+# 默认为快速启动的单目录版 (dist/mtt_tool/)：启动时不必先把整个包解压到临时目录，
+# 也不对 DLL 做 UPX 压缩 (每次加载都要解压，且容易被杀毒软件逐个扫描)。
+# 需要单文件版时: set MTT_ONEFILE=1 (Linux / macOS: MTT_ONEFILE=1 pyinstaller mtt_tool.spec)
+# 启动耗时: python tools/startup_time.py dist/mtt_tool/mtt_tool.exe
+import os
+import sys
 
+from PyInstaller.utils.hooks import collect_submodules
+
+ONEFILE = os.environ.get("MTT_ONEFILE", "") not in ("", "0")
+
+# mtt_core 的子模块由 __getattr__ 按需导入，分析器看不到，需显式列出；
+# 服务器 / 批处理 / 性能统计等桌面版用不到的部分不打包 (收集子模块时 Analysis 还没把本目录加入搜索路径)
+sys.path.insert(0, SPECPATH)
+UNUSED_CORE = {"mtt_core.__main__", "mtt_core.batch", "mtt_core.campaign", "mtt_core.metrics", "mtt_core.server"}
+hiddenimports = collect_submodules("mtt_core", filter=lambda name: name not in UNUSED_CORE)
+
+# 桌面版用不到的标准库与第三方包 (openpyxl / pyarrow 用于 Excel / Parquet 导入导出，保留)
+excludes = [
+    "doctest",
+    "idlelib",
+    "lib2to3",
+    "pdb",
+    "pydoc",
+    "sqlite3",
+    "tkinter.test",
+    "turtle",
+    "turtledemo",
+    "xmlrpc",
+    "distutils",
+    "setuptools",
+    "pkg_resources",
+    "numpy.distutils",
+    "numpy.f2py",
+    "IPython",
+    "PIL",
+    "altair",
+    "matplotlib",
+    "pandas",
+    "pydeck",
+    "scipy",
+    "streamlit",
+    "tornado",
+]
 
 a = Analysis(
     ['mtt_tool.py'],
-    pathex=[],
+    pathex=[SPECPATH],
     binaries=[],
     datas=[],
-    hiddenimports=[],
+    hiddenimports=hiddenimports,
     hookspath=[],
     hooksconfig={},
     runtime_hooks=[],
-    excludes=[],
+    excludes=excludes,
     noarchive=False,
     optimize=0,
 )
 pyz = PYZ(a.pure)
 
-exe = EXE(
-    pyz,
-    a.scripts,
-    a.binaries,
-    a.datas,
-    [],
-    name='mtt_tool',
-    debug=False,
-    bootloader_ignore_signals=False,
-    strip=False,
-    upx=True,
-    upx_exclude=[],
-    runtime_tmpdir=None,
-    console=False,
-    disable_windowed_traceback=False,
-    argv_emulation=False,
-    target_arch=None,
-    codesign_identity=None,
-    entitlements_file=None,
-)
+if ONEFILE:
+    exe = EXE(
+        pyz,
+        a.scripts,
+        a.binaries,
+        a.datas,
+        [],
+        name='mtt_tool',
+        debug=False,
+        bootloader_ignore_signals=False,
+        strip=False,
+        upx=False,
+        upx_exclude=[],
+        runtime_tmpdir=None,
+        console=False,
+        disable_windowed_traceback=False,
+        argv_emulation=False,
+        target_arch=None,
+        codesign_identity=None,
+        entitlements_file=None,
+    )
+else:
+    exe = EXE(
+        pyz,
+        a.scripts,
+        [],
+        exclude_binaries=True,
+        name='mtt_tool',
+        debug=False,
+        bootloader_ignore_signals=False,
+        strip=False,
+        upx=False,
+        console=False,
+        disable_windowed_traceback=False,
+        argv_emulation=False,
+        target_arch=None,
+        codesign_identity=None,
+        entitlements_file=None,
+    )
+    coll = COLLECT(
+        exe,
+        a.binaries,
+        a.datas,
+        strip=False,
+        upx=False,
+        upx_exclude=[],
+        name='mtt_tool',
+    )
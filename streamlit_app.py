@@ -1,192 +1,106 @@
-import streamlit as st
-
-
-def calc_seeding(n, sq, df, target_per_well, vol_per_well, plates, safety, wells_per_plate):
-    if sq <= 0:
-        return None, "计数的格数必须大于 0"
-    if wells_per_plate <= 0:
-        return None, "每块使用孔数必须大于 0"
-
-    conc_cells_ml = (n / sq) * 10000 * df
-    if conc_cells_ml == 0:
-        return None, "错误：细胞计数为 0"
-
-    total_wells = wells_per_plate * plates
-    total_prep_vol = (total_wells * vol_per_well) + safety
-    target_conc = target_per_well / vol_per_well
-    vol_cell_stock = (target_conc * total_prep_vol) / conc_cells_ml
-    vol_medium = total_prep_vol - vol_cell_stock
-
-    result = (
-        "【计算结果】\n"
-        f"1. 原液细胞密度: {conc_cells_ml / 10000:.2f} x 10^4 /mL\n"
-        f"2. 铺板液目标密度: {target_conc / 10000:.2f} x 10^4 /mL\n"
-        f"3. 需配制总体积: {total_prep_vol:.1f} mL (含余量)\n\n"
-        "👉 操作方案:\n"
-        f"   取细胞悬液: {vol_cell_stock:.2f} mL ({vol_cell_stock * 1000:.1f} μL)\n"
-        f"   + 培养基  : {vol_medium:.2f} mL"
-    )
-    return result, None
-
-
-def calc_single(stock_mm, min_pipette, needed_vol, targets_text):
-    if stock_mm <= 0:
-        return None, "母液浓度必须大于 0"
-    if needed_vol <= 0:
-        return None, "每管实验需用量必须大于 0"
+import functools
+import math
+import os
+import tempfile
 
-    try:
-        raw_targets = targets_text.replace("，", ",").split(",")
-        targets = sorted({float(x) for x in raw_targets if x.strip()}, reverse=True)
-    except ValueError:
-        return None, "请输入有效数字，注意单位换算"
-
-    has_zero = False
-    if 0 in targets:
-        targets.remove(0)
-        has_zero = True
-
-    if not targets and not has_zero:
-        return None, "请输入至少一个目标浓度"
-
-    stock_um = stock_mm * 1000
+import pandas as pd
+import streamlit as st
 
-    transfer_needs = {t: 0 for t in targets}
-    results = []
+from mtt_core import EXPORT_FORMATS, export_blocks, load_pairs, metrics, plan_cache, seeding_blocks
+from mtt_st import (
+    calc_double,
+    calc_double_two_stage,
+    calc_seeding,
+    calc_single,
+    cell_frame,
+    frame_blocks,
+    matrix_frame,
+    seeding_text,
+    step_frame,
+    tube_frame,
+)
 
-    calc_data = []
-    for i, current_c in enumerate(targets):
-        is_highest = i == 0
-        if is_highest:
-            source_c = stock_um
-            source_name = "母液 Stock"
-        else:
-            source_c = targets[i - 1]
-            source_name = f"上一管 ({source_c} μM)"
-        calc_data.append(
-            {
-                "conc": current_c,
-                "source_c": source_c,
-                "source_name": source_name,
-                "is_stock": is_highest,
-            }
+# 表格按页显示：只把当前页格式化并发送到浏览器，数值格式在显示时才应用
+PAGE_SIZE = 200
+
+SINGLE_COLUMNS = {
+    "取液体积 (μL)": st.column_config.NumberColumn(format="%.2f"),
+    "加培养基 (μL)": st.column_config.NumberColumn(format="%.1f"),
+    "该管配制总量 (μL)": st.column_config.NumberColumn(format="%.1f"),
+}
+
+MATRIX_COLUMNS = {
+    "取药A (μL)": st.column_config.NumberColumn(format="%.3f"),
+    "取药B (μL)": st.column_config.NumberColumn(format="%.3f"),
+    "加培养基 (μL)": st.column_config.NumberColumn(format="%.1f"),
+}
+
+TUBE_COLUMNS = {
+    "工作液浓度 (μM)": st.column_config.NumberColumn(format="%.4g"),
+    "取液体积 (μL)": st.column_config.NumberColumn(format="%.2f"),
+    "加培养基 (μL)": st.column_config.NumberColumn(format="%.1f"),
+    "该管配制总量 (μL)": st.column_config.NumberColumn(format="%.1f"),
+}
+
+CELL_COLUMNS = {
+    "A工作液 (μM)": st.column_config.NumberColumn(format="%.4g"),
+    "取A工作液 (μL)": st.column_config.NumberColumn(format="%.1f"),
+    "B工作液 (μM)": st.column_config.NumberColumn(format="%.4g"),
+    "取B工作液 (μL)": st.column_config.NumberColumn(format="%.1f"),
+    "加培养基 (μL)": st.column_config.NumberColumn(format="%.1f"),
+}
+
+
+def show_table(table, frame, key, column_config=None):
+    # table: 缓存的数值结果；frame(start, stop): 把 [start, stop) 行格式化为 DataFrame，只对当前页调用
+    n_pages = max(1, math.ceil(len(table) / PAGE_SIZE))
+    start = 0
+    if n_pages > 1:
+        page = st.number_input(
+            f"页码 (共 {n_pages} 页，{len(table)} 行)",
+            min_value=1,
+            max_value=n_pages,
+            value=1,
+            step=1,
+            key=key,
         )
+        start = (page - 1) * PAGE_SIZE
+    st.dataframe(frame(start, start + PAGE_SIZE), width="stretch", hide_index=True, column_config=column_config)
 
-    for i in range(len(calc_data) - 1, -1, -1):
-        item = calc_data[i]
-        conc = item["conc"]
-        source_c = item["source_c"]
 
-        total_make_vol = needed_vol + transfer_needs.get(conc, 0)
-        vol_take = (conc * total_make_vol) / source_c
+# 导出：点击下载时才生成文件 (在单独线程中逐块写入临时文件，超过 16 MB 落盘)
+EXPORT_SPOOL_BYTES = 16 * 1024 * 1024
 
-        if item["is_stock"] and vol_take < min_pipette:
-            factor = min_pipette / vol_take
-            vol_take = min_pipette
-            total_make_vol = total_make_vol * factor
-            note = " (已扩大体积以满足母液取样)"
-        else:
-            note = ""
 
-        if not item["is_stock"]:
-            transfer_needs[source_c] = vol_take
+def _export_file(make_blocks, fmt):
+    def build():
+        buffer = tempfile.SpooledTemporaryFile(max_size=EXPORT_SPOOL_BYTES)
+        export_blocks(make_blocks(), buffer, fmt)
+        buffer.seek(0)
+        return buffer
 
-        vol_media = total_make_vol - vol_take
+    return build
 
-        item.update(
-            {
-                "vol_take": vol_take,
-                "vol_media": vol_media,
-                "final_total": total_make_vol,
-                "note": note,
-            }
-        )
-        results.append(item)
-
-    results.reverse()
-
-    rows = []
-    for res in results:
-        rows.append(
-            {
-                "目标浓度 (μM)": res["conc"],
-                "取液来源": res["source_name"],
-                "取液体积 (μL)": f"{res['vol_take']:.2f}",
-                "加培养基 (μL)": f"{res['vol_media']:.1f}",
-                "该管配制总量 (μL)": f"{res['final_total']:.1f}{res['note']}",
-            }
-        )
 
-    if has_zero:
-        rows.append(
-            {
-                "目标浓度 (μM)": 0,
-                "取液来源": "不加药",
-                "取液体积 (μL)": "0",
-                "加培养基 (μL)": f"{needed_vol:.1f}",
-                "该管配制总量 (μL)": f"{needed_vol:.1f}",
-            }
+def export_buttons(key, tables):
+    # tables: [(按钮文字, 文件名, 产出数据块的函数), ...]
+    fmt = st.selectbox(
+        "导出格式",
+        list(EXPORT_FORMATS),
+        format_func=str.upper,
+        key=f"{key}_format",
+    )
+    mime, suffix = EXPORT_FORMATS[fmt]
+    for i, (label, file_name, make_blocks) in enumerate(tables):
+        st.download_button(
+            label,
+            data=_export_file(make_blocks, fmt),
+            file_name=file_name + suffix,
+            mime=mime,
+            key=f"{key}_download_{i}",
+            on_click="ignore",
         )
 
-    return rows, None
-
-
-def calc_double(stock_a_mm, stock_b_mm, total_vol, content):
-    if stock_a_mm <= 0 or stock_b_mm <= 0:
-        return None, "母液浓度必须大于 0"
-    if total_vol <= 0:
-        return None, "每管配制体积必须大于 0"
-
-    stock_a_um = stock_a_mm * 1000
-    stock_b_um = stock_b_mm * 1000
-
-    content = content.strip()
-    if not content:
-        return [], None
-
-    rows = []
-    for line in content.split("\n"):
-        line = line.replace("，", ",").strip()
-        if not line or "," not in line:
-            continue
-
-        parts = line.split(",")
-        if len(parts) < 2:
-            continue
-
-        try:
-            target_a = float(parts[0].strip())
-            target_b = float(parts[1].strip())
-        except ValueError:
-            continue
-
-        vol_a = (target_a * total_vol) / stock_a_um
-        vol_b = (target_b * total_vol) / stock_b_um
-        vol_media = total_vol - vol_a - vol_b
-
-        if vol_media < 0:
-            rows.append(
-                {
-                    "药A终浓度 (μM)": target_a,
-                    "药B终浓度 (μM)": target_b,
-                    "取药A (μL)": "Error",
-                    "取药B (μL)": "Error",
-                    "加培养基 (μL)": "浓度过高(母液不足)",
-                }
-            )
-        else:
-            rows.append(
-                {
-                    "药A终浓度 (μM)": target_a,
-                    "药B终浓度 (μM)": target_b,
-                    "取药A (μL)": f"{vol_a:.3f}",
-                    "取药B (μL)": f"{vol_b:.3f}",
-                    "加培养基 (μL)": f"{vol_media:.1f}",
-                }
-            )
-
-    return rows, None
-
 
 st.set_page_config(
     page_title="MTT 实验全能助手",
@@ -197,11 +111,29 @@ st.set_page_config(
 st.title("MTT 实验全能助手 (计数 + 配液)")
 st.caption("基于 Streamlit 的手机友好版本，输入参数后点击按钮即可获得配液方案。")
 
-(tab1, tab2, tab3) = st.tabs(
-    ["1. 细胞计数与铺板", "2. 单药梯度配制", "3. 双药混合配制(A+B)"]
-)
 
-with tab1:
+def export_metrics():
+    # 设置 MTT_METRICS_FILE 时写出文本格式的性能统计，供本机抓取
+    if metrics.enabled and os.environ.get("MTT_METRICS_FILE"):
+        metrics.write_textfile(os.environ["MTT_METRICS_FILE"])
+
+
+def writes_metrics(func):
+    # 表单提交只重跑所在的 fragment，整页脚本不会运行，统计文件需在每个 fragment 结束时写出
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        try:
+            return func(*args, **kwargs)
+        finally:
+            export_metrics()
+
+    return wrapper
+
+
+# 每个 Tab 各自为一个 fragment：表单提交、按钮只重跑所在 Tab，不重建其他 Tab
+@st.fragment
+@writes_metrics
+def seeding_tab():
     st.subheader("细胞计数与铺板")
     with st.form("seed_form"):
         st.markdown("**细胞计数计算器**")
@@ -265,22 +197,31 @@ with tab1:
         seed_submit = st.form_submit_button("计算铺板方案")
 
     if seed_submit:
-        result, error = calc_seeding(
-            count_num,
-            count_squares,
-            float(dilution_factor),
-            target_cell_per_well,
-            well_vol_ml,
-            plate_num,
-            seed_safety,
-            wells_per_plate,
-        )
-        if error:
-            st.error(error)
-        else:
-            st.code(result, language="text")
+        with metrics.timed("submit.seeding"):
+            st.session_state.seeding_result = calc_seeding(
+                count_num,
+                count_squares,
+                float(dilution_factor),
+                target_cell_per_well,
+                well_vol_ml,
+                plate_num,
+                seed_safety,
+                wells_per_plate,
+            )
 
-with tab2:
+    if "seeding_result" in st.session_state:
+        with metrics.timed("render.seeding"):
+            plan, error = st.session_state.seeding_result
+            if error:
+                st.error(error)
+            else:
+                st.code(seeding_text(plan), language="text")
+                export_buttons("seeding", [("下载铺板方案", "铺板方案", lambda: seeding_blocks(plan))])
+
+
+@st.fragment
+@writes_metrics
+def single_tab():
     st.subheader("单药梯度配制")
     with st.form("single_form"):
         st.markdown("**母液与限制**")
@@ -307,6 +248,16 @@ with tab2:
             step=10.0,
         )
         st.caption("程序会自动计算所需的额外传递体积")
+        whole_chain = st.checkbox(
+            "每一步取样都满足最小取样量 (自动扩容/插入中间稀释管)",
+            value=True,
+        )
+        max_tube_vol = st.number_input(
+            "单管最大体积 (μL)",
+            min_value=0.0,
+            value=5000.0,
+            step=500.0,
+        )
 
         st.markdown("**浓度梯度设置 (μM) - 自动按高到低稀释**")
         s1_targets = st.text_input(
@@ -317,15 +268,39 @@ with tab2:
         single_submit = st.form_submit_button("计算连续稀释方案")
 
     if single_submit:
-        rows, error = calc_single(s1_stock, min_pipette, s1_needed_vol, s1_targets)
-        if error:
-            st.error(error)
-        elif rows:
-            st.dataframe(rows, use_container_width=True)
-        else:
-            st.info("暂无有效结果")
+        with metrics.timed("submit.single"):
+            st.session_state.pop("single_page", None)
+            table, error = calc_single(
+                s1_stock,
+                min_pipette,
+                s1_needed_vol,
+                s1_targets,
+                whole_chain,
+                max_tube_vol,
+            )
+            st.session_state.single_result = (table, whole_chain, error)
 
-with tab3:
+    if "single_result" in st.session_state:
+        with metrics.timed("render.single"):
+            table, whole_chain, error = st.session_state.single_result
+            if error:
+                st.error(error)
+            elif len(table):
+
+                def step_rows(start, stop):
+                    return step_frame(table[start:stop], whole_chain)
+
+                show_table(table, step_rows, "single_page", SINGLE_COLUMNS)
+                export_buttons(
+                    "single", [("下载稀释方案", "连续稀释方案", lambda: frame_blocks(table, step_rows))]
+                )
+            else:
+                st.info("暂无有效结果")
+
+
+@st.fragment
+@writes_metrics
+def matrix_tab():
     st.subheader("双药混合配制 (A+B)")
     st.warning("此模式用于计算单孔/单管中同时加入药A和药B (如 Synergy Matrix)")
 
@@ -365,14 +340,199 @@ with tab3:
             key="matrix_input",
             height=200,
         )
+        matrix_file = st.file_uploader(
+            "或导入组合清单文件 (上传后以文件为准)",
+            type=["csv", "tsv", "txt", "xlsx"],
+        )
+
+        st.markdown("**两步法 (先配单药工作液，再混合)**")
+        st.caption("先按连续稀释配好 A、B 各浓度的工作液，每管再按固定体积混合，避免每管都从母液取极小体积。")
+        two_stage = st.checkbox("使用两步法", value=False)
+        d_fold = st.number_input(
+            "工作液倍数 (X)",
+            min_value=2.0,
+            value=2.0,
+            step=1.0,
+            format="%.0f",
+        )
+        d_min_pipette = st.number_input(
+            "最小取样量 (μL)",
+            min_value=0.0,
+            value=2.0,
+            step=0.5,
+            format="%.2f",
+        )
+        d_max_vol = st.number_input(
+            "工作液单管最大体积 (μL)",
+            min_value=0.0,
+            value=5000.0,
+            step=500.0,
+        )
+        st.caption("工作液与母液浓度相差过大、一步稀释超过此体积时，自动插入中间稀释管。")
 
         double_submit = st.form_submit_button("计算 Matrix 配液方案")
 
     if double_submit:
-        rows, error = calc_double(d_stock_a, d_stock_b, d_total_vol, matrix_input)
-        if error:
-            st.error(error)
-        elif rows:
-            st.dataframe(rows, use_container_width=True)
+        with metrics.timed("submit.double"):
+            st.session_state.pop("tube_page", None)
+            st.session_state.pop("matrix_page", None)
+            try:
+                if matrix_file is not None:
+                    conc_a, conc_b, import_errors = load_pairs(matrix_file, name=matrix_file.name)
+                else:
+                    conc_a, conc_b, import_errors = load_pairs(matrix_input)
+            except ImportError as exc:
+                st.session_state.matrix_result = (None, None, str(exc))
+                import_errors = []
+            else:
+                if two_stage:
+                    st.session_state.matrix_result = calc_double_two_stage(
+                        d_stock_a,
+                        d_stock_b,
+                        d_total_vol,
+                        conc_a,
+                        conc_b,
+                        d_fold,
+                        d_min_pipette,
+                        d_max_vol,
+                    )
+                else:
+                    table, error = calc_double(d_stock_a, d_stock_b, d_total_vol, conc_a, conc_b)
+                    st.session_state.matrix_result = (None, table, error)
+            st.session_state.matrix_errors = import_errors
+
+    if st.session_state.get("matrix_errors"):
+        import_errors = st.session_state.matrix_errors
+        st.warning(f"{len(import_errors)} 行格式有误，已跳过 (见下方明细)")
+        with st.expander("格式错误的行"):
+            st.dataframe(
+                pd.DataFrame(import_errors[:PAGE_SIZE], columns=["行号", "内容", "原因"]),
+                width="stretch",
+                hide_index=True,
+            )
+            if len(import_errors) > PAGE_SIZE:
+                st.caption(f"仅显示前 {PAGE_SIZE} 条")
+
+    if "matrix_result" in st.session_state:
+        with metrics.timed("render.double"):
+            tubes, table, error = st.session_state.matrix_result
+            if error:
+                st.error(error)
+            elif not len(table):
+                st.info("暂无有效结果")
+            elif tubes is not None:
+                (tube_table, n_a) = tubes
+
+                def tube_rows(start, stop):
+                    return tube_frame(tube_table, n_a, start, stop)
+
+                def cell_rows(start, stop):
+                    return cell_frame(table[start:stop])
+
+                st.markdown("**第一步：单药工作液**")
+                show_table(tube_table, tube_rows, "tube_page", TUBE_COLUMNS)
+                st.markdown("**第二步：每管混合配方**")
+                show_table(table, cell_rows, "matrix_page", CELL_COLUMNS)
+                export_buttons(
+                    "matrix",
+                    [
+                        ("下载单药工作液", "单药工作液", lambda: frame_blocks(tube_table, tube_rows)),
+                        ("下载混合配方", "Matrix混合配方", lambda: frame_blocks(table, cell_rows)),
+                    ],
+                )
+            else:
+
+                def matrix_rows(start, stop):
+                    return matrix_frame(table[start:stop])
+
+                show_table(table, matrix_rows, "matrix_page", MATRIX_COLUMNS)
+                export_buttons(
+                    "matrix",
+                    [("下载 Matrix 配液方案", "Matrix配液方案", lambda: frame_blocks(table, matrix_rows))],
+                )
+
+
+(tab1, tab2, tab3) = st.tabs(
+    ["1. 细胞计数与铺板", "2. 单药梯度配制", "3. 双药混合配制(A+B)"]
+)
+
+with tab1:
+    seeding_tab()
+
+with tab2:
+    single_tab()
+
+with tab3:
+    matrix_tab()
+
+
+# 缓存统计在各 Tab 的 fragment 之外，Tab 内提交后不会随之更新；本区域自身也是 fragment，
+# 点“刷新”只重跑这一块即可看到最新数字
+@st.fragment
+def cache_panel():
+    with st.expander("缓存统计"):
+        stats = plan_cache.stats()
+        st.caption("相同参数的计算结果会在服务器上缓存，所有用户共享。数字不随计算自动更新，请点“刷新”。")
+        (col1, col2, col3) = st.columns(3)
+        col1.metric("命中", stats["hits"])
+        col2.metric("未命中", stats["misses"])
+        col3.metric("命中率", f"{stats['hit_rate']:.0%}")
+        st.caption(
+            f"缓存条目 {stats['size']}/{stats['maxsize']}，"
+            f"占用约 {stats['bytes'] / 2**20:.1f}/{stats['maxbytes'] / 2**20:.0f} MB，"
+            f"LRU 淘汰 {stats['evictions']} 次，过期 {stats['expirations']} 次，过大未缓存 {stats['oversize']} 次"
+        )
+        st.button("刷新", key="cache_refresh")
+
+
+cache_panel()
+
+
+# 性能调试 (MTT_PROFILE=1 时开启)：计算函数、表单提交处理、结果渲染的耗时与净分配块数，
+# 进程内所有会话合计。面板为独立的 fragment 定时刷新，各 Tab 的 fragment 提交后也能看到新数据
+METRICS_REFRESH = "2s"
+
+
+@st.fragment(run_every=METRICS_REFRESH)
+def metrics_panel():
+    with st.expander("性能调试"):
+        snapshot = metrics.snapshot()
+        if snapshot:
+            frame = pd.DataFrame(snapshot)
+            if frame["alloc_bytes"].isna().all():
+                frame = frame.drop(columns="alloc_bytes")
+            frame = frame.rename(
+                columns={
+                    "name": "名称",
+                    "count": "次数",
+                    "total": "总耗时 (s)",
+                    "mean": "平均 (s)",
+                    "max": "最长 (s)",
+                    "alloc_blocks": "净分配块数",
+                    "alloc_bytes": "净分配字节",
+                }
+            )
+            st.dataframe(
+                frame,
+                width="stretch",
+                hide_index=True,
+                column_config={
+                    "总耗时 (s)": st.column_config.NumberColumn(format="%.4f"),
+                    "平均 (s)": st.column_config.NumberColumn(format="%.4f"),
+                    "最长 (s)": st.column_config.NumberColumn(format="%.4f"),
+                },
+            )
         else:
-            st.info("暂无有效结果")
+            st.caption("暂无记录，提交任一表单后显示。")
+        exposition = metrics.render_text()
+        st.caption("文本格式 (Prometheus)")
+        st.code(exposition, language="text", height=240)
+        st.download_button("下载 metrics.txt", exposition, file_name="metrics.txt", mime="text/plain")
+        if st.button("清零统计"):
+            metrics.reset()
+            export_metrics()
+            st.rerun(scope="fragment")
+
+
+if metrics.enabled:
+    metrics_panel()
@@ -0,0 +1,265 @@
+# -*- coding: utf-8 -*-
+# 计算核心基准测试：无界面运行 (不导入 tkinter / Streamlit)，结果追加到历史文件，
+# 并与保存的基线比较，任一项慢于基线超过容差时退出码为 1
+# streamlit/* 各项走 Streamlit 版的 calc_* 与表格格式化 (mtt_st.py)，绕过共享缓存，计入 DataFrame 的开销
+#
+# 基线与历史只对同一台机器有意义，不提交到仓库 (见 .gitignore)；新检出的仓库先在本机保存一次基线：
+#   python tools/benchmark.py --save-baseline    运行并把本次结果保存为基线
+#   python tools/benchmark.py                    运行全部并与基线比较
+#   python tools/benchmark.py --require-baseline 没有基线时退出码为 2 (用于自动检查，避免“没有基线”被当作通过)
+#   python tools/benchmark.py -k matrix          只运行名称包含 matrix 的项
+#
+# 微秒级的项受计时抖动影响大：只有慢于基线超过容差、且每次调用多出的绝对耗时超过 --min-delta 时才算回退
+import argparse
+import inspect
+import datetime
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import numpy as np  # noqa: E402
+
+import mtt_core  # noqa: E402
+from mtt_core.batch import process_line  # noqa: E402
+from mtt_core.campaign import plan_campaign  # noqa: E402
+import mtt_st  # noqa: E402
+
+DEFAULT_HISTORY = os.path.join(ROOT, "tools", "bench_history.jsonl")
+DEFAULT_BASELINE = os.path.join(ROOT, "tools", "bench_baseline.json")
+
+TARGETS = [0, 0.01, 0.03, 0.1, 0.3, 1, 3, 10, 30, 100]
+# Streamlit 版每页显示的行数 (streamlit_app.PAGE_SIZE)
+PAGE_ROWS = 200
+
+
+def _series(n, top=100.0):
+    return [0.0] + list(np.geomspace(top / 2 ** (n - 2), top, n - 1))
+
+
+def _matrix_case(n):
+    conc_a, conc_b = mtt_core.grid_pairs(_series(n), _series(n))
+    return lambda: mtt_core.matrix_plan(conc_a, conc_b, 10000, 10000, 1000)
+
+
+def _two_stage_case(n):
+    conc_a, conc_b = mtt_core.grid_pairs(_series(n), _series(n))
+    return lambda: mtt_core.plan_two_stage(conc_a, conc_b, 10000, 10000, 200, min_pipette=2)
+
+
+def _dilution_batch_case(n_compounds):
+    rng = np.random.default_rng(0)
+    stocks = rng.choice([1e3, 1e4, 5e4], n_compounds)
+    return lambda: mtt_core.calc_dilution_batch(stocks, TARGETS, 1000, 2)
+
+
+def _campaign_case(n_compounds, n_points):
+    stocks = np.full(n_compounds, 10000.0)
+    series = _series(n_points)
+    return lambda: plan_campaign(stocks, series, 1000)
+
+
+def _combo_case(k, n):
+    series_list = [_series(n)] * k
+    stocks = [10000.0] * k
+
+    def run():
+        for _ in mtt_core.iter_combo_plan(series_list, stocks, 1000):
+            pass
+
+    return run
+
+
+def _st_seeding_case():
+    calc_seeding = inspect.unwrap(mtt_st.calc_seeding)
+
+    def run():
+        plan, _ = calc_seeding(120, 4, 1, 5000, 0.09, 3, 2, 72)
+        mtt_st.seeding_text(plan)
+
+    return run
+
+
+def _st_single_case():
+    calc_single = inspect.unwrap(mtt_st.calc_single)
+    text = ", ".join(map(str, TARGETS))
+
+    def run():
+        table, _ = calc_single(10, 2, 1000, text, True, 5000)
+        mtt_st.step_frame(table[:PAGE_ROWS], True)
+
+    return run
+
+
+def _st_double_case(n, export=False):
+    # export: 格式化全部行 (下载文件)，否则只格式化第一页
+    calc_double = inspect.unwrap(mtt_st.calc_double)
+    conc_a, conc_b = mtt_core.grid_pairs(_series(n), _series(n))
+
+    def run():
+        table, _ = calc_double(10, 10, 1000, conc_a, conc_b)
+        if export:
+            for _ in mtt_st.frame_blocks(table, lambda start, stop: mtt_st.matrix_frame(table[start:stop])):
+                pass
+        else:
+            mtt_st.matrix_frame(table[:PAGE_ROWS])
+
+    return run
+
+
+def _st_two_stage_case(n):
+    calc_two_stage = inspect.unwrap(mtt_st.calc_double_two_stage)
+    conc_a, conc_b = mtt_core.grid_pairs(_series(n), _series(n))
+
+    def run():
+        (tubes, n_a), cells, _ = calc_two_stage(10, 10, 200, conc_a, conc_b, 2, 2, 5000)
+        mtt_st.tube_frame(tubes, n_a, 0, PAGE_ROWS)
+        mtt_st.cell_frame(cells[:PAGE_ROWS])
+
+    return run
+
+
+def _batch_case(n_lines):
+    lines = [
+        (i, json.dumps({"type": "single", "stock_mm": 10, "targets": TARGETS, "needed_vol": 1000}))
+        for i in range(n_lines)
+    ]
+    return lambda: [process_line(item) for item in lines]
+
+
+# 名称 -> 生成被测函数 (准备数据不计入耗时)
+CASES = {
+    "seeding/plan": lambda: (lambda: mtt_core.calc_seeding_plan(120, 4, 1, 5000, 0.09, 3, 2, 72)),
+    "single/whole_chain_10pt": lambda: (lambda: mtt_core.single_plan(10000, TARGETS, 1000, 2, True, 5000)),
+    "single/first_tube_10pt": lambda: (lambda: mtt_core.single_plan(10000, TARGETS, 1000, 2, False)),
+    "single/solve_chain_12pt": lambda: (
+        lambda: mtt_core.solve_chain(10000, _series(12, 1000), 1000, 2, 5000)
+    ),
+    "single/dilution_batch_20k": lambda: _dilution_batch_case(20000),
+    "double/matrix_10x10": lambda: _matrix_case(10),
+    "double/matrix_32x32": lambda: _matrix_case(32),
+    "double/two_stage_10x10": lambda: _two_stage_case(10),
+    "double/two_stage_32x32": lambda: _two_stage_case(32),
+    "combo/3drug_40pt": lambda: _combo_case(3, 40),
+    "library/campaign_100x10pt": lambda: _campaign_case(100, 10),
+    "batch/jsonl_single_1k": lambda: _batch_case(1000),
+    "streamlit/seeding": _st_seeding_case,
+    "streamlit/single_10pt": _st_single_case,
+    "streamlit/double_32x32": lambda: _st_double_case(32),
+    "streamlit/two_stage_32x32": lambda: _st_two_stage_case(32),
+    "streamlit/export_100x100": lambda: _st_double_case(100, export=True),
+}
+
+
+def measure(func, repeat=5, min_time=0.2):
+    # 与 timeit 相同：先找到总时长 >= min_time 的循环次数，再重复 repeat 次取每次调用的耗时
+    loops = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(loops):
+            func()
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time or loops >= 1 << 20:
+            break
+        loops *= 2 if elapsed == 0 else max(2, min(10, int(min_time / elapsed) + 1))
+
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(loops):
+            func()
+        samples.append((time.perf_counter() - start) / loops)
+    return {"best": min(samples), "median": statistics.median(samples), "loops": loops}
+
+
+def _git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _format_time(seconds):
+    if seconds < 1e-3:
+        return f"{seconds * 1e6:8.1f} µs"
+    if seconds < 1:
+        return f"{seconds * 1e3:8.2f} ms"
+    return f"{seconds:8.3f} s "
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="mtt_core 基准测试")
+    parser.add_argument("-k", "--filter", default="", help="只运行名称包含该字符串的项")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--min-time", type=float, default=0.2, help="每次重复的最短耗时 (秒)")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="允许慢于基线的比例")
+    parser.add_argument(
+        "--min-delta", type=float, default=50e-6, help="每次调用多出的耗时低于该值 (秒) 时不算回退"
+    )
+    parser.add_argument("--require-baseline", action="store_true", help="没有基线时以退出码 2 结束")
+    parser.add_argument("--history", default=DEFAULT_HISTORY)
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--save-baseline", action="store_true")
+    args = parser.parse_args(argv)
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)["results"]
+
+    results = {}
+    regressions = []
+    for name, make in CASES.items():
+        if args.filter not in name:
+            continue
+        result = measure(make(), args.repeat, args.min_time)
+        results[name] = result
+
+        line = f"{name:28s} {_format_time(result['best'])}  (中位 {_format_time(result['median']).strip()})"
+        base = baseline.get(name)
+        if base:
+            ratio = result["best"] / base["best"]
+            line += f"  基线 x{ratio:.2f}"
+            if ratio > 1 + args.tolerance and result["best"] - base["best"] > args.min_delta:
+                line += "  <<< 变慢"
+                regressions.append((name, ratio))
+        print(line, flush=True)
+
+    record = {
+        "time": datetime.datetime.now().isoformat(timespec="seconds"),
+        "commit": _git_commit(),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "machine": platform.platform(),
+        "results": results,
+    }
+    with open(args.history, "a", encoding="utf-8") as f:
+        f.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+    if args.save_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(record, f, ensure_ascii=False, indent=2)
+        print(f"已保存基线: {args.baseline}")
+    elif not baseline:
+        print("尚无基线，可用 --save-baseline 保存本次结果作为基线", file=sys.stderr)
+        if args.require_baseline:
+            return 2
+
+    if regressions:
+        print(f"\n性能回退 ({len(regressions)} 项慢于基线超过 {args.tolerance:.0%}):", file=sys.stderr)
+        for name, ratio in regressions:
+            print(f"  {name}: x{ratio:.2f}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,72 @@
+# -*- coding: utf-8 -*-
+# 移动版 (mtt-web) 构建步骤：为离线缓存的文件计算内容哈希，生成 mtt-web/precache-manifest.js
+# service worker (sw.js) 导入该文件；任何文件内容变化都会改变版本号，手机上的页面随之提示刷新，
+# 不再需要手动修改缓存名
+#
+# 用法:
+#   python tools/build_web.py           # 修改 mtt-web 中的文件后运行，连同生成的文件一起提交
+#   python tools/build_web.py --check   # 只检查生成的文件是否过期，过期时退出码为 1
+import argparse
+import hashlib
+import json
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+WEB_DIR = os.path.join(ROOT, "mtt-web")
+MANIFEST = os.path.join(WEB_DIR, "precache-manifest.js")
+
+# 离线可用所需的全部文件；入口页面排在第一位 (sw.js 与本文件自身不在其中)
+ASSETS = ["MTT.html", "styles.css", "app.js", "planner.js", "manifest.json", "icon.svg"]
+
+# 内容哈希取前几位即可区分版本
+HASH_CHARS = 12
+
+
+def revision(path):
+    with open(path, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()[:HASH_CHARS]
+
+
+def render():
+    entries = [(name, revision(os.path.join(WEB_DIR, name))) for name in ASSETS]
+    version = hashlib.sha256(json.dumps(entries).encode("utf-8")).hexdigest()[:HASH_CHARS]
+    lines = [
+        "// Generated by tools/build_web.py from file contents; do not edit by hand.",
+        f"self.PRECACHE_VERSION = {json.dumps(version)};",
+        "self.PRECACHE_ASSETS = [",
+    ]
+    lines += [f'  {{ url: "./{name}", revision: "{rev}" }},' for name, rev in entries]
+    lines.append("];")
+    return version, "\n".join(lines) + "\n"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="生成 mtt-web 离线缓存清单 (内容哈希)")
+    parser.add_argument("--check", action="store_true", help="只检查清单是否与当前文件一致")
+    args = parser.parse_args(argv)
+
+    version, text = render()
+    current = None
+    if os.path.exists(MANIFEST):
+        with open(MANIFEST, encoding="utf-8") as f:
+            current = f.read()
+
+    if args.check:
+        if current != text:
+            print("mtt-web/precache-manifest.js 已过期，请运行 python tools/build_web.py")
+            return 1
+        print(f"清单为最新 (版本 {version})")
+        return 0
+
+    if current != text:
+        with open(MANIFEST, "w", encoding="utf-8", newline="\n") as f:
+            f.write(text)
+        print(f"已生成 mtt-web/precache-manifest.js (版本 {version})")
+    else:
+        print(f"清单未变化 (版本 {version})")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
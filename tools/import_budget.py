@@ -0,0 +1,79 @@
+# -*- coding: utf-8 -*-
+# 冷启动导入耗时检查：每次都在新的解释器中导入，取中位数与预算比较，超出预算时退出码为 1
+# 同时确认导入核心时没有顺带加载 numpy / tkinter / streamlit
+# 用法: python tools/import_budget.py [--budget-ms 30] [--runs 7]
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# (名称, 导入语句, 是否计入预算[, 预先执行且不计时的语句])
+TARGETS = [
+    ("import mtt_core", "import mtt_core", True),
+    (
+        "纯 Python 入口",
+        "from mtt_core import LRUCache, calc_seeding_plan, parse_targets, single_plan, solve_chain",
+        True,
+    ),
+    # 批处理命令行与本机 JSON 接口：启动时只加载纯 Python 部分
+    ("批处理 (mtt_core.batch)", "import mtt_core.batch", True),
+    # asyncio 本身 (标准库) 约 50 ms，服务器必需，不计入
+    ("JSON 接口 (mtt_core.server)", "import mtt_core.server", True, "import asyncio"),
+    ("numpy 引擎 (仅供参考)", "from mtt_core import calc_matrix, calc_dilution_batch", False),
+]
+
+HEAVY_MODULES = ("numpy", "pandas", "tkinter", "streamlit")
+
+PROBE = """
+import sys, time
+exec(sys.argv[2])
+start = time.perf_counter()
+exec(sys.argv[1])
+elapsed = (time.perf_counter() - start) * 1000
+print(elapsed)
+print(",".join(m for m in {heavy!r} if m in sys.modules))
+""".format(heavy=HEAVY_MODULES)
+
+
+def measure(statement, runs, setup=""):
+    times = []
+    loaded = ""
+    for _ in range(runs):
+        out = subprocess.run(
+            [sys.executable, "-c", PROBE, statement, setup],
+            cwd=ROOT,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.splitlines()
+        times.append(float(out[0]))
+        loaded = out[1] if len(out) > 1 else ""
+    return statistics.median(times), loaded
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="mtt_core 冷启动导入耗时检查")
+    parser.add_argument("--budget-ms", type=float, default=30.0)
+    parser.add_argument("--runs", type=int, default=7)
+    args = parser.parse_args(argv)
+
+    failed = False
+    for name, statement, budgeted, *setup in TARGETS:
+        median_ms, loaded = measure(statement, args.runs, *setup)
+        status = "参考"
+        if budgeted:
+            over = median_ms > args.budget_ms or bool(loaded)
+            failed |= over
+            status = "超出" if over else "通过"
+        extra = f"  (已加载: {loaded})" if loaded else ""
+        print(f"[{status}] {name}: {median_ms:.1f} ms{extra}")
+
+    print(f"预算 {args.budget_ms:.0f} ms，{args.runs} 次取中位数")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,345 @@
+# -*- coding: utf-8 -*-
+# Streamlit 并发会话压测：启动一个真实的 streamlit 服务器 (或连接已有的)，
+# 用 websocket 客户端模拟数百个手机同时打开页面并依次提交三个表单，
+# 报告每类操作的 p50 / p99 延迟、吞吐量，以及服务器进程每个会话占用的常驻内存 (RSS)
+#
+# 用法:
+#   python tools/load_test.py                          200 个会话，全部同时进行
+#   python tools/load_test.py -n 500 --ramp 10         500 个会话，在 10 秒内陆续接入
+#   python tools/load_test.py --same-inputs            所有会话输入相同 (测缓存命中的情形)
+#   python tools/load_test.py --url ws://127.0.0.1:8501 --pid 1234   压测已启动的服务器
+#   python tools/load_test.py --metrics-file /tmp/mtt.prom           服务器同时开启性能统计
+#
+# 与浏览器前端相同的协议：/_stcore/stream 上收发 BackMsg / ForwardMsg (protobuf)，
+# 每次提交发送全部控件状态，表单提交只重跑所在 Tab 的 fragment
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+import websockets  # noqa: E402
+from streamlit.proto.BackMsg_pb2 import BackMsg  # noqa: E402
+from streamlit.proto.ForwardMsg_pb2 import ForwardMsg  # noqa: E402
+from streamlit.proto.WidgetStates_pb2 import WidgetState  # noqa: E402
+
+APP = os.path.join(ROOT, "streamlit_app.py")
+
+# 表单 -> 提交按钮文字 (与 streamlit_app.py 一致)
+FORMS = {
+    "seeding": "计算铺板方案",
+    "single": "计算连续稀释方案",
+    "double": "计算 Matrix 配液方案",
+}
+
+
+def _rss_bytes(pid):
+    # Linux: /proc/<pid>/status 中的 VmRSS；其他系统返回 None
+    try:
+        with open(f"/proc/{pid}/status", encoding="ascii") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return None
+
+
+def _percentile(values, q):
+    # 最近秩法 (nearest rank)
+    ordered = sorted(values)
+    return ordered[max(0, min(len(ordered) - 1, int(round(q / 100 * len(ordered) + 0.5)) - 1))]
+
+
+def _session_inputs(rng, n_pairs):
+    # 每个会话的输入 (只改部分字段，其余保持页面默认值)
+    pairs = "\n".join(f"{rng.uniform(0, 100):.3g}, {rng.uniform(0, 100):.3g}" for _ in range(n_pairs))
+    targets = sorted({0.0} | {round(rng.uniform(0.1, 100), 2) for _ in range(8)})
+    return {
+        "seeding": {
+            "计数板总细胞数": float(rng.randint(50, 400)),
+            "目标每孔细胞数 (个)": float(rng.choice([3000, 5000, 8000])),
+        },
+        "single": {
+            "药物母液浓度 (mM)": float(rng.choice([10, 20, 50])),
+            "输入目标浓度 (逗号分隔)": ", ".join(f"{t:g}" for t in targets),
+        },
+        "double": {
+            "药A 母液 (mM)": float(rng.choice([10, 20])),
+            "浓度组合": pairs,
+        },
+    }
+
+
+class Session:
+    # 一个浏览器标签页：维护控件状态，记录每次运行的延迟
+    def __init__(self, url):
+        self.url = url
+        self.ws = None
+        self.widgets = {}  # 标签 -> (控件 id, 类型, 所在 fragment)
+        self.states = {}  # 控件 id -> WidgetState
+        self.errors = []
+
+    async def connect(self):
+        # 服务器满载时回应 ping 可能很慢，与浏览器一样不主动发 ping
+        self.ws = await websockets.connect(
+            f"{self.url}/_stcore/stream",
+            subprotocols=["streamlit"],
+            max_size=None,
+            open_timeout=60,
+            ping_interval=None,
+        )
+
+    async def close(self):
+        if self.ws is not None:
+            await self.ws.close()
+
+    async def _run(self, fragment_id="", trigger=None):
+        # 发送一次 rerun 并等到本次运行结束，返回耗时 (秒)
+        msg = BackMsg()
+        client = msg.rerun_script
+        client.page_script_hash = ""
+        client.fragment_id = fragment_id
+        for state in self.states.values():
+            client.widget_states.widgets.add().CopyFrom(state)
+        if trigger is not None:
+            state = client.widget_states.widgets.add()
+            state.id = trigger
+            state.trigger_value = True
+
+        start = time.perf_counter()
+        await self.ws.send(msg.SerializeToString())
+        while True:
+            forward = ForwardMsg()
+            forward.ParseFromString(await self.ws.recv())
+            kind = forward.WhichOneof("type")
+            if kind == "script_finished":
+                return time.perf_counter() - start
+            if kind == "delta" and forward.delta.WhichOneof("type") == "new_element":
+                self._on_element(forward.delta)
+
+    def _on_element(self, delta):
+        element = delta.new_element
+        kind = element.WhichOneof("type")
+        widget = getattr(element, kind)
+        if kind == "exception":
+            self.errors.append(widget.message)
+        elif kind == "alert" and widget.format == widget.ERROR:
+            self.errors.append(widget.body)
+        elif getattr(widget, "id", "") and getattr(widget, "label", ""):
+            self.widgets[widget.label] = (widget.id, kind, delta.fragment_id)
+
+    def _set(self, label, value):
+        widget_id, kind, _ = self.widgets[label]
+        state = self.states.setdefault(widget_id, WidgetState(id=widget_id))
+        if kind in ("text_input", "text_area"):
+            state.string_value = value
+        elif kind == "checkbox":
+            state.bool_value = value
+        else:
+            state.double_value = value
+
+    async def open(self):
+        return await self._run()
+
+    async def submit(self, form, values):
+        for label, value in values.items():
+            self._set(label, value)
+        button_id, _, fragment_id = self.widgets[FORMS[form]]
+        return await self._run(fragment_id, button_id)
+
+
+async def run_session(index, url, args, latencies, sessions, start_delay):
+    await asyncio.sleep(start_delay)
+    rng = random.Random(0 if args.same_inputs else index)
+    session = Session(url)
+    sessions.append(session)
+    try:
+        await session.connect()
+        latencies["open"].append(await session.open())
+        for _ in range(args.rounds):
+            inputs = _session_inputs(rng, args.matrix_pairs)
+            for form in FORMS:
+                if args.think:
+                    await asyncio.sleep(rng.uniform(0, args.think))
+                latencies[form].append(await session.submit(form, inputs[form]))
+    except (OSError, websockets.WebSocketException, asyncio.TimeoutError, KeyError) as exc:
+        session.errors.append(f"{type(exc).__name__}: {exc}")
+
+
+async def run_load(url, args, pid):
+    latencies = {"open": [], **{form: [] for form in FORMS}}
+    sessions = []
+
+    # 预热：第一次运行要导入 numpy / pandas、编译脚本，不计入统计
+    warm = Session(url)
+    await warm.connect()
+    await warm.open()
+    await warm.close()
+    await asyncio.sleep(1)
+    rss_before = _rss_bytes(pid) if pid else None
+
+    start = time.perf_counter()
+    delays = [args.ramp * i / max(1, args.sessions) for i in range(args.sessions)]
+    tasks = [run_session(i, url, args, latencies, sessions, delays[i]) for i in range(args.sessions)]
+
+    peak = [rss_before or 0]
+
+    async def sample_rss():
+        while True:
+            rss = _rss_bytes(pid)
+            if rss:
+                peak[0] = max(peak[0], rss)
+            await asyncio.sleep(0.2)
+
+    sampler = asyncio.ensure_future(sample_rss()) if pid else None
+    await asyncio.gather(*tasks)
+    elapsed = time.perf_counter() - start
+    # 所有会话仍保持连接时的常驻内存：会话状态 (输入文本、结果表) 都还在服务器上
+    rss_after = _rss_bytes(pid) if pid else None
+    if sampler is not None:
+        sampler.cancel()
+    await asyncio.gather(*(session.close() for session in sessions))
+
+    return {
+        "sessions": args.sessions,
+        "elapsed": elapsed,
+        "latencies": latencies,
+        "errors": [error for session in sessions for error in session.errors],
+        "rss_before": rss_before,
+        "rss_after": rss_after,
+        "rss_peak": peak[0] or None,
+    }
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_server(port, metrics_file=None):
+    env = dict(os.environ)
+    if metrics_file:
+        env.update(MTT_PROFILE="1", MTT_METRICS_FILE=metrics_file)
+    server = subprocess.Popen(
+        [
+            sys.executable,
+            "-m",
+            "streamlit",
+            "run",
+            APP,
+            "--server.headless=true",
+            "--server.address=127.0.0.1",
+            f"--server.port={port}",
+            "--browser.gatherUsageStats=false",
+            "--logger.level=error",
+        ],
+        cwd=ROOT,
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        if server.poll() is not None:
+            raise RuntimeError("streamlit 服务器启动失败")
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=0.5).close()
+            return server
+        except OSError:
+            time.sleep(0.2)
+    server.kill()
+    raise RuntimeError("streamlit 服务器 60 秒内未就绪")
+
+
+def report(result, as_json=False):
+    latencies = result["latencies"]
+    n_submits = sum(len(latencies[form]) for form in FORMS)
+    summary = {
+        "sessions": result["sessions"],
+        "elapsed_s": round(result["elapsed"], 3),
+        "submits": n_submits,
+        "throughput_per_s": round(n_submits / result["elapsed"], 2) if result["elapsed"] else None,
+        "errors": len(result["errors"]),
+        "latency_ms": {
+            name: {
+                "n": len(values),
+                "p50": round(_percentile(values, 50) * 1000, 1),
+                "p99": round(_percentile(values, 99) * 1000, 1),
+                "max": round(max(values) * 1000, 1),
+                "mean": round(statistics.fmean(values) * 1000, 1),
+            }
+            for name, values in latencies.items()
+            if values
+        },
+    }
+    if result["rss_before"] and result["rss_after"]:
+        summary["rss_mb"] = {
+            "before": round(result["rss_before"] / 2**20, 1),
+            "after": round(result["rss_after"] / 2**20, 1),
+            "peak": round(result["rss_peak"] / 2**20, 1),
+            "per_session": round((result["rss_after"] - result["rss_before"]) / 2**20 / result["sessions"], 3),
+        }
+
+    if as_json:
+        print(json.dumps(summary, ensure_ascii=False, indent=2))
+        return summary
+
+    print(f"{summary['sessions']} 个会话，{n_submits} 次表单提交，用时 {summary['elapsed_s']:.2f} s")
+    print(f"吞吐量: {summary['throughput_per_s']} 次提交/s")
+    print(f"{'操作':10s} {'次数':>6s} {'p50 (ms)':>10s} {'p99 (ms)':>10s} {'最长 (ms)':>10s}")
+    for name, stats in summary["latency_ms"].items():
+        print(f"{name:10s} {stats['n']:6d} {stats['p50']:10.1f} {stats['p99']:10.1f} {stats['max']:10.1f}")
+    if "rss_mb" in summary:
+        rss = summary["rss_mb"]
+        print(
+            f"服务器 RSS: 压测前 {rss['before']} MB，所有会话在线时 {rss['after']} MB (峰值 {rss['peak']} MB)，"
+            f"每会话约 {rss['per_session'] * 1024:.0f} KB"
+        )
+    if result["errors"]:
+        print(f"出错 {len(result['errors'])} 次，例如: {result['errors'][0]}", file=sys.stderr)
+    return summary
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Streamlit 并发会话压测")
+    parser.add_argument("-n", "--sessions", type=int, default=200, help="会话数")
+    parser.add_argument("--rounds", type=int, default=1, help="每个会话提交三个表单的轮数")
+    parser.add_argument("--ramp", type=float, default=0.0, help="在这么多秒内陆续接入 (0 为同时接入)")
+    parser.add_argument("--think", type=float, default=0.0, help="两次提交之间随机停顿的上限 (秒)")
+    parser.add_argument("--matrix-pairs", type=int, default=100, help="双药组合清单的行数")
+    parser.add_argument("--same-inputs", action="store_true", help="所有会话使用相同输入")
+    parser.add_argument("--url", help="已启动的服务器，如 ws://127.0.0.1:8501；缺省时自动启动一个")
+    parser.add_argument("--pid", type=int, help="配合 --url，用于读取服务器进程的 RSS")
+    parser.add_argument("--metrics-file", help="自动启动的服务器开启性能统计并写出到该文件")
+    parser.add_argument("--json", action="store_true", help="以 JSON 输出结果")
+    args = parser.parse_args(argv)
+
+    server = None
+    if args.url:
+        url, pid = args.url.rstrip("/"), args.pid
+    else:
+        port = _free_port()
+        server = start_server(port, args.metrics_file)
+        url, pid = f"ws://127.0.0.1:{port}", server.pid
+    try:
+        result = asyncio.run(run_load(url, args, pid))
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+
+    report(result, args.json)
+    return 1 if result["errors"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
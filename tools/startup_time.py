@@ -0,0 +1,96 @@
+# -*- coding: utf-8 -*-
+# 桌面版启动耗时：从启动进程到主窗口第一次画出的时间，冷启动与热启动分别统计，超出预算时退出码为 1
+# 程序在环境变量 MTT_STARTUP_PROBE 指定的文件中写下窗口画出的时刻后自行退出 (见 mtt_tk.report_startup)
+#
+# 用法:
+#   python tools/startup_time.py                                   # 源码版: python mtt_tool.py
+#   python tools/startup_time.py dist/mtt_tool/mtt_tool.exe        # 打包后的单目录版
+#   python tools/startup_time.py dist/mtt_tool.exe --runs 10       # 单文件版，对比用
+#
+# 冷启动 = 第一次运行 (刚开机 / 刚打包完，文件不在系统缓存中)；之后的运行为热启动，取中位数。
+# 要重复测冷启动请重启电脑后再运行；Linux 下以 root 运行并加 --drop-caches 可在每轮前清空页缓存
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def drop_caches():
+    # 仅 Linux (需要 root)：清空页缓存，使下一次启动相当于冷启动
+    subprocess.run(["sync"], check=False)
+    with open("/proc/sys/vm/drop_caches", "w") as f:
+        f.write("3\n")
+
+
+def launch(command, timeout):
+    # 启动一次，返回 (窗口画出耗时 ms, 当时是否已加载 numpy)
+    fd, probe = tempfile.mkstemp(prefix="mtt_startup_", suffix=".json")
+    os.close(fd)
+    os.remove(probe)
+    env = dict(os.environ, MTT_STARTUP_PROBE=probe)
+    try:
+        start = time.time()
+        subprocess.run(command, cwd=ROOT, env=env, timeout=timeout, check=False)
+        if not os.path.exists(probe):
+            raise RuntimeError(f"程序退出时没有写出启动记录: {' '.join(command)}")
+        with open(probe, encoding="utf-8") as f:
+            result = json.load(f)
+    finally:
+        if os.path.exists(probe):
+            os.remove(probe)
+    return (result["ready"] - start) * 1000, result["numpy"]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="桌面版 (mtt_tool) 启动耗时测量")
+    parser.add_argument("exe", nargs="?", help="打包后的可执行文件；缺省为用当前 Python 运行 mtt_tool.py")
+    parser.add_argument("--runs", type=int, default=7, help="总次数 (第一次计为冷启动)")
+    parser.add_argument("--budget-ms", type=float, default=1000.0)
+    parser.add_argument("--drop-caches", action="store_true", help="每次启动前清空页缓存 (Linux, root)")
+    parser.add_argument("--timeout", type=float, default=60.0)
+    parser.add_argument("--json", action="store_true", help="以 JSON 输出")
+    args = parser.parse_args(argv)
+
+    command = [os.path.abspath(args.exe)] if args.exe else [sys.executable, os.path.join(ROOT, "mtt_tool.py")]
+    times = []
+    numpy_loaded = False
+    for _ in range(args.runs):
+        if args.drop_caches:
+            drop_caches()
+        elapsed, numpy_now = launch(command, args.timeout)
+        times.append(elapsed)
+        numpy_loaded |= numpy_now
+
+    cold = times[0]
+    warm = times if args.drop_caches else times[1:] or times
+    result = {
+        "command": command,
+        "runs": args.runs,
+        "cold_ms": round(cold, 1),
+        "warm_median_ms": round(statistics.median(warm), 1),
+        "warm_max_ms": round(max(warm), 1),
+        "numpy_at_startup": numpy_loaded,
+        "budget_ms": args.budget_ms,
+    }
+    over = cold > args.budget_ms or result["warm_median_ms"] > args.budget_ms
+    if args.json:
+        print(json.dumps(result, ensure_ascii=False, indent=2))
+    else:
+        print(f"命令: {' '.join(command)}")
+        print(f"冷启动: {result['cold_ms']:.0f} ms")
+        label = "每次清空缓存后" if args.drop_caches else "热启动"
+        print(f"{label}: 中位数 {result['warm_median_ms']:.0f} ms，最慢 {result['warm_max_ms']:.0f} ms ({len(warm)} 次)")
+        if numpy_loaded:
+            print("注意: 窗口画出前已加载 numpy，启动路径上有不必要的导入")
+        print(f"[{'超出' if over else '通过'}] 预算 {args.budget_ms:.0f} ms")
+    return 1 if over else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())